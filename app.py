@@ -2,21 +2,39 @@ from flask import Flask, request, jsonify, send_file, Response, stream_with_cont
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-import ee
-import geemap
-from sklearn.cluster import KMeans
-import folium
+import numpy as np
 import os
 from dotenv import load_dotenv
 import io
 import base64
+import functools
 from contextlib import contextmanager
-import queue
 import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+import time
 import uuid
 from datetime import datetime
 import json
+from html import escape
 from werkzeug.routing import BaseConverter
+from cache import DiskCache, make_cache_key
+from backends import PIXEL_SCALE, composite_id, get_backend
+from metrics import Counter, Histogram, render_samples
+from jobs import AnalysisExecutor, QueueFullError
+from sessions import SessionNotFound, TERMINAL_STATUSES, get_session_store
+from clustering import DEFAULT_CLUSTERS, cluster_hotspots
+from scene_index import SceneIndex
+from ee_client import BackgroundInitializer, RequestCoalescer
+from exports import EXPORT_FORMATS, ExportStore, columns_table, hotspot_table
+from maps import MapStore
+from map_tiles import TILE_LAYERS, layer_visualization, valid_tile
+from zones import parse_score_weights, priority_scores, zone_statistics
+from planting import select_planting_sites
+from lazy_imports import import_times, lazy_import, preload
+
+ee = lazy_import('ee')
+folium = lazy_import('folium')
 
 load_dotenv()
 
@@ -31,25 +49,528 @@ CORS(app)  # Enable CORS for all routes
 app.url_map.converters['filename'] = FilenameConverter
 
 
-# Global dictionary to store log queues for each analysis session
-analysis_sessions = {}
-sessions_lock = threading.Lock()
+SSE_HEARTBEAT_SECONDS = int(os.getenv("SSE_HEARTBEAT_SECONDS", 15))
 
 def get_session_id():
     """Generate unique session ID"""
     return str(uuid.uuid4())
 
+def create_session(status='queued', parent=None, location=None):
+    """Register a new analysis session and return its ID; batch locations name their batch as parent"""
+    session_id = get_session_id()
+    session_store.create(session_id, status, parent=parent, location=location)
+    return session_id
+
+def publish_event(session_id, data):
+    """Append a sequence-numbered event to the session and wake its subscribers"""
+    event_id = session_store.append_event(session_id, data)
+    parent = session_store.parent(session_id)
+    if parent is not None:
+        forward_to_batch(session_id, parent, data)
+    return event_id
+
+def publish_partial(session_id, event_type, data):
+    """Publish a typed partial result, sent as a named SSE event"""
+    publish_event(session_id, dict(data, type=event_type))
+
+def location_summary(result):
+    """The headline figures of one location's result, without the map or timings"""
+    return {
+        key: result.get(key)
+        for key in ('hotspotsFound', 'clusters', 'minTemperature', 'maxTemperature',
+                    'avgTemperature', 'priorityZones', 'sceneCount', 'cached')
+    }
+
+def forward_to_batch(session_id, parent, data):
+    """Relay a location's event to the batch stream, tagged with the location"""
+    if 'type' in data:
+        # Partial results stay on the location's own stream
+        return
+    batch_id, location_id = parent
+    event = {'location': location_id, 'sessionId': session_id}
+    if 'log' in data:
+        event['log'] = data['log']
+    if 'status' in data:
+        # Nested so that a finished location does not end the batch stream
+        event['locationStatus'] = data['status']
+        if data.get('error'):
+            event['error'] = data['error']
+        if data['status'] == 'completed':
+            session = session_store.get(session_id)
+            if session and session['result']:
+                event['result'] = location_summary(session['result'])
+    session_store.append_event(batch_id, event)
+
 def stream_log(session_id, message):
-    """Add message to session's log queue"""
-    with sessions_lock:
-        if session_id in analysis_sessions:
-            timestamp = datetime.now().strftime("%H:%M:%S")
-            log_entry = f"[{timestamp}] {message}"
-            analysis_sessions[session_id]['logs'].put(log_entry)
+    """Publish a timestamped log line to the session's event stream"""
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    publish_event(session_id, {'log': f"[{timestamp}] {message}"})
     print(message)  # Also print to console
 
+def finish_session(session_id, status, result=None, error=None):
+    """Record the final state of a session and publish it as the last event"""
+    try:
+        session_store.update(session_id, status=status, result=result, error=error, queuePosition=None)
+    except SessionNotFound:
+        return
+
+    # The result itself is stored once on the session and attached when streamed
+    if status == 'completed':
+        publish_event(session_id, {'status': 'completed'})
+    else:
+        publish_event(session_id, {'status': status, 'error': error})
+
+# Queue positions last published by this process
+published_positions = {}
+published_positions_lock = threading.Lock()
+
+def publish_queue_positions():
+    """Tell every session waiting in this process's queue its new position"""
+    positions = executor.queued_positions()
+    with published_positions_lock:
+        changed = {sid: pos for sid, pos in positions.items() if published_positions.get(sid) != pos}
+        published_positions.clear()
+        published_positions.update(positions)
+
+    for session_id, position in changed.items():
+        try:
+            session_store.update(session_id, queuePosition=position)
+        except SessionNotFound:
+            continue
+        publish_event(session_id, {'status': 'queued', 'queuePosition': position})
+
+# Latency histograms and counters exposed on /api/metrics
+stage_duration = Histogram(
+    'uhi_stage_duration_seconds', 'Wall time of each analysis pipeline stage', ['stage']
+)
+analysis_duration = Histogram(
+    'uhi_analysis_duration_seconds', 'Wall time of complete analyses', ['status']
+)
+analyses_total = Counter('uhi_analyses_total', 'Finished analyses by outcome', ['status'])
+
+class AnalysisCancelled(Exception):
+    pass
+
+def finish_batch_locations(batch_id, status, error):
+    """Close every location of a batch that never started"""
+    for session_id in session_store.children(batch_id):
+        session = session_store.get(session_id)
+        if session is not None and session['status'] not in TERMINAL_STATUSES:
+            finish_session(session_id, status, error=error)
+
+def cancel_requested(session_id, session=None):
+    """Whether the client asked to stop this analysis or the batch it belongs to"""
+    session = session or session_store.get(session_id)
+    if session is not None and session['cancelRequested']:
+        return True
+    parent = session_store.parent(session_id)
+    if parent is not None:
+        batch = session_store.get(parent[0])
+        return bool(batch and batch['cancelRequested'])
+    return False
+
+def check_cancelled(session_id):
+    """Raise AnalysisCancelled if the client asked to stop this analysis"""
+    if cancel_requested(session_id):
+        raise AnalysisCancelled('Analysis cancelled by client')
+
+@contextmanager
+def stage_span(session_id, stage):
+    """Time a pipeline stage and record it on the session as a structured span.
+
+    The yielded dict can be annotated with extra fields such as rows or bytes.
+    """
+    check_cancelled(session_id)
+    span = {'stage': stage, 'start': datetime.now().isoformat(timespec='milliseconds')}
+    started = time.perf_counter()
+    try:
+        yield span
+        span['status'] = 'ok'
+    except Exception:
+        span['status'] = 'error'
+        raise
+    finally:
+        duration = time.perf_counter() - started
+        span['end'] = datetime.now().isoformat(timespec='milliseconds')
+        span['durationMs'] = round(duration * 1000, 2)
+        stage_duration.observe(duration, stage=stage)
+        session_store.append_timing(session_id, span)
+
 # Configuration
 GEE_PROJECT_ID = os.getenv("GEE_PROJECT_ID", "gen-lang-client-0612311886")
+# 'earthengine' for production, 'local' to run on .npz scenes from LOCAL_SCENES_DIR
+ANALYSIS_BACKEND = os.getenv("ANALYSIS_BACKEND", "earthengine")
+LOCAL_SCENES_DIR = os.getenv("LOCAL_SCENES_DIR", "fixtures/scenes")
+CACHE_DIR = os.getenv("CACHE_DIR", "cache")
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", 7 * 24 * 3600))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", 200))
+RESULT_CACHE_MAX_MB = int(os.getenv("RESULT_CACHE_MAX_MB", 512))
+# Analysis worker pool: concurrent analyses, total queued jobs and queued jobs per client
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", 2))
+ANALYSIS_QUEUE_SIZE = int(os.getenv("ANALYSIS_QUEUE_SIZE", 20))
+ANALYSIS_MAX_PER_CLIENT = int(os.getenv("ANALYSIS_MAX_PER_CLIENT", 3))
+# Coordinates are snapped to this grid (in degrees) before hashing, ~100 m by default
+RESULT_CACHE_GRID = float(os.getenv("RESULT_CACHE_GRID", 0.001))
+# 'memory' keeps sessions per process, 'sqlite' shares them across gunicorn workers
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")
+SESSION_TTL = int(os.getenv("SESSION_TTL", 3600))
+SESSION_MAX = int(os.getenv("SESSION_MAX", 1000))
+SESSION_MAX_MB = int(os.getenv("SESSION_MAX_MB", 256))
+# 'html' embeds a rendered Folium map in the result, 'geojson' leaves map
+# rendering to the client and builds the Folium file only on download
+OUTPUT_MODES = ('html', 'geojson')
+DEFAULT_OUTPUT_MODE = os.getenv("DEFAULT_OUTPUT_MODE", "html")
+# Upper bound on priority zones, for fixed and automatically chosen counts
+CLUSTER_MAX_K = int(os.getenv("CLUSTER_MAX_K", 10))
+# Weights of the zone priority score components, e.g. "heat=0.5,size=0.3,vegetation=0.2"
+ZONE_SCORE_WEIGHTS = parse_score_weights(os.getenv("ZONE_SCORE_WEIGHTS", "heat=0.5,size=0.3,vegetation=0.2"))
+# Planting sites picked per analysis (0 disables), the most a request may ask for, and
+# the cooling radius in metres each site covers
+PLANTING_SITES = int(os.getenv("PLANTING_SITES", 10))
+PLANTING_SITES_MAX = int(os.getenv("PLANTING_SITES_MAX", 500))
+COOLING_RADIUS_M = int(os.getenv("COOLING_RADIUS_M", 100))
+# Region of interest: default and largest radius (m) and the polygon size limit
+ROI_RADIUS = int(os.getenv("ROI_RADIUS", 5000))
+ROI_MAX_RADIUS = int(os.getenv("ROI_MAX_RADIUS", 30000))
+ROI_MAX_SPAN_DEGREES = float(os.getenv("ROI_MAX_SPAN_DEGREES", 0.6))
+# Hotspot extraction: default and largest global sample cap, tiling and fetch concurrency
+HOTSPOT_MAX_POINTS = int(os.getenv("HOTSPOT_MAX_POINTS", 2000))
+HOTSPOT_POINTS_LIMIT = int(os.getenv("HOTSPOT_POINTS_LIMIT", 100000))
+TILE_SIZE_M = int(os.getenv("TILE_SIZE_M", 5000))
+TILE_MAX_POINTS = int(os.getenv("TILE_MAX_POINTS", 4000))
+TILE_WORKERS = int(os.getenv("TILE_WORKERS", 4))
+# 'points' samples hotspot pixels, 'grid' reduces them to per-cell statistics
+EXTRACTION_MODES = ('points', 'grid')
+GRID_CELL_SIZE = int(os.getenv("GRID_CELL_SIZE", 250))
+# Hotspot rows per hotspots-chunk event streamed before the analysis completes
+HOTSPOT_CHUNK_SIZE = int(os.getenv("HOTSPOT_CHUNK_SIZE", 5000))
+# Hotspot table exports: Arrow files kept on disk and their capacity
+EXPORT_DIR = os.getenv("EXPORT_DIR", os.path.join(CACHE_DIR, 'exports'))
+EXPORT_MAX_FILES = int(os.getenv("EXPORT_MAX_FILES", 500))
+EXPORT_MAX_MB = int(os.getenv("EXPORT_MAX_MB", 1024))
+# Rendered Folium maps: hash-named files with compressed variants, least recently used removed first
+MAP_DIR = os.getenv("MAP_DIR", os.path.join(CACHE_DIR, 'maps'))
+MAP_STORE_MAX_FILES = int(os.getenv("MAP_STORE_MAX_FILES", 1000))
+MAP_STORE_MAX_MB = int(os.getenv("MAP_STORE_MAX_MB", 512))
+MAP_CACHE_MAX_AGE = int(os.getenv("MAP_CACHE_MAX_AGE", 24 * 3600))
+# Raster overlay tiles: deepest zoom, LST colour range (°C), browser cache lifetime and disk cache size
+TILE_MAX_ZOOM = int(os.getenv("TILE_MAX_ZOOM", 18))
+TILE_LST_RANGE = tuple(float(value) for value in os.getenv("TILE_LST_RANGE", "20,50").split(','))
+TILE_CACHE_MAX_AGE = int(os.getenv("TILE_CACHE_MAX_AGE", 24 * 3600))
+TILE_CACHE_MAX_MB = int(os.getenv("TILE_CACHE_MAX_MB", 512))
+# Processed images kept in memory for rendering tiles
+TILE_IMAGES = int(os.getenv("TILE_IMAGES", 4))
+# Batch analyses: locations per request and most locations of one batch queued or running at once
+BATCH_MAX_LOCATIONS = int(os.getenv("BATCH_MAX_LOCATIONS", 50))
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", 4))
+# Temporal compositing: 'none' analyses the least cloudy scene, 'median' or
+# 'p0'..'p100' reduce every scene passing the cloud filter per pixel
+DEFAULT_COMPOSITE = os.getenv("DEFAULT_COMPOSITE", "none")
+COMPOSITE_MAX_SCENES = int(os.getenv("COMPOSITE_MAX_SCENES", 40))
+# Time series: longest date range and most scenes reduced per request
+TIMESERIES_MAX_YEARS = int(os.getenv("TIMESERIES_MAX_YEARS", 10))
+TIMESERIES_MAX_SCENES = int(os.getenv("TIMESERIES_MAX_SCENES", 500))
+TIMESERIES_FREQUENCIES = ('month', 'scene')
+# Local scene metadata index answering Earth Engine scene selection
+SCENE_INDEX = os.getenv("SCENE_INDEX", "1") not in ("0", "false", "no")
+SCENE_INDEX_REFRESH = int(os.getenv("SCENE_INDEX_REFRESH", 6 * 3600))
+SCENE_INDEX_CELL_DEGREES = float(os.getenv("SCENE_INDEX_CELL_DEGREES", 1.0))
+# Concurrent backend requests, and retries with exponential backoff on Earth Engine quota errors
+EE_REQUEST_WORKERS = int(os.getenv("EE_REQUEST_WORKERS", 8))
+EE_RETRY_ATTEMPTS = int(os.getenv("EE_RETRY_ATTEMPTS", 5))
+EE_RETRY_BASE_DELAY = float(os.getenv("EE_RETRY_BASE_DELAY", 1.0))
+# Earth Engine authentication runs in the background, retried with backoff starting at this delay
+EE_INIT_RETRY_DELAY = float(os.getenv("EE_INIT_RETRY_DELAY", 2.0))
+# Import the heavy analysis modules in the background right after startup
+PRELOAD_IMPORTS = os.getenv("PRELOAD_IMPORTS", "1") not in ("0", "false", "no")
+
+session_store = get_session_store(
+    SESSION_STORE,
+    os.path.join(CACHE_DIR, 'sessions.sqlite3'),
+    ttl=SESSION_TTL,
+    max_sessions=SESSION_MAX,
+    max_bytes=SESSION_MAX_MB * 1024 * 1024
+)
+
+# Queued and running jobs are lost with the process that held them, e.g. a
+# recycled gunicorn worker; close their sessions instead of leaving them waiting.
+# Running workers repeat this check on every session store heartbeat
+orphaned_sessions = session_store.fail_orphaned()
+if orphaned_sessions:
+    print(f"Failed {len(orphaned_sessions)} analyses left unfinished by exited workers")
+
+executor = AnalysisExecutor(
+    max_workers=ANALYSIS_WORKERS,
+    max_queue=ANALYSIS_QUEUE_SIZE,
+    max_per_client=ANALYSIS_MAX_PER_CLIENT,
+    on_change=lambda: publish_queue_positions()
+)
+
+export_store = ExportStore(EXPORT_DIR, max_files=EXPORT_MAX_FILES, max_bytes=EXPORT_MAX_MB * 1024 * 1024)
+
+map_store = MapStore(MAP_DIR, max_bytes=MAP_STORE_MAX_MB * 1024 * 1024, max_files=MAP_STORE_MAX_FILES)
+
+# Completed results keyed by a hash of the normalized analysis parameters
+result_cache = DiskCache(
+    os.path.join(CACHE_DIR, 'results.sqlite3'),
+    namespace='results',
+    ttl=RESULT_CACHE_TTL,
+    max_entries=RESULT_CACHE_MAX_ENTRIES,
+    max_bytes=RESULT_CACHE_MAX_MB * 1024 * 1024
+)
+
+# Earth Engine intermediates, cached per layer so that changing one parameter
+# only recomputes the layers that actually depend on it
+INTERMEDIATE_CACHE_TTL = int(os.getenv("INTERMEDIATE_CACHE_TTL", 30 * 24 * 3600))
+intermediate_caches = {
+    'scenes': DiskCache(
+        os.path.join(CACHE_DIR, 'intermediates.sqlite3'),
+        namespace='scenes',
+        ttl=INTERMEDIATE_CACHE_TTL,
+        max_entries=int(os.getenv("SCENE_CACHE_MAX_ENTRIES", 5000))
+    ),
+    'hotspots': DiskCache(
+        os.path.join(CACHE_DIR, 'intermediates.sqlite3'),
+        namespace='hotspots',
+        ttl=INTERMEDIATE_CACHE_TTL,
+        max_entries=int(os.getenv("HOTSPOT_CACHE_MAX_ENTRIES", 500)),
+        max_bytes=int(os.getenv("HOTSPOT_CACHE_MAX_MB", 256)) * 1024 * 1024
+    ),
+    'lstRange': DiskCache(
+        os.path.join(CACHE_DIR, 'intermediates.sqlite3'),
+        namespace='lstRange',
+        ttl=INTERMEDIATE_CACHE_TTL,
+        max_entries=int(os.getenv("LST_RANGE_CACHE_MAX_ENTRIES", 5000))
+    ),
+    # Finished time series periods per location, grown by each request
+    'timeseries': DiskCache(
+        os.path.join(CACHE_DIR, 'intermediates.sqlite3'),
+        namespace='timeseries',
+        ttl=INTERMEDIATE_CACHE_TTL,
+        max_entries=int(os.getenv("TIMESERIES_CACHE_MAX_ENTRIES", 1000))
+    ),
+    # Rendered overlay tiles, shared by every analysis of the same scene and thresholds
+    'tiles': DiskCache(
+        os.path.join(CACHE_DIR, 'tiles.sqlite3'),
+        namespace='tiles',
+        ttl=INTERMEDIATE_CACHE_TTL,
+        max_entries=int(os.getenv("TILE_CACHE_MAX_ENTRIES", 200000)),
+        max_bytes=TILE_CACHE_MAX_MB * 1024 * 1024
+    )
+}
+
+# Scene and thresholds behind each tile source key handed out with a result
+tile_sources = DiskCache(
+    os.path.join(CACHE_DIR, 'tiles.sqlite3'),
+    namespace='tileSources',
+    ttl=INTERMEDIATE_CACHE_TTL,
+    max_entries=int(os.getenv("TILE_SOURCE_MAX_ENTRIES", 10000))
+)
+tile_images = OrderedDict()
+tile_images_lock = threading.Lock()
+
+# Identical intermediates requested by concurrent analyses are computed once
+ee_requests = RequestCoalescer(max_workers=EE_REQUEST_WORKERS)
+
+def _layer_request(layer, params, compute, use_cache):
+    """Cache key of an intermediate, its cached value and a function computing and storing it"""
+    cache = intermediate_caches[layer]
+    key = make_cache_key(layer, params)
+    value = cache.get(key) if use_cache else None
+
+    def compute_and_store():
+        value = compute()
+        if value is not None:
+            try:
+                cache.set(key, value)
+            except Exception as e:
+                print(f"Failed to cache {layer} entry: {e}")
+        return value
+
+    return key, value, compute_and_store
+
+def cached_layer(layer, params, compute, use_cache=True):
+    """Return an intermediate from its cache layer, computing and storing it on a miss.
+
+    A miss joins an identical computation already in flight rather than
+    starting a second one.
+    """
+    key, value, compute_and_store = _layer_request(layer, params, compute, use_cache)
+    if value is not None:
+        return value
+    return ee_requests.run(key, compute_and_store)
+
+def cached_layer_async(layer, params, compute, use_cache=True):
+    """Like cached_layer, but returns a future and computes on the request pool"""
+    key, value, compute_and_store = _layer_request(layer, params, compute, use_cache)
+    if value is not None:
+        future = Future()
+        future.set_result(value)
+        return future
+    return ee_requests.submit(key, compute_and_store)
+
+def remember_tile_image(source_key, image):
+    with tile_images_lock:
+        tile_images[source_key] = image
+        tile_images.move_to_end(source_key)
+        while len(tile_images) > TILE_IMAGES:
+            tile_images.popitem(last=False)
+
+def register_tile_source(source, processed_image=None):
+    """Key under which /api/tiles renders overlays of a scene or composite"""
+    source_key = make_cache_key('tileSource', source)[:32]
+    try:
+        tile_sources.set(source_key, source)
+    except Exception as e:
+        print(f"Failed to register tile source {source_key}: {e}")
+        return None
+    if processed_image is not None:
+        remember_tile_image(source_key, processed_image)
+    return source_key
+
+def tile_source_image(source_key, source):
+    """Processed image of a tile source, rebuilt once and kept for the following tiles"""
+    with tile_images_lock:
+        image = tile_images.get(source_key)
+        if image is not None:
+            tile_images.move_to_end(source_key)
+            return image
+
+    def build():
+        if 'scenes' in source:
+            return backend.composite_indices(source['scenes'], source['dataset'], source['composite'])
+        return backend.compute_indices(backend.load_scene(source['scene']), source['dataset'])
+
+    image = ee_requests.run(('tileImage', source_key), build)
+    remember_tile_image(source_key, image)
+    return image
+
+def snap_to_grid(value, grid=RESULT_CACHE_GRID):
+    """Round a coordinate to the cache grid so nearby requests share an entry"""
+    if not grid:
+        return round(value, 6)
+    return round(round(value / grid) * grid, 6)
+
+def normalize_analysis_params(latitude, longitude, start_date, end_date,
+                              cloud_cover, hot_threshold, veg_threshold, dataset):
+    """Canonical form of the analysis parameters used for cache keys"""
+    return {
+        'lat': snap_to_grid(latitude),
+        'lon': snap_to_grid(longitude),
+        'start': start_date,
+        'end': end_date,
+        'cloudCover': int(cloud_cover),
+        'hotThreshold': round(float(hot_threshold), 2),
+        'vegThreshold': round(float(veg_threshold), 3),
+        'dataset': dataset.strip().upper(),
+        'backend': backend.name
+    }
+
+def hotspot_columns(df):
+    """Column-oriented hotspot table with coordinates rounded to ~1 m"""
+    columns = {
+        'lat': df['lat'].round(5).tolist(),
+        'lon': df['lon'].round(5).tolist(),
+        'cluster': df['cluster'].astype(int).tolist()
+    }
+    if 'LST_Celsius' in df.columns:
+        columns['lst'] = df['LST_Celsius'].round(2).tolist()
+    if 'NDVI' in df.columns:
+        columns['ndvi'] = df['NDVI'].round(3).tolist()
+    if 'hotspotPixels' in df.columns:
+        columns['count'] = df['hotspotPixels'].astype(int).tolist()
+    return columns
+
+def hotspot_geojson(columns, zones, sites=None):
+    """GeoJSON FeatureCollection of hotspot points, priority zone centers and planting sites"""
+    features = []
+    for i in range(len(columns['lat'])):
+        properties = {'kind': 'hotspot', 'cluster': columns['cluster'][i] + 1}
+        if 'lst' in columns:
+            properties['lst'] = columns['lst'][i]
+        if 'ndvi' in columns:
+            properties['ndvi'] = columns['ndvi'][i]
+        if 'count' in columns:
+            properties['hotspotPixels'] = columns['count'][i]
+        features.append({
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [columns['lon'][i], columns['lat'][i]]},
+            'properties': properties
+        })
+
+    for zone in zones:
+        features.append({
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [round(zone['lon'], 5), round(zone['lat'], 5)]},
+            'properties': dict({k: v for k, v in zone.items() if k not in ('lat', 'lon')}, kind='zone')
+        })
+
+    for site in sites or []:
+        features.append({
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [site['lon'], site['lat']]},
+            'properties': dict({k: v for k, v in site.items() if k not in ('lat', 'lon')}, kind='site')
+        })
+
+    return {'type': 'FeatureCollection', 'features': features}
+
+def embed_map_html(page, figure):
+    """The notebook embed Folium's _repr_html_ produces, built from an already rendered page"""
+    return (
+        f'<div style="width:{figure.width};">'
+        f'<div style="position:relative;width:100%;height:0;padding-bottom:{figure.ratio};">'
+        f'<iframe srcdoc="{escape(page)}" style="position:absolute;width:100%;height:100%;left:0;top:0;'
+        'border:none !important;" allowfullscreen webkitallowfullscreen mozallowfullscreen>'
+        '</iframe></div></div>'
+    )
+
+def build_folium_map(latitude, longitude, lats, lons, centers, sites=None):
+    """Folium map with the hotspots as one vectorized layer plus a marker per priority zone"""
+    m = folium.Map(location=[latitude, longitude], zoom_start=12, prefer_canvas=True)
+
+    # Candidate points: a single MultiPoint feature built straight from the
+    # coordinate arrays, drawn by Leaflet as circle markers on one canvas
+    coordinates = np.column_stack([np.asarray(lons, dtype=float), np.asarray(lats, dtype=float)])
+    folium.GeoJson(
+        {
+            'type': 'Feature',
+            'geometry': {'type': 'MultiPoint', 'coordinates': coordinates.tolist()},
+            'properties': {}
+        },
+        name='Potential hotspots',
+        marker=folium.CircleMarker(radius=2, color='red', fill=True, fill_opacity=0.6),
+        tooltip="Potential hotspot"
+    ).add_to(m)
+
+    # Add priority zones (green markers)
+    for i, (lat, lon) in enumerate(centers):
+        maps_url = f"https://www.google.com/maps?q={lat},{lon}"
+
+        folium.Marker(
+            location=[lat, lon],
+            popup=(
+                f"<b>Priority Planting Zone #{i+1}</b><br>"
+                f"Center of Heat Cluster<br>"
+                f"<a href='{maps_url}' target='_blank'>"
+                f"({lat:.5f}, {lon:.5f})"
+                f"</a>"
+            ),
+            icon=folium.Icon(color='green', icon='tree', prefix='fa')
+        ).add_to(m)
+
+    # Ranked planting sites, actual hotspot pixels picked for heat coverage
+    for site in sites or []:
+        folium.CircleMarker(
+            location=[site['lat'], site['lon']],
+            radius=6,
+            color='darkgreen',
+            fill=True,
+            fill_color='lime',
+            fill_opacity=0.9,
+            tooltip=f"Planting site #{site['rank']} (zone {site['zoneId']})"
+        ).add_to(m)
+
+    return m
 
 # ratelimiting 
 limiter = Limiter(
@@ -113,12 +634,43 @@ def authenticate_gee(project_id):
         traceback.print_exc()
         raise RuntimeError(f"Failed to authenticate with GEE: {auth_error}")
 
-try:
-    authenticate_gee(GEE_PROJECT_ID)
-    GEE_INITIALIZED = True
-except Exception as e:
-    print(f"GEE authentication failed at startup: {e}\n")
-    GEE_INITIALIZED = False
+backend = get_backend(
+    ANALYSIS_BACKEND, LOCAL_SCENES_DIR,
+    num_pixels=HOTSPOT_MAX_POINTS,
+    tile_size=TILE_SIZE_M,
+    tile_max_points=TILE_MAX_POINTS,
+    tile_workers=TILE_WORKERS
+)
+
+if backend.name == 'earthengine':
+    backend.retry_attempts = EE_RETRY_ATTEMPTS
+    backend.retry_base_delay = EE_RETRY_BASE_DELAY
+    if SCENE_INDEX:
+        backend.scene_index = SceneIndex(
+            os.path.join(CACHE_DIR, 'scenes.sqlite3'),
+            backend.scene_metadata,
+            cell_degrees=SCENE_INDEX_CELL_DEGREES,
+            refresh_interval=SCENE_INDEX_REFRESH
+        )
+
+    def mark_initialized():
+        backend.initialized = True
+
+    # The worker serves /api/health and /api/ready while Earth Engine authenticates
+    ee_initializer = BackgroundInitializer(
+        lambda: authenticate_gee(GEE_PROJECT_ID),
+        on_ready=mark_initialized,
+        base_delay=EE_INIT_RETRY_DELAY,
+        name='Earth Engine initialization'
+    ).start()
+else:
+    print(f"Using {backend.name} analysis backend, Earth Engine authentication skipped")
+    ee_initializer = None
+
+if PRELOAD_IMPORTS:
+    from clustering import sklearn_cluster, sklearn_metrics
+    from backends import geemap
+    preload([sklearn_cluster, sklearn_metrics, folium] + ([geemap] if backend.name == 'earthengine' else []))
 
 
 #######################################################################
@@ -181,6 +733,53 @@ def validate_dates(start_date, end_date):
     except ValueError as e:
         raise ValueError(f"Invalid date format or range: {e}")
         
+def validate_timeseries_dates(start_date, end_date):
+    """Validate a time series range, which may span several years"""
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d")
+        end = datetime.strptime(end_date, "%Y-%m-%d")
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Dates must be YYYY-MM-DD: {e}")
+
+    if start >= end:
+        raise ValueError("Start date must be before end date")
+    if (end - start).days > TIMESERIES_MAX_YEARS * 366:
+        raise ValueError(f"Date range cannot exceed {TIMESERIES_MAX_YEARS} years")
+    return start, end
+
+def month_periods(start, end):
+    """Calendar months overlapping [start, end), as {'period', 'start', 'end'} dicts"""
+    periods = []
+    year, month = start.year, start.month
+    while datetime(year, month, 1) < end:
+        next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+        periods.append({
+            'period': f"{year:04d}-{month:02d}",
+            'start': f"{year:04d}-{month:02d}-01",
+            'end': f"{next_year:04d}-{next_month:02d}-01"
+        })
+        year, month = next_year, next_month
+    return periods
+
+def empty_period_row(period, **fields):
+    """Time series row for a period or scene the backend returned no statistics for"""
+    return dict(period, scenes=0, lstMean=None, lstPercentile=None, hotspotFraction=None, **fields)
+
+def heat_trend(rows):
+    """Least squares slope of mean LST and hotspot share per year over the rows with data"""
+    trend = {}
+    for field, name in (('lstMean', 'lstPerYear'), ('hotspotFraction', 'hotspotFractionPerYear')):
+        points = [
+            (datetime.strptime(row['start'], "%Y-%m-%d").toordinal() / 365.25, row[field])
+            for row in rows if row.get(field) is not None
+        ]
+        if len(points) < 2 or len({x for x, _ in points}) < 2:
+            trend[name] = None
+            continue
+        x, y = np.array(points).T
+        trend[name] = round(float(np.polyfit(x, y, 1)[0]), 4)
+    return trend
+
 def validate_thresholds(cloude_cover, hot_threshold, veg_threshold):
     if not (0 <= cloud_cover <= 100):
         raise ValueError(f"Cloude cover must be 0-100%, got {cloude_cover}")
@@ -191,6 +790,99 @@ def validate_thresholds(cloude_cover, hot_threshold, veg_threshold):
     
     return True
 
+def parse_analysis_options(data):
+    """Validated optional analysis settings, keyed like the _run_analysis arguments"""
+    cloud_cover = int(data.get('cloudCover', 20))
+    hot_threshold = float(data.get('hotThreshold', 37))
+    veg_threshold = float(data.get('vegThreshold', 0.2))
+    dataset = data.get('dataset', 'LANDSAT/LC09/C02/T1_L2')
+    output_mode = data.get('outputMode', DEFAULT_OUTPUT_MODE)
+    n_clusters = data.get('clusters', DEFAULT_CLUSTERS)
+    weight_by_temperature = bool(data.get('weightByTemperature', False))
+    max_points = int(data.get('maxPoints', HOTSPOT_MAX_POINTS))
+    if not (1 <= max_points <= HOTSPOT_POINTS_LIMIT):
+        raise ValueError(f"maxPoints must be between 1 and {HOTSPOT_POINTS_LIMIT}")
+    extraction = data.get('extraction', 'points')
+    if extraction not in EXTRACTION_MODES:
+        raise ValueError(f"extraction must be one of {', '.join(EXTRACTION_MODES)}")
+    grid_size = int(data.get('gridSize', GRID_CELL_SIZE))
+    if not (PIXEL_SCALE <= grid_size <= 5000):
+        raise ValueError(f"gridSize must be between {PIXEL_SCALE} and 5000 m")
+    composite = validate_composite(data.get('composite', DEFAULT_COMPOSITE))
+    planting_sites = int(data.get('plantingSites', PLANTING_SITES))
+    if not (0 <= planting_sites <= PLANTING_SITES_MAX):
+        raise ValueError(f"plantingSites must be between 0 and {PLANTING_SITES_MAX}")
+    cooling_radius = float(data.get('coolingRadius', COOLING_RADIUS_M))
+    if not (PIXEL_SCALE <= cooling_radius <= 2000):
+        raise ValueError(f"coolingRadius must be between {PIXEL_SCALE} and 2000 m")
+    score_weights = parse_score_weights(data.get('scoreWeights', ZONE_SCORE_WEIGHTS))
+
+    if cloud_cover < 0 or cloud_cover > 100:
+        raise ValueError("cloudCover must be between 0 and 100")
+    if hot_threshold < 0:
+        raise ValueError("hotThreshold must be >= 0")
+    if not (0 <= veg_threshold <= 1):
+        raise ValueError("vegThreshold must be between 0 and 1")
+
+    dataset = validate_dataset(dataset)
+    if output_mode not in OUTPUT_MODES:
+        raise ValueError(f"outputMode must be one of {', '.join(OUTPUT_MODES)}")
+    if n_clusters != 'auto':
+        n_clusters = int(n_clusters)
+        if not (1 <= n_clusters <= CLUSTER_MAX_K):
+            raise ValueError(f"clusters must be 'auto' or between 1 and {CLUSTER_MAX_K}")
+
+    return {
+        'cloud_cover': cloud_cover,
+        'hot_threshold': hot_threshold,
+        'veg_threshold': veg_threshold,
+        'dataset': dataset,
+        'output_mode': output_mode,
+        'n_clusters': n_clusters,
+        'weight_by_temperature': weight_by_temperature,
+        'max_points': max_points,
+        'extraction': extraction,
+        'grid_size': grid_size,
+        'composite': composite,
+        'score_weights': score_weights,
+        'planting_sites': planting_sites,
+        'cooling_radius': cooling_radius
+    }
+
+def validate_composite(composite):
+    """'none', 'median' or a percentile written as 'p0'..'p100'"""
+    composite = str(composite or 'none').strip().lower()
+    if composite in ('none', 'median'):
+        return composite
+    if composite.startswith('p') and composite[1:].isdigit() and 0 <= int(composite[1:]) <= 100:
+        return f"p{int(composite[1:])}"
+    raise ValueError("composite must be 'none', 'median' or a percentile such as 'p75'")
+
+def validate_region(data):
+    """Radius in metres and optional polygon ring of [lon, lat] vertices from the request"""
+    polygon = data.get('polygon')
+    if polygon is not None:
+        # Accept a GeoJSON Polygon geometry or a bare outer ring
+        if isinstance(polygon, dict):
+            if polygon.get('type') != 'Polygon':
+                raise ValueError("polygon must be a GeoJSON Polygon")
+            polygon = polygon.get('coordinates', [None])[0]
+        if not isinstance(polygon, list) or len(polygon) < 3:
+            raise ValueError("polygon must have at least 3 [lon, lat] vertices")
+        polygon = [[float(vertex[0]), float(vertex[1])] for vertex in polygon]
+        for lon, lat in polygon:
+            validate_coordinates(lat, lon)
+        lons = [lon for lon, _ in polygon]
+        lats = [lat for _, lat in polygon]
+        if max(lons) - min(lons) > ROI_MAX_SPAN_DEGREES or max(lats) - min(lats) > ROI_MAX_SPAN_DEGREES:
+            raise ValueError(f"polygon cannot span more than {ROI_MAX_SPAN_DEGREES} degrees")
+
+    radius = int(data.get('radius', ROI_RADIUS))
+    if not (100 <= radius <= ROI_MAX_RADIUS):
+        raise ValueError(f"radius must be between 100 and {ROI_MAX_RADIUS} m")
+
+    return radius, polygon
+
 def validate_dataset(dataset):
     """Validate dataset parameter"""
     if not dataset or not isinstance(dataset, str):
@@ -204,110 +896,6 @@ def validate_dataset(dataset):
     
     return dataset
 
-def get_satellite_data(
-    lat,
-    lon,
-    start,
-    end,
-    cloud_cover_threshold,
-    dataset
-):
-    point = ee.Geometry.Point(lon, lat)
-    
-    try:
-        # Create image collection from the specified dataset
-        collection = ee.ImageCollection(dataset).filterBounds(point).filterDate(start, end)
-        
-        # Apply cloud cover filter if dataset has CLOUD_COVER property
-        try:
-            collection = collection.filter(ee.Filter.lt("CLOUD_COVER", cloud_cover_threshold))
-        except:
-            # Some datasets use different cloud cover property names
-            try:
-                collection = collection.filter(ee.Filter.lt("CLOUDY_PIXEL_PERCENTAGE", cloud_cover_threshold))
-            except:
-                # If no cloud cover property, just proceed without filtering
-                pass
-        
-        # Sort by cloud cover if available
-        try:
-            collection = collection.sort("CLOUD_COVER")
-        except:
-            try:
-                collection = collection.sort("CLOUDY_PIXEL_PERCENTAGE")
-            except:
-                pass
-        
-        image = collection.first()
-        if image is None:
-            raise ValueError(f"No imagery found in dataset '{dataset}' for the given location and date range.")
-        
-        return image
-        
-    except Exception as e:
-        raise ValueError(f"Error accessing dataset '{dataset}': {str(e)}")
-
-def calculate_ndvi_lst(image, dataset):
-    try:
-        # Try Landsat bands first (most common)
-        if 'LANDSAT' in dataset.upper():
-            ndvi = image.normalizedDifference(['SR_B5', 'SR_B4']).rename('NDVI')
-            thermal = (
-                image.select('ST_B10')
-                .multiply(0.00341802)
-                .add(149.0)
-                .subtract(273.15)
-                .rename('LST_Celsius')
-            )
-        # Try Sentinel-2 bands
-        elif 'SENTINEL' in dataset.upper() or 'S2' in dataset.upper():
-            ndvi = image.normalizedDifference(['B8', 'B4']).rename('NDVI')
-            # Sentinel-2 doesn't have thermal, use NDVI as proxy
-            thermal = ndvi.multiply(-50).add(50).rename('LST_Celsius')
-        # Try MODIS bands
-        elif 'MODIS' in dataset.upper():
-            ndvi = image.select('NDVI').multiply(0.0001).rename('NDVI')
-            thermal = image.select('LST_Day_1km').multiply(0.02).subtract(273.15).rename('LST_Celsius')
-        else:
-            # Generic approach: try common band names
-            try:
-                ndvi = image.normalizedDifference(['B8', 'B4']).rename('NDVI')
-            except:
-                ndvi = image.normalizedDifference(['SR_B5', 'SR_B4']).rename('NDVI')
-            
-            try:
-                thermal = image.select('ST_B10').multiply(0.00341802).add(149.0).subtract(273.15).rename('LST_Celsius')
-            except:
-                thermal = ndvi.multiply(-50).add(50).rename('LST_Celsius')
-        
-        return image.addBands([ndvi, thermal])
-        
-    except Exception as e:
-        raise Exception(f"Error calculating NDVI/LST for dataset '{dataset}': {str(e)}")
-
-def extract_hotspots(processed_image, roi, hot_threshold, veg_threshold):
-    hotspots = processed_image.select('LST_Celsius').gt(hot_threshold) \
-        .And(processed_image.select('NDVI').lt(veg_threshold)) \
-        .And(processed_image.select('NDVI').gt(0))
-    
-    final_image = processed_image.updateMask(hotspots)
-    
-    vectors = final_image.sample(
-        region=roi,
-        scale=30,
-        numPixels=2000,
-        geometries=True
-    )
-    
-    return vectors
-
-def add_lat_lon(feature):
-    coords = feature.geometry().coordinates()
-    return feature.set({
-        'lon': coords.get(0),
-        'lat': coords.get(1)
-    })
-
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({
@@ -315,14 +903,28 @@ def health_check():
         'message': 'Urban Heat Island Analyzer API is running'
     }), 200
 
+@app.route('/api/ready', methods=['GET'])
+@limiter.exempt
+def readiness_check():
+    """Whether this worker can run analyses: Earth Engine authenticated or local scenes present"""
+    ready = backend.ready()
+    return jsonify({
+        'status': 'ready' if ready else 'starting',
+        'backend': backend.name,
+        'earthEngine': ee_initializer.status() if ee_initializer else None,
+        'importsMs': import_times()
+    }), 200 if ready else 503
+
 @app.route('/api/analyze', methods=['POST'])
 @limiter.limit("50 per minute")
 def analyze_heat_island():
     try:
-        if not GEE_INITIALIZED:
-            return jsonify({
-                'error': 'Google Earth Engine not initialized. Please try again later.'
-            }), 503
+        if not backend.ready():
+            if backend.name == 'earthengine':
+                message = 'Google Earth Engine not initialized. Please try again later.'
+            else:
+                message = f"Local scene directory '{LOCAL_SCENES_DIR}' not found."
+            return jsonify({'error': message}), 503
 
         data = request.get_json()
         if not data or not isinstance(data, dict):
@@ -353,47 +955,52 @@ def analyze_heat_island():
 
         # Optional parameters with defaults and validation
         try:
-            cloud_cover = int(data.get('cloudCover', 20))
-            hot_threshold = float(data.get('hotThreshold', 37))
-            veg_threshold = float(data.get('vegThreshold', 0.2))
-            dataset = data.get('dataset', 'LANDSAT/LC09/C02/T1_L2')
-
-            if cloud_cover < 0 or cloud_cover > 100:
-                raise ValueError("cloudCover must be between 0 and 100")
-            if hot_threshold < 0:
-                raise ValueError("hotThreshold must be >= 0")
-            if not (0 <= veg_threshold <= 1):
-                raise ValueError("vegThreshold must be between 0 and 1")
-            
-            dataset = validate_dataset(dataset)
+            options = parse_analysis_options(data)
         except (ValueError, TypeError) as e:
             return jsonify({'error': f'Invalid threshold values: {str(e)}'}), 400
 
+        try:
+            radius, polygon = validate_region(data)
+        except (ValueError, TypeError, IndexError) as e:
+            return jsonify({'error': f'Invalid region: {str(e)}'}), 400
+
+        # Serve repeated requests straight from the result cache
+        use_cache = not data.get('noCache', False)
+        cache_key = analysis_cache_key(latitude, longitude, start_date, end_date, options, radius, polygon)
+
+        cached = result_cache.get(cache_key) if use_cache else None
+        if cached is not None:
+            session_id = create_session(status='running')
+            restore_cached_result(session_id, cached, cache_key)
+            return jsonify({
+                'sessionId': session_id,
+                'cached': True,
+                'message': 'Cached analysis result available. Connect to /api/logs/<sessionId> to fetch it.'
+            }), 200
+
         # Create session for this analysis
-        session_id = get_session_id()
-        with sessions_lock:
-            analysis_sessions[session_id] = {
-                'logs': queue.Queue(),
-                'status': 'running',
-                'result': None,
-                'error': None
-            }
-        
-        # Start analysis in background thread
-        thread = threading.Thread(
-            target=_run_analysis,
-            args=(
-                session_id, latitude, longitude,
-                start_date, end_date, cloud_cover,
-                hot_threshold, veg_threshold, dataset
+        session_id = create_session()
+
+        # Queue analysis on the worker pool
+        try:
+            position = executor.submit(
+                session_id, get_remote_address(), functools.partial(
+                    _run_analysis, session_id, latitude, longitude, start_date, end_date,
+                    cache_key=cache_key, use_cache=use_cache, radius=radius, polygon=polygon, **options
+                )
             )
-        )
-        thread.daemon = True
-        thread.start()
-        
+        except QueueFullError as e:
+            finish_session(session_id, 'failed', error=str(e))
+            response = jsonify({'error': str(e), 'queued': e.queued})
+            response.headers['Retry-After'] = '30'
+            return response, e.status_code
+
+        stream_log(session_id, f"Analysis queued (position {position})")
+
         # Return session ID immediately
         return jsonify({
             'sessionId': session_id,
+            'queuePosition': position,
             'message': 'Analysis started. Connect to /api/logs/<sessionId> to stream logs.'
         }), 202
 
@@ -402,6 +1009,59 @@ def analyze_heat_island():
         return jsonify({'error': 'Internal server error during analysis.'}), 500
 
 
+def analysis_cache_key(latitude, longitude, start_date, end_date, options, radius, polygon):
+    """Result cache key for one analysis"""
+    params = normalize_analysis_params(
+        latitude, longitude, start_date, end_date,
+        options['cloud_cover'], options['hot_threshold'], options['veg_threshold'], options['dataset']
+    )
+    params.update(
+        outputMode=options['output_mode'],
+        clusters=options['n_clusters'],
+        weightByTemperature=options['weight_by_temperature'],
+        maxPoints=options['max_points'],
+        extraction=options['extraction'],
+        gridSize=options['grid_size'] if options['extraction'] == 'grid' else None,
+        composite=options['composite'],
+        scoreWeights=options['score_weights'],
+        plantingSites=options['planting_sites'],
+        coolingRadius=options['cooling_radius'],
+        **backend.region(latitude, longitude, radius, polygon).cache_params()
+    )
+    return make_cache_key('analysis', params)
+
+def save_result_map(result, hotspots):
+    """Render the downloadable Folium map of a result into the map store, returning its file name"""
+    latitude, longitude = result['center']['lat'], result['center']['lon']
+    m = build_folium_map(
+        latitude, longitude,
+        hotspots['lat'], hotspots['lon'],
+        # Map markers are numbered by zone id
+        [(zone['lat'], zone['lon']) for zone in sorted(result['priorityZones'], key=lambda zone: zone['id'])],
+        result.get('plantingSites')
+    )
+    return map_store.save(m.get_root().render())
+
+def restore_cached_result(session_id, cached, cache_key=None):
+    """Complete a session from a result cache entry"""
+    session_store.set_payload(session_id, 'hotspots', cached['hotspots'])
+    result = cached['result']
+    if result.get('mapFileName') and not map_store.exists(result['mapFileName']):
+        # The store evicted the map since the result was cached
+        result = dict(result, mapFileName=save_result_map(result, cached['hotspots']))
+        stream_log(session_id, f"✓ Map regenerated as {result['mapFileName']}")
+        if cache_key:
+            try:
+                result_cache.set(cache_key, dict(cached, result=result))
+                map_store.retain(result['mapFileName'], f"result:{cache_key}")
+            except Exception as e:
+                print(f"Failed to update cached result for session {session_id}: {e}")
+    if result.get('mapFileName'):
+        map_store.retain(result['mapFileName'], f"session:{session_id}")
+    stream_log(session_id, "✓ Loaded result from cache")
+    finish_session(session_id, 'completed', result=dict(result, cached=True, sessionId=session_id))
+
+
 def _run_analysis(
     session_id,
     latitude,
@@ -411,227 +1071,841 @@ def _run_analysis(
     cloud_cover,
     hot_threshold,
     veg_threshold,
-    dataset
+    dataset,
+    cache_key=None,
+    use_cache=True,
+    output_mode='html',
+    n_clusters=DEFAULT_CLUSTERS,
+    weight_by_temperature=False,
+    radius=ROI_RADIUS,
+    polygon=None,
+    max_points=None,
+    extraction='points',
+    grid_size=GRID_CELL_SIZE,
+    composite='none',
+    score_weights=None,
+    planting_sites=PLANTING_SITES,
+    cooling_radius=COOLING_RADIUS_M,
+    scene=None
 ):
+    """Run one analysis. scene is an optional (scene_id, processed_image) pair
+    that a batch has already selected and prepared for this location."""
+    session = session_store.get(session_id)
+    if session is None or session['status'] == 'cancelled':
+        return
+    if cancel_requested(session_id, session):
+        # Cancelled from another worker while it was waiting in this queue
+        finish_session(session_id, 'cancelled', error='Analysis cancelled by client')
+        analyses_total.inc(status='cancelled')
+        return
+    session_store.update(session_id, status='running', queuePosition=None)
+
+    analysis_started = time.perf_counter()
     try:
         stream_log(session_id, "Starting analysis...")
         stream_log(session_id, f"Processing analysis for (lat: {latitude}, lon: {longitude})...")
         stream_log(session_id, f"Using dataset: {dataset}")
 
-        # === Fetch satellite data ===
-        try:
-            stream_log(session_id, f"Fetching data from {dataset}...")
-            raw_image = get_satellite_data(
-                latitude,
-                longitude,
-                start_date,
-                end_date,
-                cloud_cover,
-                dataset
-            )
-            if raw_image is None:
-                raise ValueError('No valid imagery found for the given parameters.')
-            stream_log(session_id, "✓ Satellite data retrieved")
-        except ValueError as e:
-            raise ValueError(f'Invalid parameters for satellite data: {str(e)}')
+        params = normalize_analysis_params(
+            latitude, longitude, start_date, end_date,
+            cloud_cover, hot_threshold, veg_threshold, dataset
+        )
+        roi = backend.region(latitude, longitude, radius, polygon)
+        # Every intermediate key names the backend, as backends may share a cache directory
+        roi_params = dict({'lat': params['lat'], 'lon': params['lon'], 'backend': params['backend']}, **roi.cache_params())
+        max_points = max_points or HOTSPOT_MAX_POINTS
+        scene_params = {k: params[k] for k in ('lat', 'lon', 'start', 'end', 'cloudCover', 'dataset', 'backend')}
+        scene_count = 1
+        tile_scenes = None
+
+        if scene is None and composite != 'none':
+            # === Composite every scene passing the cloud filter ===
+            try:
+                stream_log(session_id, f"Fetching all scenes from {dataset} passing the cloud filter...")
+                with stage_span(session_id, 'scene_lookup') as span:
+                    scene_ids = cached_layer(
+                        'scenes',
+                        dict(scene_params, sceneSet=True),
+                        lambda: backend.select_scene_set(
+                            latitude, longitude, start_date, end_date, cloud_cover, dataset
+                        ),
+                        use_cache
+                    )
+                    # Least cloudy first, so the cap drops the worst scenes
+                    scene_ids = scene_ids[:COMPOSITE_MAX_SCENES]
+                    span['rows'] = len(scene_ids)
+                scene_count = len(scene_ids)
+                stream_log(session_id, f"✓ {scene_count} scenes selected for the {composite} composite")
+            except ValueError as e:
+                raise ValueError(f'Invalid parameters for satellite data: {str(e)}')
 
-        # === Calculate NDVI and LST ===
-        try:
-            stream_log(session_id, "Calculating NDVI (vegetation index)...")
-            stream_log(session_id, "Calculating LST (land surface temperature)...")
-            processed_image = calculate_ndvi_lst(raw_image, dataset)
-            if processed_image is None:
-                raise ValueError('Failed to process NDVI/LST from raw imagery.')
-            stream_log(session_id, "✓ NDVI and LST calculated")
-        except Exception as e:
-            raise Exception(f'Error during NDVI/LST calculation: {str(e)}')
+            try:
+                stream_log(session_id, "Masking clouds and compositing NDVI and LST per pixel...")
+                with stage_span(session_id, 'indices') as span:
+                    processed_image = backend.composite_indices(scene_ids, dataset, composite)
+                    span['rows'] = scene_count
+                scene_id = composite_id(scene_ids, composite)
+                tile_scenes = scene_ids
+                stream_log(session_id, "✓ NDVI and LST composited")
+            except Exception as e:
+                raise Exception(f'Error during NDVI/LST compositing: {str(e)}')
+        elif scene is None:
+            # === Fetch satellite data ===
+            try:
+                stream_log(session_id, f"Fetching data from {dataset}...")
+                with stage_span(session_id, 'scene_lookup'):
+                    scene_id = cached_layer(
+                        'scenes',
+                        scene_params,
+                        lambda: backend.select_scene(
+                            latitude,
+                            longitude,
+                            start_date,
+                            end_date,
+                            cloud_cover,
+                            dataset
+                        ),
+                        use_cache
+                    )
+                    raw_image = backend.load_scene(scene_id)
+                stream_log(session_id, f"✓ Satellite data retrieved (scene {scene_id})")
+            except ValueError as e:
+                raise ValueError(f'Invalid parameters for satellite data: {str(e)}')
+
+            # === Calculate NDVI and LST ===
+            try:
+                stream_log(session_id, "Calculating NDVI (vegetation index)...")
+                stream_log(session_id, "Calculating LST (land surface temperature)...")
+                with stage_span(session_id, 'indices'):
+                    processed_image = backend.compute_indices(raw_image, dataset)
+                if processed_image is None:
+                    raise ValueError('Failed to process NDVI/LST from raw imagery.')
+                stream_log(session_id, "✓ NDVI and LST calculated")
+            except Exception as e:
+                raise Exception(f'Error during NDVI/LST calculation: {str(e)}')
+        if scene is not None:
+            scene_id, processed_image = scene
+            stream_log(session_id, f"✓ Using scene {scene_id} shared with the batch")
+
+        # === Raster overlays, rendered on demand by /api/tiles ===
+        tile_source = register_tile_source(
+            dict(
+                {'scenes': tile_scenes, 'composite': composite} if tile_scenes else {'scene': scene_id},
+                dataset=dataset, hotThreshold=params['hotThreshold'], vegThreshold=params['vegThreshold'],
+                backend=params['backend']
+            ),
+            processed_image
+        )
 
-        # === Define ROI and extract hotspots ===
-        roi = ee.Geometry.Point(longitude, latitude).buffer(5000)
+        # === LST range, fetched while the hotspots are extracted ===
+        lst_range_future = cached_layer_async(
+            'lstRange',
+            dict(roi_params, scene=scene_id),
+            lambda: backend.lst_range(processed_image, roi),
+            use_cache
+        )
 
+        # === Extract hotspots tile by tile ===
+        def report_tile(done, total, count):
+            stream_log(session_id, f"Tile {done}/{total}: {count} hotspot pixels")
+
+        grid = extraction == 'grid'
         try:
             stream_log(session_id, "Extracting hotspots (areas with high temperature and low vegetation)...")
-            vectors = extract_hotspots(processed_image, roi, hot_threshold, veg_threshold)
-            if vectors is None:
-                raise ValueError('Hotspot extraction returned no features.')
+            if grid:
+                stream_log(session_id, f"Aggregating hotspots into {grid_size} m grid cells...")
+                layer_params = dict(roi_params, extraction='grid', cellSize=grid_size)
+                extract = lambda: backend.aggregate_hotspots(
+                    processed_image, roi, hot_threshold, veg_threshold, grid_size, report_tile
+                )
+            else:
+                stream_log(session_id, "Converting Earth Engine data to dataframe...")
+                layer_params = dict(roi_params, maxPoints=max_points)
+                extract = lambda: backend.sample_hotspots(
+                    processed_image, roi, hot_threshold, veg_threshold, max_points, report_tile
+                )
 
-            vectors_with_coords = vectors.map(add_lat_lon)
-            stream_log(session_id, "Converting Earth Engine data to dataframe...")
-            df = geemap.ee_to_df(vectors_with_coords)
+            with stage_span(session_id, 'hotspot_fetch') as span:
+                df = cached_layer(
+                    'hotspots',
+                    dict(layer_params, scene=scene_id, hotThreshold=params['hotThreshold'],
+                         vegThreshold=params['vegThreshold']),
+                    extract,
+                    use_cache
+                ).copy()  # Coalesced requests share the table, and clustering adds a column to it
+                span['rows'] = len(df)
 
             if df.empty:
                 raise ValueError('No hotspots found with current thresholds. Try lowering hotThreshold or vegThreshold.')
 
-            stream_log(session_id, f"✓ Extracted {len(df)} potential planting sites")
+            if grid:
+                stream_log(session_id, f"✓ Aggregated {int(df['hotspotPixels'].sum())} hotspot pixels into {len(df)} cells")
+            else:
+                stream_log(session_id, f"✓ Extracted {len(df)} potential planting sites")
         except Exception as e:
             raise Exception(f'Hotspot extraction failed: {str(e)}')
 
-        # === K-Means clustering ===
+        hotspots_found = int(df['hotspotPixels'].sum()) if grid else len(df)
+
+        # === Temperature statistics ===
         try:
-            stream_log(session_id, "Running K-Means clustering to group similar hotspots...")
-            X = df[['lat', 'lon']]
-            n_clusters = min(5, len(df))
-            if n_clusters < 1:
-                n_clusters = 1
-            kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-            df['cluster'] = kmeans.fit_predict(X)
-            centers = kmeans.cluster_centers_
-            stream_log(session_id, f"✓ Identified {n_clusters} priority zones")
-
-            # === Temperature statistics ===
             stream_log(session_id, "Calculating temperature statistics...")
-            lst_data = processed_image.select('LST_Celsius').reduceRegion(
-                reducer=ee.Reducer.minMax(),
-                geometry=roi,
-                scale=30
-            ).getInfo()
+            with stage_span(session_id, 'lst_range'):
+                lst_range = lst_range_future.result()
+
+            min_temp = lst_range['min']
+            max_temp = lst_range['max']
+            if min_temp is not None and max_temp is not None:
+                avg_temp = (min_temp + max_temp) / 2
+                stream_log(session_id, f"✓ Temperature range: {min_temp:.1f}°C - {max_temp:.1f}°C")
+            else:
+                avg_temp = None
+                stream_log(session_id, "✓ Temperature range unavailable for this region")
+        except Exception as e:
+            raise Exception(f'Temperature statistics failed: {str(e)}')
+
+        publish_partial(session_id, 'stats', {
+            'center': {'lat': latitude, 'lon': longitude},
+            'hotspotsFound': hotspots_found,
+            'minTemperature': round(min_temp, 2) if min_temp is not None else None,
+            'maxTemperature': round(max_temp, 2) if max_temp is not None else None,
+            'avgTemperature': round(avg_temp, 2) if avg_temp is not None else None
+        })
 
-            min_temp = lst_data.get('LST_Celsius_min', None)
-            max_temp = lst_data.get('LST_Celsius_max', None)
-            avg_temp = (min_temp + max_temp) / 2 if min_temp and max_temp else None
-            stream_log(session_id, f"✓ Temperature range: {min_temp:.1f}°C - {max_temp:.1f}°C")
+        # === K-Means clustering ===
+        try:
+            stream_log(session_id, "Running K-Means clustering to group similar hotspots...")
+            with stage_span(session_id, 'clustering') as span:
+                labels, centers, clustering = cluster_hotspots(
+                    df, n_clusters, weight_by_temperature, CLUSTER_MAX_K,
+                    weight_column='hotspotPixels' if grid else None
+                )
+                df['cluster'] = labels
+                span['rows'] = len(df)
+                span['method'] = clustering['method']
+            stream_log(session_id, f"✓ Identified {clustering['k']} priority zones ({clustering['method']})")
 
             # === Build priority zones ===
             stream_log(session_id, "Building priority zones list...")
-            priority_zones = []
-            for i, center in enumerate(centers):
-                lat, lon = center[0], center[1]
-                zone_data = df[df['cluster'] == i]
-
-                # each zone with its own temp data
-                zone_temps = zone_data.get('LST_Celsius', []) if 'LST_Celsius' in zone_data.columns else []
-                zone_avg_temp = zone_temps.mean() if len(zone_temps) > 0 else avg_temp
-
-                priority_zones.append({
-                    'id': i + 1,
-                    'lat': float(lat),
-                    'lon': float(lon),
-                    'temp': round(zone_avg_temp, 2) if zone_avg_temp is not None else None,
-                    'pointCount': len(zone_data),
-                    'area': f"{len(zone_data) * 0.9:.1f} km²"
-                })
+            with stage_span(session_id, 'zones') as span:
+                stats = zone_statistics(
+                    labels, len(centers),
+                    df['lat'].to_numpy(), df['lon'].to_numpy(), df['LST_Celsius'].to_numpy(),
+                    ndvi=df['NDVI'].to_numpy() if 'NDVI' in df.columns else None,
+                    pixels=df['hotspotPixels'].to_numpy() if grid else None,
+                    pixel_area_km2=PIXEL_SCALE ** 2 / 1e6
+                )
+                scores, ranks = priority_scores(stats, score_weights)
+
+                def rounded(value, digits):
+                    return round(float(value), digits) if np.isfinite(value) else None
+
+                # Highest priority first; ids stay the cluster numbers used by the hotspots
+                priority_zones = []
+                for i in np.argsort(ranks):
+                    zone = {
+                        'id': int(i) + 1,
+                        'rank': int(ranks[i]),
+                        'priorityScore': round(float(scores[i]), 1),
+                        'lat': float(centers[i][0]),
+                        'lon': float(centers[i][1]),
+                        'temp': rounded(stats['meanLst'][i], 2),
+                        'p90Temp': rounded(stats['p90Lst'][i], 2),
+                        'ndvi': rounded(stats['meanNdvi'][i], 3),
+                        'pointCount': int(stats['count'][i]),
+                        'areaKm2': round(float(stats['areaKm2'][i]), 3),
+                        'area': f"{stats['areaKm2'][i]:.2f} km²"
+                    }
+                    if grid:
+                        zone['hotspotPixels'] = int(stats['pixels'][i])
+                    priority_zones.append(zone)
+                span['rows'] = len(df)
+                span['zones'] = len(priority_zones)
             stream_log(session_id, "✓ Priority zones created")
 
         except Exception as e:
             raise Exception(f'Clustering failed: {str(e)}')
 
-        # === Generate Folium map ===
-        try:
-            stream_log(session_id, "Generating interactive Folium map...")
-            m = folium.Map(location=[latitude, longitude], zoom_start=12)
-
-            # Candidate points
-            for _, row in df.iterrows():
-                folium.CircleMarker(
-                    location=[row['lat'], row['lon']],
-                    radius=2,
-                    color='red',
-                    fill=True,
-                    fill_opacity=0.6,
-                    tooltip="Potential hotspot"
-                ).add_to(m)
-
-            # Add priority zones (green markers)
-            for i, center in enumerate(centers):
-                lat, lon = center[0], center[1]
-                maps_url = f"https://www.google.com/maps?q={lat},{lon}"
-                
-                folium.Marker(
-                    location=[lat, lon],
-                    popup=(
-                        f"<b>Priority Planting Zone #{i+1}</b><br>"
-                        f"Center of Heat Cluster<br>"
-                        f"<a href='{maps_url}' target='_blank'>"
-                        f"({lat:.5f}, {lon:.5f})"
-                        f"</a>"
-                    ),
-                    icon=folium.Icon(color='green', icon='tree', prefix='fa')
-                ).add_to(m)
-
-            outfile = f"urban_heat_map_{latitude}_{longitude}.html"
-            m.save(outfile)
-            stream_log(session_id, f"✓ Map saved as {outfile}")
+        # === Planting sites ===
+        planting = []
+        if planting_sites:
+            try:
+                stream_log(session_id, f"Selecting up to {planting_sites} planting sites covering the most heat...")
+                with stage_span(session_id, 'planting_sites') as span:
+                    site_rows, covered_heat = select_planting_sites(
+                        df['lat'].to_numpy(), df['lon'].to_numpy(), df['LST_Celsius'].to_numpy(),
+                        hot_threshold, planting_sites, cooling_radius,
+                        weights=df['hotspotPixels'].to_numpy() if grid else None
+                    )
+                    site_zones = labels[site_rows] + 1
+                    for rank, (row, heat, zone_id) in enumerate(zip(site_rows, covered_heat, site_zones), start=1):
+                        planting.append({
+                            'rank': rank,
+                            'lat': float(df['lat'].iat[row]),
+                            'lon': float(df['lon'].iat[row]),
+                            'temp': round(float(df['LST_Celsius'].iat[row]), 2),
+                            'coveredHeat': round(float(heat), 2),
+                            'zoneId': int(zone_id)
+                        })
+                    span['rows'] = len(df)
+                    span['sites'] = len(planting)
 
-        except Exception as e:
-            raise Exception(f'Map generation failed: {str(e)}')
+                # Each zone lists its sites best first
+                for zone in priority_zones:
+                    zone['plantingSites'] = [site['rank'] for site in planting if site['zoneId'] == zone['id']]
+                stream_log(session_id, f"✓ Selected {len(planting)} planting sites")
+            except Exception as e:
+                raise Exception(f'Planting site selection failed: {str(e)}')
+
+        publish_partial(session_id, 'zones', {
+            'clusters': len(centers),
+            'clustering': clustering,
+            'priorityZones': priority_zones,
+            'plantingSites': planting
+        })
 
-        map_html = m._repr_html_()
+        with stage_span(session_id, 'hotspot_encode') as span:
+            hotspots = hotspot_columns(df)
+            session_store.set_payload(session_id, 'hotspots', hotspots)
+            span['rows'] = len(df)
+
+        # Full precision table for /export; the analysis does not depend on it
+        with stage_span(session_id, 'hotspot_export') as span:
+            try:
+                span['bytes'] = os.path.getsize(export_store.write(session_id, hotspot_table(df)))
+            except Exception as e:
+                print(f"Failed to write hotspot export for session {session_id}: {e}")
+
+        # Chunk events only reference the stored payload; the stream attaches the rows
+        for offset in range(0, len(df), HOTSPOT_CHUNK_SIZE):
+            publish_partial(session_id, 'hotspots-chunk', {
+                'offset': offset,
+                'count': min(HOTSPOT_CHUNK_SIZE, len(df) - offset),
+                'total': len(df)
+            })
+
+        map_html = None
+        outfile = None
+        if output_mode == 'html':
+            # === Generate Folium map ===
+            try:
+                stream_log(session_id, "Generating interactive Folium map...")
+                with stage_span(session_id, 'map_markers') as span:
+                    m = build_folium_map(
+                        latitude, longitude,
+                        df['lat'].to_numpy(), df['lon'].to_numpy(),
+                        [(center[0], center[1]) for center in centers],
+                        planting
+                    )
+                    span['rows'] = len(df) + len(centers)
+
+                with stage_span(session_id, 'map_save') as span:
+                    page = m.get_root().render()
+                    outfile = map_store.save(page)
+                    map_store.retain(outfile, f"session:{session_id}")
+                    span['bytes'] = len(page)
+                stream_log(session_id, f"✓ Map saved as {outfile}")
+
+            except Exception as e:
+                raise Exception(f'Map generation failed: {str(e)}')
+
+            with stage_span(session_id, 'map_html') as span:
+                # Reuses the saved page instead of rendering the map a second time
+                map_html = embed_map_html(page, m.get_root())
+                span['bytes'] = len(map_html)
+        else:
+            stream_log(session_id, "✓ Hotspots ready for client-side map rendering")
+
+        publish_partial(session_id, 'map-ready', {
+            'mapFormat': output_mode,
+            'mapFileName': outfile,
+            'tileSource': tile_source
+        })
 
         # === Final result ===
         results = {
             'success': True,
-            'hotspotsFound': len(df),
+            'hotspotsFound': hotspots_found,
             'clusters': len(centers),
             'minTemperature': round(min_temp, 2) if min_temp is not None else None,
             'maxTemperature': round(max_temp, 2) if max_temp is not None else None,
             'avgTemperature': round(avg_temp, 2) if avg_temp is not None else None,
             'priorityZones': priority_zones,
+            'plantingSites': planting,
+            'clustering': clustering,
             'analysisPeriod': {'start': start_date, 'end': end_date},
+            'center': {'lat': latitude, 'lon': longitude},
+            'region': roi.cache_params(),
+            'extraction': extraction,
+            'cells': len(df) if grid else None,
+            'composite': composite,
+            'sceneCount': scene_count,
+            'mapFormat': output_mode,
             'mapHtml': map_html,
-            'mapFileName': os.path.basename(outfile) if outfile else None
+            'mapFileName': outfile,
+            'tileSource': tile_source,
+            'sessionId': session_id,
+            'cached': False
         }
 
+        session = session_store.get(session_id)
+        results['timings'] = session['timings'] if session else []
+        results['durationMs'] = round((time.perf_counter() - analysis_started) * 1000, 2)
+
+        if cache_key:
+            try:
+                result_cache.set(cache_key, {'result': results, 'hotspots': hotspots})
+                if outfile:
+                    map_store.retain(outfile, f"result:{cache_key}")
+            except Exception as e:
+                print(f"Failed to cache result for session {session_id}: {e}")
+
         stream_log(session_id, "✓ Analysis complete!")
-        
-        with sessions_lock:
-            if session_id in analysis_sessions:
-                analysis_sessions[session_id]['status'] = 'completed'
-                analysis_sessions[session_id]['result'] = results
+        analysis_duration.observe(time.perf_counter() - analysis_started, status='completed')
+        analyses_total.inc(status='completed')
+
+        finish_session(session_id, 'completed', result=results)
 
     except Exception as e:
-        error_msg = str(e)
-        stream_log(session_id, f"✗ Analysis failed: {error_msg}")
-        with sessions_lock:
-            if session_id in analysis_sessions:
-                analysis_sessions[session_id]['status'] = 'failed'
-                analysis_sessions[session_id]['error'] = error_msg
+        cancelled = cancel_requested(session_id)
+        status = 'cancelled' if cancelled else 'failed'
+        error_msg = 'Analysis cancelled by client' if cancelled else str(e)
+
+        stream_log(session_id, f"✗ Analysis {status}: {error_msg}")
+        analysis_duration.observe(time.perf_counter() - analysis_started, status=status)
+        analyses_total.inc(status=status)
+        finish_session(session_id, status, error=error_msg)
+
+@app.route('/api/analyze/batch', methods=['POST'])
+@limiter.limit("10 per minute")
+def analyze_batch():
+    """Analyse many locations with shared dates, thresholds and dataset as one job"""
+    try:
+        if not backend.ready():
+            return jsonify({'error': 'Analysis backend not initialized. Please try again later.'}), 503
+
+        data = request.get_json()
+        if not data or not isinstance(data, dict):
+            return jsonify({'error': 'Invalid JSON payload'}), 400
+
+        required_fields = ['locations', 'startDate', 'endDate']
+        if not all(field in data for field in required_fields):
+            return jsonify({
+                'error': 'Missing required fields',
+                'required': required_fields
+            }), 400
+
+        try:
+            start_date = data['startDate']
+            end_date = data['endDate']
+            validate_dates(start_date, end_date)
+        except ValueError as e:
+            return jsonify({'error': f'Invalid date format or range: {str(e)}'}), 400
+
+        try:
+            options = parse_analysis_options(data)
+        except (ValueError, TypeError) as e:
+            return jsonify({'error': f'Invalid threshold values: {str(e)}'}), 400
+
+        raw_locations = data['locations']
+        if not isinstance(raw_locations, list) or not raw_locations:
+            return jsonify({'error': 'locations must be a non-empty list'}), 400
+        if len(raw_locations) > BATCH_MAX_LOCATIONS:
+            return jsonify({'error': f'A batch can hold at most {BATCH_MAX_LOCATIONS} locations'}), 400
+
+        locations = []
+        for index, location in enumerate(raw_locations):
+            try:
+                if not isinstance(location, dict):
+                    raise ValueError("each location must be an object")
+                latitude = float(location['latitude'])
+                longitude = float(location['longitude'])
+                validate_coordinates(latitude, longitude)
+                radius, polygon = validate_region(dict({'radius': data.get('radius', ROI_RADIUS)}, **location))
+            except (KeyError, ValueError, TypeError, IndexError) as e:
+                return jsonify({'error': f'Invalid location #{index + 1}: {str(e)}'}), 400
+
+            locations.append({
+                'id': str(location.get('id', index + 1)),
+                'name': location.get('name'),
+                'latitude': latitude,
+                'longitude': longitude,
+                'radius': radius,
+                'polygon': polygon,
+                'cacheKey': analysis_cache_key(latitude, longitude, start_date, end_date, options, radius, polygon)
+            })
+
+        if len({location['id'] for location in locations}) != len(locations):
+            return jsonify({'error': 'Location IDs must be unique'}), 400
+
+        # One session for the batch stream plus one per location for its full result
+        batch_id = create_session()
+        for location in locations:
+            location['sessionId'] = create_session(parent=batch_id, location=location['id'])
+
+        use_cache = not data.get('noCache', False)
+        try:
+            client_id = get_remote_address()
+            position = executor.submit(
+                batch_id, client_id, _run_batch,
+                batch_id, client_id, locations, start_date, end_date, options, use_cache
+            )
+        except QueueFullError as e:
+            finish_session(batch_id, 'failed', error=str(e))
+            finish_batch_locations(batch_id, 'failed', str(e))
+            response = jsonify({'error': str(e), 'queued': e.queued})
+            response.headers['Retry-After'] = '30'
+            return response, e.status_code
+
+        stream_log(batch_id, f"Batch of {len(locations)} locations queued (position {position})")
+
+        return jsonify({
+            'sessionId': batch_id,
+            'queuePosition': position,
+            'locations': [
+                {'id': location['id'], 'name': location['name'], 'sessionId': location['sessionId']}
+                for location in locations
+            ],
+            'message': 'Batch started. Connect to /api/logs/<sessionId> to stream progress.'
+        }), 202
+
+    except Exception as e:
+        print(f"Unexpected error in analyze_batch: {str(e)}")
+        return jsonify({'error': 'Internal server error during analysis.'}), 500
+
+
+def _run_batch(batch_id, client_id, locations, start_date, end_date, options, use_cache=True):
+    session = session_store.get(batch_id)
+    if session is None or session['status'] == 'cancelled':
+        return
+    if session['cancelRequested']:
+        finish_session(batch_id, 'cancelled', error='Analysis cancelled by client')
+        finish_batch_locations(batch_id, 'cancelled', 'Analysis cancelled by client')
+        return
+    session_store.update(batch_id, status='running', queuePosition=None)
+
+    batch_started = time.perf_counter()
+    dataset = options['dataset']
+    scenes = []
+    try:
+        stream_log(batch_id, f"Starting batch analysis of {len(locations)} locations...")
+
+        pending = []
+        for location in locations:
+            cached = result_cache.get(location['cacheKey']) if use_cache else None
+            if cached is not None:
+                restore_cached_result(location['sessionId'], cached, location['cacheKey'])
+            else:
+                pending.append(location)
+
+        if pending and options['composite'] != 'none':
+            # Composites reduce each location's own scene set, so there is no
+            # single scene per location to share across the batch
+            stream_log(batch_id, f"Compositing scenes for {len(pending)} locations...")
+
+            def run_composite(location):
+                _run_analysis(
+                    location['sessionId'], location['latitude'], location['longitude'], start_date, end_date,
+                    cache_key=location['cacheKey'], use_cache=use_cache,
+                    radius=location['radius'], polygon=location['polygon'], **options
+                )
+
+            executor.run_all(
+                client_id, [(location['sessionId'], run_composite, (location,)) for location in pending],
+                BATCH_WORKERS
+            )
+        elif pending:
+            # === One collection query for every location ===
+            stream_log(batch_id, f"Selecting scenes from {dataset} for {len(pending)} locations...")
+            with stage_span(batch_id, 'scene_lookup'):
+                scene_ids = backend.select_scenes(
+                    [(location['latitude'], location['longitude']) for location in pending],
+                    start_date, end_date, options['cloud_cover'], dataset
+                )
+            scenes = sorted(set(filter(None, scene_ids)))
+            stream_log(batch_id, f"✓ {len(pending)} locations share {len(scenes)} distinct scenes")
+
+            # === Indices once per distinct scene ===
+            with stage_span(batch_id, 'indices') as span:
+                prepared = {
+                    scene_id: backend.compute_indices(backend.load_scene(scene_id), dataset)
+                    for scene_id in scenes
+                }
+                span['rows'] = len(prepared)
+
+            def run_location(location, scene_id):
+                if scene_id is None:
+                    error = f"No imagery found in dataset '{dataset}' for the given location and date range."
+                    stream_log(location['sessionId'], f"✗ Analysis failed: {error}")
+                    finish_session(location['sessionId'], 'failed', error=error)
+                    analyses_total.inc(status='failed')
+                    return
+                _run_analysis(
+                    location['sessionId'], location['latitude'], location['longitude'], start_date, end_date,
+                    cache_key=location['cacheKey'], use_cache=use_cache,
+                    radius=location['radius'], polygon=location['polygon'],
+                    scene=(scene_id, prepared[scene_id]), **options
+                )
+
+            # === Fan out locations through the shared worker pool ===
+            executor.run_all(
+                client_id,
+                [(location['sessionId'], run_location, (location, scene_id))
+                 for location, scene_id in zip(pending, scene_ids)],
+                BATCH_WORKERS
+            )
+
+        summaries = []
+        counts = {'completed': 0, 'failed': 0, 'cancelled': 0}
+        for location in locations:
+            location_session = session_store.get(location['sessionId'])
+            status = location_session['status'] if location_session else 'failed'
+            counts[status] = counts.get(status, 0) + 1
+            summary = {
+                'id': location['id'],
+                'name': location['name'],
+                'latitude': location['latitude'],
+                'longitude': location['longitude'],
+                'sessionId': location['sessionId'],
+                'status': status,
+                'error': location_session['error'] if location_session else 'Session expired'
+            }
+            if status == 'completed':
+                summary.update(location_summary(location_session['result']))
+            summaries.append(summary)
+
+        check_cancelled(batch_id)
+
+        batch_session = session_store.get(batch_id)
+        results = {
+            'success': True,
+            'batch': True,
+            'locations': summaries,
+            'completed': counts['completed'],
+            'failed': counts['failed'],
+            'cancelled': counts['cancelled'],
+            'scenes': len(scenes),
+            'analysisPeriod': {'start': start_date, 'end': end_date},
+            'timings': batch_session['timings'] if batch_session else [],
+            'durationMs': round((time.perf_counter() - batch_started) * 1000, 2)
+        }
+
+        stream_log(batch_id, f"✓ Batch complete: {counts['completed']} of {len(locations)} locations analysed")
+        finish_session(batch_id, 'completed', result=results)
+
+    except Exception as e:
+        cancelled = cancel_requested(batch_id)
+        status = 'cancelled' if cancelled else 'failed'
+        error_msg = 'Analysis cancelled by client' if cancelled else str(e)
+        stream_log(batch_id, f"✗ Batch {status}: {error_msg}")
+        finish_batch_locations(batch_id, status, error_msg)
+        finish_session(batch_id, status, error=error_msg)
+    finally:
+        finish_batch_locations(batch_id, 'cancelled', 'Batch stopped before this location ran')
+
+@app.route('/api/timeseries', methods=['POST'])
+@limiter.limit("20 per minute")
+def get_timeseries():
+    """Monthly or per-scene LST statistics and hotspot share of a region over several years.
+
+    Finished periods are stored per location and parameter set, so a
+    repeated or extended request only reduces the periods not seen before,
+    all of them in one backend request.
+    """
+    try:
+        if not backend.ready():
+            return jsonify({'error': 'Analysis backend not initialized. Please try again later.'}), 503
+
+        data = request.get_json()
+        if not data or not isinstance(data, dict):
+            return jsonify({'error': 'Invalid JSON payload'}), 400
+
+        required_fields = ['latitude', 'longitude', 'startDate', 'endDate']
+        if not all(field in data for field in required_fields):
+            return jsonify({
+                'error': 'Missing required fields',
+                'required': required_fields
+            }), 400
+
+        try:
+            latitude = float(data['latitude'])
+            longitude = float(data['longitude'])
+            validate_coordinates(latitude, longitude)
+        except (ValueError, TypeError) as e:
+            return jsonify({'error': f'Invalid coordinates: {str(e)}'}), 400
+
+        try:
+            start_date = data['startDate']
+            end_date = data['endDate']
+            start, end = validate_timeseries_dates(start_date, end_date)
+        except ValueError as e:
+            return jsonify({'error': f'Invalid date format or range: {str(e)}'}), 400
+
+        try:
+            cloud_cover = int(data.get('cloudCover', 20))
+            hot_threshold = float(data.get('hotThreshold', 37))
+            veg_threshold = float(data.get('vegThreshold', 0.2))
+            dataset = validate_dataset(data.get('dataset', 'LANDSAT/LC09/C02/T1_L2'))
+            percentile = int(data.get('percentile', 90))
+            frequency = data.get('frequency', 'month')
+            if not (0 <= cloud_cover <= 100):
+                raise ValueError("cloudCover must be between 0 and 100")
+            if hot_threshold < 0:
+                raise ValueError("hotThreshold must be >= 0")
+            if not (0 <= veg_threshold <= 1):
+                raise ValueError("vegThreshold must be between 0 and 1")
+            if not (0 <= percentile <= 100):
+                raise ValueError("percentile must be between 0 and 100")
+            if frequency not in TIMESERIES_FREQUENCIES:
+                raise ValueError(f"frequency must be one of {', '.join(TIMESERIES_FREQUENCIES)}")
+        except (ValueError, TypeError) as e:
+            return jsonify({'error': f'Invalid threshold values: {str(e)}'}), 400
+
+        try:
+            radius, polygon = validate_region(data)
+        except (ValueError, TypeError, IndexError) as e:
+            return jsonify({'error': f'Invalid region: {str(e)}'}), 400
+
+        roi = backend.region(latitude, longitude, radius, polygon)
+        params = normalize_analysis_params(
+            latitude, longitude, start_date, end_date, cloud_cover, hot_threshold, veg_threshold, dataset
+        )
+        # The date range is not part of the key: every request adds to the same store
+        del params['start'], params['end']
+        params.update(frequency=frequency, percentile=percentile, **roi.cache_params())
+        store = intermediate_caches['timeseries']
+        store_key = make_cache_key('timeseries', params)
+        stored = store.get(store_key, {}) if not data.get('noCache', False) else {}
+
+        started = time.perf_counter()
+        if frequency == 'month':
+            periods = month_periods(start, end)
+            missing = [period for period in periods if period['period'] not in stored]
+            computed = backend.period_stats(
+                roi, missing, cloud_cover, dataset, hot_threshold, veg_threshold, percentile
+            ) if missing else []
+            fresh = {row['period']: row for row in computed}
+            # The current month can still gain scenes, so only finished months are kept
+            today = datetime.now().strftime("%Y-%m-%d")
+            finished = {key: row for key, row in fresh.items() if row['end'] <= today}
+            # Earth Engine drops periods without scenes from the mapped collection; they
+            # are answered empty and not stored, as a failed reduction looks the same
+            rows = [
+                stored.get(period['period']) or fresh.get(period['period']) or empty_period_row(period)
+                for period in periods
+            ]
+        else:
+            try:
+                scene_ids = backend.select_scene_set(latitude, longitude, start_date, end_date, cloud_cover, dataset)
+            except ValueError:
+                scene_ids = []
+            if len(scene_ids) > TIMESERIES_MAX_SCENES:
+                return jsonify({
+                    'error': f'{len(scene_ids)} scenes match, at most {TIMESERIES_MAX_SCENES} can be reduced per '
+                             f'request. Use frequency=month or a shorter date range.'
+                }), 400
+            missing = [scene_id for scene_id in scene_ids if scene_id not in stored]
+            computed = backend.scene_stats(
+                missing, roi, dataset, hot_threshold, veg_threshold, percentile
+            ) if missing else []
+            finished = {row['scene']: dict(row, period=row['date'], start=row['date']) for row in computed}
+            rows = sorted(
+                (
+                    stored.get(scene_id) or finished.get(scene_id)
+                    or empty_period_row({'period': None, 'start': None}, scene=scene_id, date=None)
+                    for scene_id in scene_ids
+                ),
+                # Scenes that failed to reduce have no date and go last
+                key=lambda row: (row['date'] is None, row['date'] or '')
+            )
+
+        if finished:
+            try:
+                store.set(store_key, dict(stored, **finished))
+            except Exception as e:
+                print(f"Failed to store time series periods: {e}")
+
+        series = []
+        for row in rows:
+            entry = {'period': row['period'], 'start': row['start']}
+            if frequency == 'month':
+                entry['scenes'] = row.get('scenes', 0)
+            else:
+                entry['scene'] = row['scene']
+            for field, digits in (('lstMean', 2), ('lstPercentile', 2), ('hotspotFraction', 4)):
+                value = row.get(field)
+                entry[field] = round(value, digits) if value is not None else None
+            series.append(entry)
+
+        return jsonify({
+            'success': True,
+            'frequency': frequency,
+            'percentile': percentile,
+            'analysisPeriod': {'start': start_date, 'end': end_date},
+            'center': {'lat': latitude, 'lon': longitude},
+            'region': roi.cache_params(),
+            'series': series,
+            'trend': heat_trend(rows),
+            'computedPeriods': len(computed),
+            'storedPeriods': len(rows) - len(computed),
+            'durationMs': round((time.perf_counter() - started) * 1000, 2)
+        }), 200
+
+    except Exception as e:
+        print(f"Unexpected error in get_timeseries: {str(e)}")
+        return jsonify({'error': f'Time series computation failed: {str(e)}'}), 500
 
 @app.route('/api/logs/<session_id>')
 def stream_logs(session_id):
+    # Browsers resend the last seen event ID when an EventSource reconnects
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId') or 0
+    try:
+        last_event_id = int(last_event_id)
+    except ValueError:
+        last_event_id = 0
+
     def generate():
-        sent_logs = set()
-        
+        if session_store.get(session_id) is None:
+            error_data = json.dumps({'error': 'Session not found'})
+            yield f"data: {error_data}\n\n"
+            return
+
+        yield "retry: 3000\n\n"
+
+        sent = last_event_id
+        hotspots = None
         while True:
-            with sessions_lock:
-                if session_id not in analysis_sessions:
-                    error_data = json.dumps({'error': 'Session not found'})
-                    yield f"data: {error_data}\n\n"
-                    break
-                
-                session = analysis_sessions[session_id]
-                
-                # Send all new logs
-                while not session['logs'].empty():
-                    try:
-                        log_msg = session['logs'].get_nowait()
-                        if log_msg not in sent_logs:
-                            sent_logs.add(log_msg)
-                            # Create proper JSON for log message
-                            log_data = json.dumps({'log': log_msg})
-                            yield f"data: {log_data}\n\n"
-                    except queue.Empty:
-                        break
-                
-                # Check if analysis is complete
-                if session['status'] in ['completed', 'failed']:
-                    if session['status'] == 'completed':
-                        result_data = json.dumps({
-                            'status': 'completed',
-                            'result': session['result']
-                        })
-                        yield f"data: {result_data}\n\n"
-                    else:
-                        error_data = json.dumps({
-                            'status': 'failed',
-                            'error': session['error']
-                        })
-                        yield f"data: {error_data}\n\n"
-                    break
-            
-            # Small delay to prevent busy waiting
-            import time
-            time.sleep(0.1)
-    
+            try:
+                pending = session_store.events_since(session_id, sent, SSE_HEARTBEAT_SECONDS)
+            except SessionNotFound:
+                error_data = json.dumps({'error': 'Session expired'})
+                yield f"data: {error_data}\n\n"
+                return
+
+            if not pending:
+                # Keeps proxies from closing an idle connection
+                yield ": heartbeat\n\n"
+                continue
+
+            for event in pending:
+                sent = event['id']
+                data = event['data']
+                if data.get('status') == 'completed':
+                    session = session_store.get(session_id)
+                    data = dict(data, result=session['result'] if session else None)
+                elif data.get('type') == 'hotspots-chunk':
+                    if hotspots is None:
+                        hotspots = session_store.get_payload(session_id, 'hotspots') or {}
+                    rows = slice(data['offset'], data['offset'] + data['count'])
+                    data = dict(data, hotspots={name: values[rows] for name, values in hotspots.items()})
+
+                if 'type' in data:
+                    yield f"id: {event['id']}\nevent: {data['type']}\ndata: {json.dumps(data)}\n\n"
+                else:
+                    yield f"id: {event['id']}\ndata: {json.dumps(data)}\n\n"
+                if data.get('status') in TERMINAL_STATUSES:
+                    return
+
     return Response(
         stream_with_context(generate()),
         mimetype='text/event-stream',
@@ -644,18 +1918,181 @@ def stream_logs(session_id):
 
 @app.route('/api/analysis-result/<session_id>')
 def get_analysis_result(session_id):
-    with sessions_lock:
-        if session_id not in analysis_sessions:
-            return jsonify({'error': 'Session not found'}), 404
-        
-        session = analysis_sessions[session_id]
-        
-        if session['status'] == 'running':
-            return jsonify({'status': 'running'}), 202
-        elif session['status'] == 'completed':
-            return jsonify(session['result']), 200
-        else:  # failed
-            return jsonify({'error': session['error']}), 500
+    session = session_store.get(session_id)
+    if session is None:
+        return jsonify({'error': 'Session not found'}), 404
+
+    if session['status'] == 'queued':
+        return jsonify({'status': 'queued', 'queuePosition': session['queuePosition']}), 202
+    elif session['status'] == 'running':
+        return jsonify({'status': 'running'}), 202
+    elif session['status'] == 'completed':
+        return jsonify(session['result']), 200
+    elif session['status'] == 'cancelled':
+        return jsonify({'status': 'cancelled', 'error': session['error']}), 409
+    else:  # failed
+        return jsonify({'error': session['error']}), 500
+
+@app.route('/api/analysis-result/<session_id>/geojson')
+def get_analysis_geojson(session_id):
+    """Hotspots and priority zones of a completed analysis as GeoJSON.
+
+    ?format=columns returns the compact column-oriented encoding instead.
+    """
+    session = session_store.get(session_id)
+    if session is None:
+        return jsonify({'error': 'Session not found'}), 404
+    if session['status'] != 'completed':
+        return jsonify({'status': session['status'], 'error': 'Analysis has not completed'}), 409
+
+    hotspots = session_store.get_payload(session_id, 'hotspots')
+    if hotspots is None:
+        return jsonify({'error': 'Hotspot data not available for this session'}), 404
+
+    zones = session['result']['priorityZones']
+    sites = session['result'].get('plantingSites', [])
+    if request.args.get('format') == 'columns':
+        return jsonify({'hotspots': hotspots, 'zones': zones, 'sites': sites}), 200
+
+    response = jsonify(hotspot_geojson(hotspots, zones, sites))
+    response.mimetype = 'application/geo+json'
+    return response, 200
+
+def parse_bbox(value):
+    """west,south,east,north query parameter as a tuple of floats"""
+    parts = [float(part) for part in value.split(',')]
+    if len(parts) != 4:
+        raise ValueError("bbox must be west,south,east,north")
+    west, south, east, north = parts
+    if west > east or south > north:
+        raise ValueError("bbox must have west <= east and south <= north")
+    return west, south, east, north
+
+@app.route('/api/analysis-result/<session_id>/export')
+def export_hotspots(session_id):
+    """Hotspot table of a completed analysis as Parquet, Arrow IPC stream or GeoJSON.
+
+    ?columns=lat,lon,LST_Celsius selects columns and ?bbox=west,south,east,north
+    keeps the hotspots inside a box. The file is streamed batch by batch.
+    """
+    session = session_store.get(session_id)
+    if session is None:
+        return jsonify({'error': 'Session not found'}), 404
+    if session['status'] != 'completed':
+        return jsonify({'status': session['status'], 'error': 'Analysis has not completed'}), 409
+
+    fmt = request.args.get('format', 'parquet')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+
+    if not export_store.exists(session_id):
+        # Results restored from the result cache only carry the rounded columns
+        hotspots = session_store.get_payload(session_id, 'hotspots')
+        if hotspots is None:
+            return jsonify({'error': 'Hotspot data not available for this session'}), 404
+        export_store.write(session_id, columns_table(hotspots))
+
+    available = export_store.schema(session_id).names
+    columns = None
+    if request.args.get('columns'):
+        columns = [name.strip() for name in request.args['columns'].split(',') if name.strip()]
+        unknown = [name for name in columns if name not in available]
+        if unknown:
+            return jsonify({'error': f"Unknown columns {', '.join(unknown)}", 'available': available}), 400
+
+    try:
+        bbox = parse_bbox(request.args['bbox']) if request.args.get('bbox') else None
+    except ValueError as e:
+        return jsonify({'error': f'Invalid bbox: {str(e)}'}), 400
+
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    return Response(
+        stream_with_context(export_store.stream(session_id, fmt, columns, bbox)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="hotspots_{session_id}.{extension}"'}
+    )
+
+@app.route('/api/analysis-result/<session_id>/map', methods=['POST'])
+def render_analysis_map(session_id):
+    """Build the downloadable Folium map for a session on demand"""
+    session = session_store.get(session_id)
+    if session is None:
+        return jsonify({'error': 'Session not found'}), 404
+    if session['status'] != 'completed':
+        return jsonify({'status': session['status'], 'error': 'Analysis has not completed'}), 409
+
+    result = session['result']
+    if result.get('mapFileName') and map_store.exists(result['mapFileName']):
+        return jsonify({'mapFileName': result['mapFileName']}), 200
+
+    hotspots = session_store.get_payload(session_id, 'hotspots')
+    if hotspots is None:
+        return jsonify({'error': 'Hotspot data not available for this session'}), 404
+
+    outfile = save_result_map(result, hotspots)
+    map_store.retain(outfile, f"session:{session_id}")
+    session_store.update(session_id, result=dict(result, mapFileName=outfile))
+
+    return jsonify({'mapFileName': outfile}), 200
+
+@app.route('/api/tiles/<layer>/<int:z>/<int:x>/<int:y>.png', methods=['GET'])
+@limiter.limit("1200 per minute")
+def get_tile(layer, z, x, y):
+    """XYZ tile of an LST, NDVI or hotspot mask overlay for the tile source of an analysis"""
+    if layer not in TILE_LAYERS:
+        return jsonify({'error': f"Unknown layer '{layer}', expected one of {', '.join(TILE_LAYERS)}"}), 404
+    if not valid_tile(z, x, y, TILE_MAX_ZOOM):
+        return jsonify({'error': f"Invalid tile {z}/{x}/{y}, zoom must be between 0 and {TILE_MAX_ZOOM}"}), 400
+
+    source_key = request.args.get('source', '')
+    source = tile_sources.get(source_key) if source_key else None
+    if source is None:
+        return jsonify({'error': 'Tile source not found, run the analysis again'}), 404
+
+    spec = layer_visualization(layer, TILE_LST_RANGE)
+    tile_params = {'source': source_key, 'layer': layer, 'z': z, 'x': x, 'y': y, 'min': spec.get('min'), 'max': spec.get('max')}
+    # A tile never changes for the same source and styling, so its cache key is a strong validator
+    etag = make_cache_key('tile', tile_params)[:32]
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        def render():
+            image = tile_source_image(source_key, source)
+            return backend.render_tile(
+                image, layer, z, x, y, spec, source['hotThreshold'], source['vegThreshold'],
+                map_key=(source_key, layer, spec.get('min'), spec.get('max'))
+            )
+
+        try:
+            png = cached_layer('tiles', tile_params, render)
+        except Exception as e:
+            return jsonify({'error': f'Tile rendering failed: {str(e)}'}), 502
+        response = Response(png, mimetype='image/png')
+
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = TILE_CACHE_MAX_AGE
+    return response
+
+@app.route('/api/analyze/<session_id>', methods=['DELETE'])
+def cancel_analysis(session_id):
+    """Cancel a queued analysis, or stop a running one at its next stage"""
+    session = session_store.get(session_id)
+    if session is None:
+        return jsonify({'error': 'Session not found'}), 404
+    if session['status'] in TERMINAL_STATUSES:
+        return jsonify({'status': session['status'], 'message': 'Analysis already finished'}), 409
+
+    if executor.cancel(session_id):
+        stream_log(session_id, "✗ Analysis cancelled before it started")
+        finish_session(session_id, 'cancelled', error='Analysis cancelled by client')
+        finish_batch_locations(session_id, 'cancelled', 'Analysis cancelled by client')
+        analyses_total.inc(status='cancelled')
+        return jsonify({'status': 'cancelled'}), 200
+
+    session_store.update(session_id, cancelRequested=True)
+    stream_log(session_id, "Cancellation requested, stopping after the current stage...")
+    return jsonify({'status': 'cancelling'}), 202
 
 @app.route('/api/parameters', methods=['GET'])
 def get_default_parameters():
@@ -671,38 +2108,132 @@ def get_default_parameters():
         'dataset': 'LANDSAT/LC09/C02/T1_L2',
     }), 200
 
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    scene_index = getattr(backend, 'scene_index', None)
+    return jsonify({
+        'results': result_cache.stats(),
+        'layers': {name: cache.stats() for name, cache in intermediate_caches.items()},
+        'sceneIndex': scene_index.stats() if scene_index else None,
+        'maps': map_store.stats(),
+        'requests': ee_requests.stats()
+    }), 200
+
+@app.route('/api/metrics', methods=['GET'])
+@limiter.exempt
+def get_metrics():
+    """Prometheus text exposition of latency histograms, sessions and caches"""
+    status_counts = session_store.status_counts()
+    store_stats = session_store.stats()
+
+    caches = dict(intermediate_caches, results=result_cache)
+    cache_stats = {name: cache.stats() for name, cache in caches.items()}
+
+    lines = []
+    lines += stage_duration.render()
+    lines += analysis_duration.render()
+    lines += analyses_total.render()
+    lines += render_samples(
+        'uhi_active_sessions', 'Analyses currently running',
+        [({}, status_counts.get('running', 0))]
+    )
+    lines += render_samples(
+        'uhi_sessions', 'Analysis sessions in the session store by status',
+        [({'status': status}, status_counts.get(status, 0))
+         for status in ('queued', 'running', 'completed', 'failed', 'cancelled')]
+    )
+    lines += render_samples('uhi_session_store_bytes', 'Result bytes held by the session store',
+                            [({}, store_stats['bytes'])])
+    lines += render_samples('uhi_session_evictions_total', 'Sessions evicted by TTL or capacity',
+                            [({}, store_stats['evictions'])], 'counter')
+    maps = map_store.stats()
+    lines += render_samples('uhi_map_store_bytes', 'Bytes of stored maps and their compressed variants',
+                            [({}, maps['bytes'])])
+    lines += render_samples('uhi_map_store_evictions_total', 'Least recently used maps removed from the store',
+                            [({}, maps['evictions'])], 'counter')
+    requests = ee_requests.stats()
+    lines += render_samples('uhi_backend_requests_total', 'Intermediate computations requested',
+                            [({}, requests['requests'])], 'counter')
+    lines += render_samples('uhi_backend_requests_coalesced_total',
+                            'Requests that joined an identical computation already in flight',
+                            [({}, requests['coalesced'])], 'counter')
+    lines += render_samples('uhi_backend_requests_inflight', 'Intermediate computations in flight',
+                            [({}, requests['inflight'])])
+    lines += render_samples('uhi_ee_retries_total', 'Earth Engine requests retried after quota errors',
+                            [({}, getattr(backend, 'retries', 0))], 'counter')
+    pool = executor.stats()
+    lines += render_samples('uhi_queue_depth', 'Analyses waiting for a worker', [({}, pool['queued'])])
+    lines += render_samples('uhi_workers_busy', 'Workers currently running an analysis', [({}, pool['running'])])
+    lines += render_samples('uhi_workers', 'Size of the analysis worker pool', [({}, pool['workers'])])
+    for metric, field, kind, help_text in (
+        ('uhi_cache_hits_total', 'hits', 'counter', 'Cache lookups that found an entry'),
+        ('uhi_cache_misses_total', 'misses', 'counter', 'Cache lookups that missed'),
+        ('uhi_cache_evictions_total', 'evictions', 'counter', 'Entries evicted by TTL or capacity'),
+        ('uhi_cache_entries', 'entries', 'gauge', 'Entries currently stored'),
+        ('uhi_cache_bytes', 'bytes', 'gauge', 'Bytes currently stored'),
+    ):
+        lines += render_samples(
+            metric, help_text,
+            [({'cache': name}, stats[field]) for name, stats in sorted(cache_stats.items())],
+            kind
+        )
+
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/download-map/<filename>', methods=['GET'])
 def download_map(filename):
-    try:
-        # Security: only allow downloading files that match expected pattern
-        if not filename.startswith(f'urban_heat_map_{latitude}_{longitude}') or not filename.endswith('.html'):
-            return jsonify({'error': 'Invalid filename'}), 400
-        
-        return send_file(
-            filename,
-            mimetype='text/html',
-            as_attachment=True,
-            download_name=filename
-        )
-    except FileNotFoundError:
+    """Serve a stored map, precompressed when the client accepts it, with ETag and Range support"""
+    # Security: only hash-named maps from the store can be downloaded
+    if not map_store.is_valid_name(filename):
+        return jsonify({'error': 'Invalid filename'}), 400
+    if not map_store.exists(filename):
         return jsonify({'error': 'Map file not found'}), 404
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+
+    path, encoding = map_store.select(filename, request.headers.get('Accept-Encoding'))
+    map_store.touch(filename)
+    response = send_file(
+        path,
+        mimetype='text/html',
+        as_attachment=True,
+        download_name=filename,
+        conditional=True,
+        etag=map_store.etag(filename, encoding),
+        max_age=MAP_CACHE_MAX_AGE
+    )
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    # Map names are content hashes, so a name never refers to different content
+    response.cache_control.immutable = True
+    return response
 
 @app.route('/api/delete-map/<filename:filename>', methods=['DELETE'])
 def delete_map(filename):
-    try:
-        # Security: only allow deleting files that match expected pattern
-        if not filename.startswith('urban_heat_map_') or not filename.endswith('.html'):
-            return jsonify({'error': 'Invalid filename'}), 400
-        
-        if os.path.exists(filename):
-            os.remove(filename)
-            return jsonify({'success': True, 'message': 'Map file deleted'}), 200
-        else:
-            return jsonify({'success': True, 'message': 'File not found, but record deleted'}), 200
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    """Release the calling session's reference to a map and delete the map once nothing else uses it.
+
+    Map names are content hashes, so other sessions and cached results may
+    point to the same file; while they do, the map is kept.
+    """
+    # Security: only hash-named maps from the store can be deleted
+    if not map_store.is_valid_name(filename):
+        return jsonify({'error': 'Invalid filename'}), 400
+
+    session_id = request.args.get('sessionId')
+    if session_id:
+        remaining = map_store.release(filename, f"session:{session_id}")
+    else:
+        remaining = map_store.references(filename)
+    if remaining:
+        return jsonify({
+            'success': True,
+            'deleted': False,
+            'references': remaining,
+            'message': 'Map retained, it is shared by other results'
+        }), 202
+
+    if map_store.delete(filename):
+        return jsonify({'success': True, 'deleted': True, 'message': 'Map file deleted'}), 200
+    return jsonify({'success': True, 'deleted': False, 'message': 'Map file not found'}), 200
 
 
 @app.errorhandler(404)
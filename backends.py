@@ -0,0 +1,1115 @@
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from ee_client import call_with_retry
+from lazy_imports import lazy_import
+from map_tiles import EMPTY_TILE, OVERLAY_OPACITY, colorize, encode_png, tile_bounds, tile_pixel_centers
+from tiling import (
+    DEFAULT_TILE_MAX_POINTS, DEFAULT_TILE_SIZE, METERS_PER_DEGREE, Region, box_area,
+    fetch_tiles, merge_tiles, plan_tiles
+)
+
+ee = lazy_import('ee')
+geemap = lazy_import('geemap')
+requests = lazy_import('requests')
+
+
+# Nominal pixel size of the sampled rasters in meters (Landsat)
+PIXEL_SCALE = 30
+DEFAULT_NUM_PIXELS = 2000
+DEFAULT_CELL_SIZE = 250
+# One row per grid cell: centroid, hotspot pixel count, valid pixel count,
+# hotspot share of valid pixels and mean LST/NDVI over the hotspot pixels
+GRID_COLUMNS = ['lat', 'lon', 'hotspotPixels', 'pixels', 'density', 'LST_Celsius', 'NDVI']
+# Dilated cloud, cloud and cloud shadow bits of the Landsat Collection 2 QA_PIXEL band
+LANDSAT_CLOUD_BITS = (1 << 1) | (1 << 3) | (1 << 4)
+# Opaque cloud and cirrus bits of the Sentinel-2 QA60 band
+SENTINEL_CLOUD_BITS = (1 << 10) | (1 << 11)
+# Earth Engine map IDs are reused for this long before a new one is requested
+MAP_ID_TTL = 3600
+# Scenes listed per request when indexing, well under Earth Engine's 5000 element limit
+SCENE_LISTING_PAGE = 1000
+
+
+def cloud_mask_band(dataset):
+    """QA band name and cloud bits used to mask pixels of a dataset, or (None, 0)"""
+    dataset = dataset.upper()
+    if 'LANDSAT' in dataset:
+        return 'QA_PIXEL', LANDSAT_CLOUD_BITS
+    if 'SENTINEL' in dataset or 'S2' in dataset:
+        return 'QA60', SENTINEL_CLOUD_BITS
+    return None, 0
+
+
+def composite_id(scene_ids, method):
+    """Stable identifier of a composite, used in place of a scene ID for caching"""
+    digest = hashlib.sha1('|'.join(sorted(scene_ids)).encode('utf-8')).hexdigest()[:16]
+    return f"composite/{method}/{len(scene_ids)}/{digest}"
+
+
+def composite_percentile(method):
+    """Percentile computed by a composite method: 'median' or 'p0'..'p100'"""
+    return 50 if method == 'median' else int(method[1:])
+
+#################################################################
+#######  EARTH ENGINE OPERATIONS  ###############################
+#################################################################
+
+def get_satellite_data(
+    lat,
+    lon,
+    start,
+    end,
+    cloud_cover_threshold,
+    dataset
+):
+    point = ee.Geometry.Point(lon, lat)
+    
+    try:
+        # Create image collection from the specified dataset
+        collection = ee.ImageCollection(dataset).filterBounds(point).filterDate(start, end)
+        
+        # Apply cloud cover filter if dataset has CLOUD_COVER property
+        try:
+            collection = collection.filter(ee.Filter.lt("CLOUD_COVER", cloud_cover_threshold))
+        except:
+            # Some datasets use different cloud cover property names
+            try:
+                collection = collection.filter(ee.Filter.lt("CLOUDY_PIXEL_PERCENTAGE", cloud_cover_threshold))
+            except:
+                # If no cloud cover property, just proceed without filtering
+                pass
+        
+        # Sort by cloud cover if available
+        try:
+            collection = collection.sort("CLOUD_COVER")
+        except:
+            try:
+                collection = collection.sort("CLOUDY_PIXEL_PERCENTAGE")
+            except:
+                pass
+        
+        image = collection.first()
+        if image is None:
+            raise ValueError(f"No imagery found in dataset '{dataset}' for the given location and date range.")
+        
+        return image
+        
+    except Exception as e:
+        raise ValueError(f"Error accessing dataset '{dataset}': {str(e)}")
+
+def select_scene_id(lat, lon, start, end, cloud_cover_threshold, dataset):
+    """Resolve the scene chosen by get_satellite_data to its Earth Engine asset ID"""
+    image = get_satellite_data(lat, lon, start, end, cloud_cover_threshold, dataset)
+    try:
+        scene_id = image.get('system:id').getInfo()
+    except Exception as e:
+        raise ValueError(f"No imagery found in dataset '{dataset}' for the given location and date range: {e}")
+
+    if not scene_id:
+        raise ValueError(f"No imagery found in dataset '{dataset}' for the given location and date range.")
+
+    return scene_id
+
+def select_scene_ids(locations, start, end, cloud_cover_threshold, dataset):
+    """Resolve the least cloudy scene for many (lat, lon) locations in one request.
+
+    The collection is filtered once for all locations; the result holds a
+    scene ID per location, or None where no scene matched.
+    """
+    points = ee.FeatureCollection([ee.Feature(ee.Geometry.Point(lon, lat)) for lat, lon in locations])
+    collection = ee.ImageCollection(dataset) \
+        .filterBounds(points.geometry()) \
+        .filterDate(start, end) \
+        .filter(ee.Filter.lt("CLOUD_COVER", cloud_cover_threshold))
+
+    def pick_scene(feature):
+        matches = collection.filterBounds(feature.geometry()).sort("CLOUD_COVER")
+        # An empty string rather than null keeps aggregate_array aligned with the locations
+        return feature.set('scene', ee.Algorithms.If(matches.size().gt(0), matches.first().get('system:id'), ''))
+
+    scene_ids = points.map(pick_scene).aggregate_array('scene').getInfo()
+    return [scene_id or None for scene_id in scene_ids]
+
+def select_scene_set_ids(lat, lon, start, end, cloud_cover_threshold, dataset):
+    """IDs of every scene passing the cloud filter at a location, least cloudy first"""
+    collection = ee.ImageCollection(dataset) \
+        .filterBounds(ee.Geometry.Point(lon, lat)) \
+        .filterDate(start, end) \
+        .filter(ee.Filter.lt("CLOUD_COVER", cloud_cover_threshold)) \
+        .sort("CLOUD_COVER")
+    try:
+        scene_ids = collection.aggregate_array('system:id').getInfo()
+    except Exception as e:
+        raise ValueError(f"Error accessing dataset '{dataset}': {str(e)}")
+
+    if not scene_ids:
+        raise ValueError(f"No imagery found in dataset '{dataset}' for the given location and date range.")
+    return scene_ids
+
+def footprint_rings(kind, coordinates):
+    """Outer rings of a Polygon or MultiPolygon footprint as lists of [lon, lat] vertices"""
+    if kind == 'MultiPolygon':
+        return [polygon[0] for polygon in coordinates]
+    return [coordinates[0]]
+
+def fetch_scene_metadata(dataset, bounds, start, end, page_size=SCENE_LISTING_PAGE):
+    """ID, acquisition time, cloud cover, tile and footprint rings of every scene
+    intersecting a lat/lon box in [start, end), page_size scenes per request"""
+    collection = ee.ImageCollection(dataset) \
+        .filterBounds(ee.Geometry.Rectangle(list(bounds))) \
+        .filterDate(start, end) \
+        .sort('system:time_start')
+
+    def describe(image):
+        image = ee.Image(image)
+        # Simplified footprints keep the listing small; 100 m is far below a scene's extent
+        footprint = image.geometry().simplify(maxError=100)
+        # Scenes crossing the antimeridian or split by no-data come back as MultiPolygons;
+        # anything that is neither is reduced to its bounding box
+        footprint = ee.Geometry(ee.Algorithms.If(
+            ee.List(['Polygon', 'MultiPolygon']).contains(footprint.type()), footprint, footprint.bounds()
+        ))
+        return ee.Feature(None, {
+            'id': image.get('system:id'),
+            'time': image.get('system:time_start'),
+            'cloudCover': image.get('CLOUD_COVER'),
+            'path': image.get('WRS_PATH'),
+            'row': image.get('WRS_ROW'),
+            'mgrs': image.get('MGRS_TILE'),
+            'footprintType': footprint.type(),
+            'footprint': footprint.coordinates()
+        })
+
+    scenes = []
+    offset = 0
+    while True:
+        page = ee.FeatureCollection(collection.toList(page_size, offset).map(describe)).getInfo()['features']
+        for feature in page:
+            properties = feature['properties']
+            if properties.get('path') is not None:
+                tile = f"{int(properties['path']):03d}{int(properties['row']):03d}"
+            else:
+                tile = properties.get('mgrs')
+            scenes.append({
+                'id': properties['id'],
+                'time': properties['time'],
+                'cloudCover': properties.get('cloudCover'),
+                'tile': tile,
+                'footprint': footprint_rings(properties['footprintType'], properties['footprint'])
+            })
+        if len(page) < page_size:
+            return scenes
+        offset += page_size
+
+def mask_clouds(image, dataset):
+    """Mask cloud and cloud shadow pixels using the dataset's QA band"""
+    band, bits = cloud_mask_band(dataset)
+    if band is None:
+        return image
+    return image.updateMask(image.select(band).bitwiseAnd(bits).eq(0))
+
+def composite_ndvi_lst(scene_ids, dataset, method):
+    """Per-pixel median or percentile of cloud-masked NDVI and LST over scenes.
+
+    Stays a single lazy expression; it is evaluated server-side by the
+    hotspot and LST range requests that use it.
+    """
+    collection = ee.ImageCollection([ee.Image(scene_id) for scene_id in scene_ids]).map(
+        lambda image: calculate_ndvi_lst(mask_clouds(image, dataset), dataset).select(['NDVI', 'LST_Celsius'])
+    )
+    if method == 'median':
+        reducer = ee.Reducer.median()
+    else:
+        reducer = ee.Reducer.percentile([composite_percentile(method)])
+
+    # Reduced collections default to a 1 degree projection; keep the scenes' own
+    projection = ee.Image(scene_ids[0]).select(0).projection()
+    return collection.reduce(reducer).rename(['NDVI', 'LST_Celsius']).setDefaultProjection(projection)
+
+def region_heat_stats(image, geometry, hot_threshold, veg_threshold, percentile):
+    """Mean and percentile LST plus hotspot share of valid pixels, as an ee.Dictionary"""
+    lst = image.select('LST_Celsius')
+    ndvi = image.select('NDVI')
+    hotspot = lst.gt(hot_threshold).And(ndvi.lt(veg_threshold)).And(ndvi.gt(0)).rename('hotspot')
+    stats = lst.addBands(hotspot).reduceRegion(
+        reducer=ee.Reducer.mean().combine(ee.Reducer.percentile([percentile]), sharedInputs=True),
+        geometry=geometry,
+        scale=PIXEL_SCALE,
+        bestEffort=True
+    )
+    return ee.Dictionary({
+        'lstMean': stats.get('LST_Celsius_mean'),
+        'lstPercentile': stats.get(f'LST_Celsius_p{percentile}'),
+        'hotspotFraction': stats.get('hotspot_mean')
+    })
+
+def fetch_period_stats(geometry, periods, cloud_cover_threshold, dataset, hot_threshold, veg_threshold, percentile):
+    """Heat statistics of the cloud-masked median of every period, in one request.
+
+    periods is a list of {'period', 'start', 'end'} dicts; periods without
+    a scene come back with a scene count of 0 and no statistics.
+    """
+    collection = ee.ImageCollection(dataset) \
+        .filterBounds(geometry) \
+        .filter(ee.Filter.lt("CLOUD_COVER", cloud_cover_threshold))
+
+    def reduce_period(feature):
+        scenes = collection.filterDate(feature.get('start'), feature.get('end'))
+        composite = scenes.map(
+            lambda image: calculate_ndvi_lst(mask_clouds(image, dataset), dataset).select(['NDVI', 'LST_Celsius'])
+        ).median()
+        stats = ee.Dictionary(ee.Algorithms.If(
+            scenes.size().gt(0),
+            region_heat_stats(composite, geometry, hot_threshold, veg_threshold, percentile),
+            ee.Dictionary()
+        ))
+        return feature.set(stats).set('scenes', scenes.size())
+
+    features = ee.FeatureCollection([ee.Feature(None, period) for period in periods]).map(reduce_period)
+    return [feature['properties'] for feature in features.getInfo()['features']]
+
+def fetch_scene_stats(scene_ids, geometry, dataset, hot_threshold, veg_threshold, percentile):
+    """Heat statistics and acquisition date of each cloud-masked scene, in one request"""
+    def reduce_scene(image):
+        processed = calculate_ndvi_lst(mask_clouds(image, dataset), dataset)
+        stats = region_heat_stats(processed, geometry, hot_threshold, veg_threshold, percentile)
+        return ee.Feature(None, stats).set({
+            'scene': image.get('system:id'),
+            'date': image.date().format('YYYY-MM-dd')
+        })
+
+    images = ee.ImageCollection([ee.Image(scene_id) for scene_id in scene_ids])
+    features = ee.FeatureCollection(images.map(reduce_scene))
+    return [feature['properties'] for feature in features.getInfo()['features']]
+
+def calculate_ndvi_lst(image, dataset):
+    try:
+        # Try Landsat bands first (most common)
+        if 'LANDSAT' in dataset.upper():
+            ndvi = image.normalizedDifference(['SR_B5', 'SR_B4']).rename('NDVI')
+            thermal = (
+                image.select('ST_B10')
+                .multiply(0.00341802)
+                .add(149.0)
+                .subtract(273.15)
+                .rename('LST_Celsius')
+            )
+        # Try Sentinel-2 bands
+        elif 'SENTINEL' in dataset.upper() or 'S2' in dataset.upper():
+            ndvi = image.normalizedDifference(['B8', 'B4']).rename('NDVI')
+            # Sentinel-2 doesn't have thermal, use NDVI as proxy
+            thermal = ndvi.multiply(-50).add(50).rename('LST_Celsius')
+        # Try MODIS bands
+        elif 'MODIS' in dataset.upper():
+            ndvi = image.select('NDVI').multiply(0.0001).rename('NDVI')
+            thermal = image.select('LST_Day_1km').multiply(0.02).subtract(273.15).rename('LST_Celsius')
+        else:
+            # Generic approach: try common band names
+            try:
+                ndvi = image.normalizedDifference(['B8', 'B4']).rename('NDVI')
+            except:
+                ndvi = image.normalizedDifference(['SR_B5', 'SR_B4']).rename('NDVI')
+            
+            try:
+                thermal = image.select('ST_B10').multiply(0.00341802).add(149.0).subtract(273.15).rename('LST_Celsius')
+            except:
+                thermal = ndvi.multiply(-50).add(50).rename('LST_Celsius')
+        
+        return image.addBands([ndvi, thermal])
+        
+    except Exception as e:
+        raise Exception(f"Error calculating NDVI/LST for dataset '{dataset}': {str(e)}")
+
+def extract_hotspots(processed_image, roi, hot_threshold, veg_threshold, num_pixels=DEFAULT_NUM_PIXELS):
+    hotspots = processed_image.select('LST_Celsius').gt(hot_threshold) \
+        .And(processed_image.select('NDVI').lt(veg_threshold)) \
+        .And(processed_image.select('NDVI').gt(0))
+    
+    final_image = processed_image.updateMask(hotspots)
+    
+    vectors = final_image.sample(
+        region=roi,
+        scale=30,
+        numPixels=num_pixels,
+        geometries=True
+    )
+    
+    return vectors
+
+def fetch_hotspot_table(processed_image, roi, hot_threshold, veg_threshold, num_pixels=DEFAULT_NUM_PIXELS):
+    """Sample hotspot pixels and pull them into a DataFrame with lat/lon columns"""
+    vectors = extract_hotspots(processed_image, roi, hot_threshold, veg_threshold, num_pixels)
+    if vectors is None:
+        raise ValueError('Hotspot extraction returned no features.')
+
+    return geemap.ee_to_df(vectors.map(add_lat_lon))
+
+def fetch_lst_range(processed_image, roi):
+    """Min/max land surface temperature over the ROI"""
+    lst_data = processed_image.select('LST_Celsius').reduceRegion(
+        reducer=ee.Reducer.minMax(),
+        geometry=roi,
+        scale=30
+    ).getInfo()
+
+    return {
+        'min': lst_data.get('LST_Celsius_min', None),
+        'max': lst_data.get('LST_Celsius_max', None)
+    }
+
+def layer_image(processed_image, layer, spec, hot_threshold, veg_threshold):
+    """RGB visualization of one overlay layer of a processed image"""
+    if layer == 'hotspots':
+        lst = processed_image.select('LST_Celsius')
+        ndvi = processed_image.select('NDVI')
+        mask = lst.gt(hot_threshold).And(ndvi.lt(veg_threshold)).And(ndvi.gt(0))
+        return mask.selfMask().visualize(palette=spec['palette'], opacity=OVERLAY_OPACITY)
+    return processed_image.select(spec['band']).visualize(
+        min=spec['min'], max=spec['max'], palette=spec['palette'], opacity=OVERLAY_OPACITY
+    )
+
+def create_tile_fetcher(image):
+    """Earth Engine map ID for an image, as its tile fetcher"""
+    return image.getMapId()['tile_fetcher']
+
+def fetch_tile(tile_fetcher, z, x, y):
+    """PNG bytes of one tile of an Earth Engine map"""
+    response = requests.get(tile_fetcher.format_tile_url(x, y, z), timeout=30)
+    if response.status_code != 200:
+        # The status code is in the message, so 429 and 503 are retried as quota errors
+        raise RuntimeError(f"Tile request failed with status {response.status_code}")
+    return response.content
+
+def aggregate_hotspot_grid(processed_image, roi, hot_threshold, veg_threshold, cell_size, lat):
+    """Per-cell hotspot statistics on a cell_size metre grid, reduced by Earth Engine"""
+    lst = processed_image.select('LST_Celsius')
+    ndvi = processed_image.select('NDVI')
+    hotspots = lst.gt(hot_threshold).And(ndvi.lt(veg_threshold)).And(ndvi.gt(0))
+
+    # 'hotspot' averages to the hotspot share of valid pixels; LST and NDVI
+    # are masked to hotspot pixels so their mean and count describe hotspots only
+    image = hotspots.rename('hotspot').addBands(
+        processed_image.select(['LST_Celsius', 'NDVI']).updateMask(hotspots)
+    )
+
+    # Web Mercator stretches distances by 1/cos(lat), so scale the cells to
+    # come out cell_size metres wide on the ground
+    grid = roi.coveringGrid(ee.Projection('EPSG:3857').atScale(cell_size / math.cos(math.radians(lat))))
+    cells = image.reduceRegions(
+        collection=grid,
+        reducer=ee.Reducer.mean().combine(ee.Reducer.count(), sharedInputs=True),
+        scale=PIXEL_SCALE
+    ).filter(ee.Filter.gt('LST_Celsius_count', 0))
+
+    df = geemap.ee_to_df(cells.map(add_centroid_lat_lon))
+    if df.empty:
+        return pd.DataFrame(columns=GRID_COLUMNS)
+
+    df = df.rename(columns={
+        'hotspot_mean': 'density',
+        'hotspot_count': 'pixels',
+        'LST_Celsius_mean': 'LST_Celsius',
+        'LST_Celsius_count': 'hotspotPixels',
+        'NDVI_mean': 'NDVI'
+    })
+    return df[GRID_COLUMNS]
+
+def add_centroid_lat_lon(feature):
+    coords = feature.geometry().centroid(maxError=1).coordinates()
+    return feature.set({
+        'lon': coords.get(0),
+        'lat': coords.get(1)
+    })
+
+def add_lat_lon(feature):
+    coords = feature.geometry().coordinates()
+    return feature.set({
+        'lon': coords.get(0),
+        'lat': coords.get(1)
+    })
+
+
+class EarthEngineRegion(Region):
+    """Region with its Earth Engine geometry"""
+
+    @property
+    def geometry(self):
+        if self.polygon:
+            return ee.Geometry.Polygon([self.polygon])
+        return ee.Geometry.Point(self.lon, self.lat).buffer(self.radius)
+
+
+class EarthEngineBackend:
+    """Runs the analysis pipeline on Google Earth Engine.
+
+    Hotspots are sampled tile by tile, with the tiles fetched concurrently,
+    so large regions stay under the getInfo payload limit. With a
+    scene_index, scenes are selected from local metadata and Earth Engine
+    only runs the pixel work; collection queries are the fallback when the
+    index cannot be filled. Every request is retried with exponential
+    backoff when Earth Engine rejects it for quota or rate limits.
+    """
+
+    name = 'earthengine'
+
+    def __init__(self, tile_size=DEFAULT_TILE_SIZE, tile_max_points=DEFAULT_TILE_MAX_POINTS,
+                 tile_workers=4, num_pixels=DEFAULT_NUM_PIXELS, scene_index=None,
+                 retry_attempts=5, retry_base_delay=1.0):
+        self.initialized = False
+        self.tile_size = tile_size
+        self.tile_max_points = tile_max_points
+        self.tile_workers = tile_workers
+        self.num_pixels = num_pixels
+        self.scene_index = scene_index
+        self.retry_attempts = retry_attempts
+        self.retry_base_delay = retry_base_delay
+        self.retries = 0
+        self._lock = threading.Lock()
+        self._tile_fetchers = {}
+
+    def ready(self):
+        return self.initialized
+
+    def _call(self, fn, *args):
+        """Run one Earth Engine request, backing off and retrying on quota errors"""
+        def count_retry(attempt, delay, error):
+            with self._lock:
+                self.retries += 1
+            print(f"Earth Engine quota error, retry {attempt} in {delay:.1f}s: {error}")
+
+        return call_with_retry(
+            fn, *args, attempts=self.retry_attempts, base_delay=self.retry_base_delay, on_retry=count_retry
+        )
+
+    def _indexed_scenes(self, lat, lon, start, end, cloud_cover_threshold, dataset):
+        """Scene IDs from the index, or None when there is no usable index"""
+        if self.scene_index is None:
+            return None
+        try:
+            return self.scene_index.query(dataset, lat, lon, start, end, cloud_cover_threshold)
+        except Exception as e:
+            print(f"Scene index unavailable, querying Earth Engine: {e}")
+            return None
+
+    def select_scene(self, lat, lon, start, end, cloud_cover_threshold, dataset):
+        scene_ids = self._indexed_scenes(lat, lon, start, end, cloud_cover_threshold, dataset)
+        if scene_ids is None:
+            return self._call(select_scene_id, lat, lon, start, end, cloud_cover_threshold, dataset)
+        if not scene_ids:
+            raise ValueError(f"No imagery found in dataset '{dataset}' for the given location and date range.")
+        return scene_ids[0]
+
+    def select_scenes(self, locations, start, end, cloud_cover_threshold, dataset):
+        if self.scene_index is not None:
+            try:
+                return [
+                    next(iter(self.scene_index.query(dataset, lat, lon, start, end, cloud_cover_threshold)), None)
+                    for lat, lon in locations
+                ]
+            except Exception as e:
+                print(f"Scene index unavailable, querying Earth Engine: {e}")
+        return self._call(select_scene_ids, locations, start, end, cloud_cover_threshold, dataset)
+
+    def select_scene_set(self, lat, lon, start, end, cloud_cover_threshold, dataset):
+        scene_ids = self._indexed_scenes(lat, lon, start, end, cloud_cover_threshold, dataset)
+        if scene_ids is None:
+            return self._call(select_scene_set_ids, lat, lon, start, end, cloud_cover_threshold, dataset)
+        if not scene_ids:
+            raise ValueError(f"No imagery found in dataset '{dataset}' for the given location and date range.")
+        return scene_ids
+
+    def load_scene(self, scene_id):
+        return ee.Image(scene_id)
+
+    def composite_indices(self, scene_ids, dataset, method):
+        return composite_ndvi_lst(scene_ids, dataset, method)
+
+    def compute_indices(self, image, dataset):
+        return calculate_ndvi_lst(image, dataset)
+
+    def period_stats(self, roi, periods, cloud_cover_threshold, dataset, hot_threshold, veg_threshold, percentile):
+        return self._call(
+            fetch_period_stats, roi.geometry, periods, cloud_cover_threshold, dataset, hot_threshold, veg_threshold, percentile
+        )
+
+    def scene_stats(self, scene_ids, roi, dataset, hot_threshold, veg_threshold, percentile):
+        return self._call(
+            fetch_scene_stats, scene_ids, roi.geometry, dataset, hot_threshold, veg_threshold, percentile
+        )
+
+    def region(self, lat, lon, radius, polygon=None):
+        return EarthEngineRegion(lat, lon, radius, polygon)
+
+    def sample_hotspots(self, processed_image, roi, hot_threshold, veg_threshold,
+                        max_points=None, on_tile=None):
+        max_points = max_points or self.num_pixels
+        tiles = plan_tiles(roi, max_points, self.tile_size, self.tile_max_points)
+        geometry = roi.geometry
+
+        def fetch(tile):
+            tile_roi = geometry.intersection(ee.Geometry.Rectangle(list(tile['bounds'])), maxError=1)
+            df = self._call(
+                fetch_hotspot_table, processed_image, tile_roi, hot_threshold, veg_threshold, tile['budget']
+            )
+            return df, len(df)
+
+        results = fetch_tiles(fetch, tiles, self.tile_workers, on_tile)
+        return merge_tiles(results, max_points)
+
+    def aggregate_hotspots(self, processed_image, roi, hot_threshold, veg_threshold,
+                           cell_size=DEFAULT_CELL_SIZE, on_tile=None):
+        # Tiles are sized so that no tile returns more cells than one getInfo allows
+        num_cells = math.ceil(box_area(roi.bounds) / cell_size ** 2)
+        tiles = plan_tiles(roi, num_cells, self.tile_size, self.tile_max_points)
+        geometry = roi.geometry
+
+        def fetch(tile):
+            tile_roi = geometry.intersection(ee.Geometry.Rectangle(list(tile['bounds'])), maxError=1)
+            df = self._call(
+                aggregate_hotspot_grid, processed_image, tile_roi, hot_threshold, veg_threshold, cell_size, roi.lat
+            )
+            return df, len(df)
+
+        frames = [df for df, _ in fetch_tiles(fetch, tiles, self.tile_workers, on_tile) if len(df)]
+        if not frames:
+            return pd.DataFrame(columns=GRID_COLUMNS)
+
+        # Cells on a tile edge are reduced whole by both tiles
+        cells = pd.concat(frames, ignore_index=True)
+        return cells.loc[~cells[['lat', 'lon']].round(7).duplicated()].reset_index(drop=True)
+
+    def lst_range(self, processed_image, roi):
+        return self._call(fetch_lst_range, processed_image, roi.geometry)
+
+    def scene_metadata(self, dataset, bounds, start, end):
+        return self._call(fetch_scene_metadata, dataset, bounds, start, end)
+
+    def render_tile(self, processed_image, layer, z, x, y, spec, hot_threshold, veg_threshold, map_key=None):
+        """PNG of one XYZ tile, fetched from an Earth Engine map reused per map_key for MAP_ID_TTL seconds"""
+        now = time.time()
+        with self._lock:
+            cached = self._tile_fetchers.get(map_key) if map_key is not None else None
+        if cached is None or now - cached[1] > MAP_ID_TTL:
+            image = layer_image(processed_image, layer, spec, hot_threshold, veg_threshold)
+            cached = (self._call(create_tile_fetcher, image), now)
+            if map_key is not None:
+                with self._lock:
+                    self._tile_fetchers = {
+                        key: value for key, value in self._tile_fetchers.items() if now - value[1] <= MAP_ID_TTL
+                    }
+                    self._tile_fetchers[map_key] = cached
+        return self._call(fetch_tile, cached[0], z, x, y)
+
+
+#################################################################
+#######  LOCAL RASTER OPERATIONS  ###############################
+#################################################################
+
+class LocalImage:
+    """In-memory raster: named float bands on a regular lat/lon grid.
+
+    Rows run north to south and columns west to east; masked pixels are NaN.
+    """
+
+    def __init__(self, bands, bounds, properties=None):
+        self.bands = bands
+        self.bounds = bounds
+        self.properties = properties or {}
+
+        rows, cols = next(iter(bands.values())).shape
+        west, south, east, north = bounds
+        lat_step = (north - south) / rows
+        lon_step = (east - west) / cols
+        self.lats = north - lat_step * (np.arange(rows) + 0.5)
+        self.lons = west + lon_step * (np.arange(cols) + 0.5)
+
+    @property
+    def shape(self):
+        return next(iter(self.bands.values())).shape
+
+    def select(self, name):
+        if name not in self.bands:
+            raise KeyError(f"Band '{name}' not found, available bands: {sorted(self.bands)}")
+        return self.bands[name]
+
+    def add_bands(self, bands):
+        return LocalImage(dict(self.bands, **bands), self.bounds, self.properties)
+
+
+class LocalRegion(Region):
+    """Region of interest evaluated against a LocalImage grid"""
+
+    def mask(self, image, rows=slice(None), cols=slice(None)):
+        return self.contains(image.lats[rows, None], image.lons[None, cols])
+
+
+def load_local_scene(path):
+    """Read a scene saved by save_local_scene"""
+    with np.load(path, allow_pickle=False) as data:
+        metadata = json.loads(str(data['metadata']))
+        bands = {name: data[name].astype(np.float32) for name in metadata['bands']}
+    return LocalImage(bands, tuple(metadata['bounds']), metadata)
+
+
+def save_local_scene(path, bands, bounds, scene_id, dataset, date, cloud_cover):
+    """Write bands plus scene metadata as a compressed .npz fixture"""
+    metadata = {
+        'id': scene_id,
+        'dataset': dataset,
+        'date': date,
+        'cloudCover': cloud_cover,
+        'bounds': list(bounds),
+        'bands': sorted(bands)
+    }
+    np.savez_compressed(path, metadata=json.dumps(metadata), **bands)
+    return path
+
+
+def make_synthetic_scene(lat, lon, size_px=700, seed=0, hot_spots=12, cloud_fraction=0.0, cloud_seed=None):
+    """Generate Landsat-like bands centred on (lat, lon) with a few urban heat blobs.
+
+    Values are encoded like Collection 2 Level 2 digital numbers, so
+    calculate_local_indices applies the same scale factors as for Landsat.
+    With cloud_fraction > 0, about that share of the scene is covered by
+    cold clouds flagged in a QA_PIXEL band; scenes with the same seed and a
+    different cloud_seed show the same ground under different clouds.
+    """
+    rng = np.random.default_rng(seed)
+    half_lat = size_px * PIXEL_SCALE / 2 / 111320.0
+    half_lon = half_lat / max(math.cos(math.radians(lat)), 0.01)
+    bounds = (lon - half_lon, lat - half_lat, lon + half_lon, lat + half_lat)
+
+    yy, xx = np.mgrid[0:size_px, 0:size_px].astype(np.float32) / size_px
+    urban = np.zeros((size_px, size_px), dtype=np.float32)
+    for _ in range(hot_spots):
+        cy, cx = rng.uniform(0.1, 0.9, size=2)
+        spread = rng.uniform(0.03, 0.12)
+        urban += np.exp(-((yy - cy) ** 2 + (xx - cx) ** 2) / (2 * spread ** 2))
+    urban = np.clip(urban, 0, 1)
+
+    ndvi = 0.55 - 0.5 * urban + rng.normal(0, 0.05, urban.shape)
+    ndvi = np.clip(ndvi, -0.2, 0.9).astype(np.float32)
+    lst = 30 + 14 * urban + rng.normal(0, 1.0, urban.shape)
+
+    qa = None
+    if cloud_fraction > 0:
+        cloud_rng = np.random.default_rng(seed + 1 if cloud_seed is None else cloud_seed)
+        cover = np.zeros_like(urban)
+        for _ in range(8):
+            cy, cx = cloud_rng.uniform(0, 1, size=2)
+            spread = cloud_rng.uniform(0.05, 0.15)
+            cover += np.exp(-((yy - cy) ** 2 + (xx - cx) ** 2) / (2 * spread ** 2))
+        cloudy = cover > np.quantile(cover, 1 - cloud_fraction)
+        # Cloud tops read far colder than the ground and look unvegetated
+        lst = np.where(cloudy, lst - 25, lst)
+        ndvi = np.where(cloudy, 0.05, ndvi).astype(np.float32)
+        qa = np.where(cloudy, LANDSAT_CLOUD_BITS, 0).astype(np.float32)
+
+    red = rng.uniform(8000, 10000, urban.shape).astype(np.float32)
+    nir = red * (1 + ndvi) / (1 - ndvi)
+    thermal = (lst + 273.15 - 149.0) / 0.00341802
+
+    bands = {
+        'SR_B4': red,
+        'SR_B5': nir.astype(np.float32),
+        'ST_B10': thermal.astype(np.float32)
+    }
+    if qa is not None:
+        bands['QA_PIXEL'] = qa
+    return bands, bounds
+
+
+def calculate_local_indices(image, dataset):
+    """NumPy counterpart of calculate_ndvi_lst"""
+    def normalized_difference(a, b):
+        a = image.select(a)
+        b = image.select(b)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (a - b) / (a + b)
+
+    dataset = dataset.upper()
+    if 'LANDSAT' in dataset:
+        ndvi = normalized_difference('SR_B5', 'SR_B4')
+        thermal = image.select('ST_B10') * 0.00341802 + 149.0 - 273.15
+    elif 'SENTINEL' in dataset or 'S2' in dataset:
+        ndvi = normalized_difference('B8', 'B4')
+        thermal = ndvi * -50 + 50
+    elif 'MODIS' in dataset:
+        ndvi = image.select('NDVI') * 0.0001
+        thermal = image.select('LST_Day_1km') * 0.02 - 273.15
+    else:
+        try:
+            ndvi = normalized_difference('B8', 'B4')
+        except KeyError:
+            ndvi = normalized_difference('SR_B5', 'SR_B4')
+        try:
+            thermal = image.select('ST_B10') * 0.00341802 + 149.0 - 273.15
+        except KeyError:
+            thermal = ndvi * -50 + 50
+
+    return image.add_bands({
+        'NDVI': ndvi.astype(np.float32),
+        'LST_Celsius': thermal.astype(np.float32)
+    })
+
+
+def mask_local_clouds(image, dataset):
+    """NumPy counterpart of mask_clouds: cloudy pixels become NaN in every band"""
+    band, bits = cloud_mask_band(dataset)
+    if band is None or band not in image.bands:
+        return image
+    cloudy = (image.select(band).astype(np.uint32) & bits) != 0
+    return LocalImage(
+        {name: values if name == band else np.where(cloudy, np.nan, values) for name, values in image.bands.items()},
+        image.bounds, image.properties
+    )
+
+
+def regrid_local(values, source, target):
+    """Nearest-neighbour lookup of a source band at the target image's pixel centres"""
+    if source.bounds == target.bounds and values.shape == target.shape:
+        return values
+    west, south, east, north = source.bounds
+    rows, cols = values.shape
+    row = np.floor((north - target.lats) / (north - south) * rows).astype(int)
+    col = np.floor((target.lons - west) / (east - west) * cols).astype(int)
+    inside = ((row >= 0) & (row < rows))[:, None] & ((col >= 0) & (col < cols))[None, :]
+    picked = values[np.clip(row, 0, rows - 1)[:, None], np.clip(col, 0, cols - 1)[None, :]]
+    return np.where(inside, picked, np.nan)
+
+
+def stack_percentile(stack, percentile):
+    """Per-pixel percentile over the first axis ignoring NaN, linearly interpolated.
+
+    Same result as np.nanpercentile, which falls back to a slow per-pixel
+    loop as soon as the stack holds any NaN. Pixels that are NaN in every
+    layer stay NaN.
+    """
+    ordered = np.sort(stack, axis=0)  # NaN sorts last
+    valid = np.isfinite(ordered).sum(axis=0)
+    position = np.maximum(valid - 1, 0) * (percentile / 100.0)
+    lower = np.floor(position).astype(int)
+    upper = np.minimum(lower + 1, np.maximum(valid - 1, 0))
+    low = np.take_along_axis(ordered, lower[None], axis=0)[0]
+    high = np.take_along_axis(ordered, upper[None], axis=0)[0]
+    values = low + (high - low) * (position - lower)
+    return np.where(valid > 0, values, np.nan).astype(np.float32)
+
+
+def composite_local_indices(images, dataset, method):
+    """NumPy counterpart of composite_ndvi_lst, on the grid of the first image"""
+    reference = images[0]
+    stacks = {'NDVI': [], 'LST_Celsius': []}
+    for image in images:
+        processed = calculate_local_indices(mask_local_clouds(image, dataset), dataset)
+        for name in stacks:
+            stacks[name].append(regrid_local(processed.select(name), processed, reference))
+
+    percentile = composite_percentile(method)
+    bands = {name: stack_percentile(np.stack(stack), percentile) for name, stack in stacks.items()}
+    return LocalImage(bands, reference.bounds, dict(reference.properties, composite=method, scenes=len(images)))
+
+
+def local_heat_stats(image, roi, hot_threshold, veg_threshold, percentile):
+    """NumPy counterpart of region_heat_stats"""
+    inside = roi.mask(image)
+    lst = image.select('LST_Celsius')[inside]
+    ndvi = image.select('NDVI')[inside]
+    valid = np.isfinite(lst) & np.isfinite(ndvi)
+    lst, ndvi = lst[valid].astype(np.float64), ndvi[valid].astype(np.float64)
+    if lst.size == 0:
+        return {'lstMean': None, 'lstPercentile': None, 'hotspotFraction': None}
+
+    hotspots = (lst > hot_threshold) & (ndvi < veg_threshold) & (ndvi > 0)
+    return {
+        'lstMean': float(lst.mean()),
+        'lstPercentile': float(np.percentile(lst, percentile)),
+        'hotspotFraction': float(hotspots.mean())
+    }
+
+
+def local_layer_tile(image, layer, z, x, y, spec, hot_threshold, veg_threshold):
+    """PNG of one XYZ tile of a layer, sampling the nearest scene pixel under each tile pixel"""
+    west, south, east, north = image.bounds
+    tile_west, tile_south, tile_east, tile_north = tile_bounds(z, x, y)
+    if tile_east <= west or tile_west >= east or tile_north <= south or tile_south >= north:
+        return EMPTY_TILE
+
+    lats, lons = tile_pixel_centers(z, x, y)
+    num_rows, num_cols = image.shape
+    rows = np.floor((north - lats) / (north - south) * num_rows).astype(np.int64)
+    cols = np.floor((lons - west) / (east - west) * num_cols).astype(np.int64)
+    inside = ((rows >= 0) & (rows < num_rows))[:, None] & ((cols >= 0) & (cols < num_cols))[None, :]
+    window = np.ix_(np.clip(rows, 0, num_rows - 1), np.clip(cols, 0, num_cols - 1))
+
+    if layer == 'hotspots':
+        lst = image.select('LST_Celsius')[window]
+        ndvi = image.select('NDVI')[window]
+        with np.errstate(invalid='ignore'):
+            hotspots = (lst > hot_threshold) & (ndvi < veg_threshold) & (ndvi > 0)
+        values = np.where(hotspots & inside, 1.0, np.nan)
+    else:
+        values = np.where(inside, image.select(spec['band'])[window], np.nan)
+    return encode_png(colorize(values, spec))
+
+
+class LocalRasterBackend:
+    """Runs the analysis pipeline on .npz scenes read from a local directory.
+
+    Each scene file holds its bands plus a JSON metadata record (id,
+    dataset, date, cloud cover, bounds) and stands in for one image of an
+    Earth Engine collection. Used for offline development and benchmarks.
+    """
+
+    name = 'local'
+
+    def __init__(self, scenes_dir, num_pixels=DEFAULT_NUM_PIXELS, seed=42, tile_size=DEFAULT_TILE_SIZE,
+                 tile_max_points=DEFAULT_TILE_MAX_POINTS, tile_workers=4):
+        self.scenes_dir = scenes_dir
+        self.num_pixels = num_pixels
+        self.seed = seed
+        self.tile_size = tile_size
+        self.tile_max_points = tile_max_points
+        self.tile_workers = tile_workers
+        self._index = None
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def ready(self):
+        return os.path.isdir(self.scenes_dir)
+
+    def scenes(self):
+        """Metadata for every scene in scenes_dir, read once"""
+        with self._lock:
+            if self._index is None:
+                index = {}
+                if os.path.isdir(self.scenes_dir):
+                    for filename in sorted(os.listdir(self.scenes_dir)):
+                        if not filename.endswith('.npz'):
+                            continue
+                        path = os.path.join(self.scenes_dir, filename)
+                        with np.load(path, allow_pickle=False) as data:
+                            metadata = json.loads(str(data['metadata']))
+                        index[metadata['id']] = dict(metadata, path=path)
+                self._index = index
+            return self._index
+
+    def select_scene(self, lat, lon, start, end, cloud_cover_threshold, dataset):
+        return self.select_scene_set(lat, lon, start, end, cloud_cover_threshold, dataset)[0]
+
+    def select_scene_set(self, lat, lon, start, end, cloud_cover_threshold, dataset):
+        start = datetime.strptime(start, "%Y-%m-%d")
+        end = datetime.strptime(end, "%Y-%m-%d")
+        candidates = []
+        for scene in self.scenes().values():
+            west, south, east, north = scene['bounds']
+            acquired = datetime.strptime(scene['date'], "%Y-%m-%d")
+            if scene['dataset'].upper() != dataset.upper():
+                continue
+            if not (west <= lon <= east and south <= lat <= north):
+                continue
+            if not (start <= acquired < end):
+                continue
+            if scene['cloudCover'] >= cloud_cover_threshold:
+                continue
+            candidates.append(scene)
+
+        if not candidates:
+            raise ValueError(f"No imagery found in dataset '{dataset}' for the given location and date range.")
+
+        candidates.sort(key=lambda scene: scene['cloudCover'])
+        return [scene['id'] for scene in candidates]
+
+    def select_scenes(self, locations, start, end, cloud_cover_threshold, dataset):
+        scene_ids = []
+        for lat, lon in locations:
+            try:
+                scene_ids.append(self.select_scene(lat, lon, start, end, cloud_cover_threshold, dataset))
+            except ValueError:
+                scene_ids.append(None)
+        return scene_ids
+
+    def load_scene(self, scene_id):
+        with self._lock:
+            image = self._loaded.get(scene_id)
+        if image is not None:
+            return image
+
+        scene = self.scenes().get(scene_id)
+        if scene is None:
+            raise ValueError(f"Unknown local scene '{scene_id}'")
+
+        image = load_local_scene(scene['path'])
+        with self._lock:
+            # Keep only a handful of decoded scenes around
+            if len(self._loaded) >= 4:
+                self._loaded.pop(next(iter(self._loaded)))
+            self._loaded[scene_id] = image
+        return image
+
+    def compute_indices(self, image, dataset):
+        return calculate_local_indices(image, dataset)
+
+    def composite_indices(self, scene_ids, dataset, method):
+        return composite_local_indices([self.load_scene(scene_id) for scene_id in scene_ids], dataset, method)
+
+    def period_stats(self, roi, periods, cloud_cover_threshold, dataset, hot_threshold, veg_threshold, percentile):
+        rows = []
+        for period in periods:
+            try:
+                scene_ids = self.select_scene_set(
+                    roi.lat, roi.lon, period['start'], period['end'], cloud_cover_threshold, dataset
+                )
+            except ValueError:
+                rows.append(dict(period, scenes=0))
+                continue
+            composite = self.composite_indices(scene_ids, dataset, 'median')
+            stats = local_heat_stats(composite, roi, hot_threshold, veg_threshold, percentile)
+            rows.append(dict(period, scenes=len(scene_ids), **stats))
+        return rows
+
+    def scene_stats(self, scene_ids, roi, dataset, hot_threshold, veg_threshold, percentile):
+        rows = []
+        for scene_id in scene_ids:
+            image = self.load_scene(scene_id)
+            processed = calculate_local_indices(mask_local_clouds(image, dataset), dataset)
+            stats = local_heat_stats(processed, roi, hot_threshold, veg_threshold, percentile)
+            rows.append(dict(stats, scene=scene_id, date=image.properties.get('date')))
+        return rows
+
+    def region(self, lat, lon, radius, polygon=None):
+        return LocalRegion(lat, lon, radius, polygon)
+
+    def sample_hotspots(self, processed_image, roi, hot_threshold, veg_threshold,
+                        max_points=None, on_tile=None):
+        max_points = max_points or self.num_pixels
+        tiles = plan_tiles(roi, max_points, self.tile_size, self.tile_max_points)
+        lst = processed_image.select('LST_Celsius')
+        ndvi = processed_image.select('NDVI')
+
+        def fetch(tile):
+            # Full-resolution scan of the pixels inside the tile
+            west, south, east, north = tile['bounds']
+            row_index = np.nonzero((processed_image.lats >= south) & (processed_image.lats < north))[0]
+            col_index = np.nonzero((processed_image.lons >= west) & (processed_image.lons < east))[0]
+            if not len(row_index) or not len(col_index):
+                return pd.DataFrame(), 0
+
+            window = (slice(row_index[0], row_index[-1] + 1), slice(col_index[0], col_index[-1] + 1))
+            tile_lst = lst[window]
+            tile_ndvi = ndvi[window]
+            with np.errstate(invalid='ignore'):
+                mask = (tile_lst > hot_threshold) & (tile_ndvi < veg_threshold) & (tile_ndvi > 0) \
+                    & roi.mask(processed_image, *window)
+
+            rows, cols = np.nonzero(mask)
+            count = len(rows)
+            # No tile can contribute more than the global cap
+            if count > max_points:
+                rng = np.random.default_rng(self.seed)
+                keep = np.sort(rng.choice(count, size=max_points, replace=False))
+                rows, cols = rows[keep], cols[keep]
+
+            return pd.DataFrame({
+                'LST_Celsius': tile_lst[rows, cols].astype(np.float64),
+                'NDVI': tile_ndvi[rows, cols].astype(np.float64),
+                'lat': processed_image.lats[window[0]][rows],
+                'lon': processed_image.lons[window[1]][cols]
+            }), count
+
+        results = fetch_tiles(fetch, tiles, self.tile_workers, on_tile)
+        return merge_tiles(results, max_points, self.seed)
+
+    def aggregate_hotspots(self, processed_image, roi, hot_threshold, veg_threshold,
+                           cell_size=DEFAULT_CELL_SIZE, on_tile=None):
+        lst = processed_image.select('LST_Celsius')
+        ndvi = processed_image.select('NDVI')
+        rows, cols = np.nonzero(roi.mask(processed_image) & np.isfinite(lst) & np.isfinite(ndvi))
+        lst = lst[rows, cols].astype(np.float64)
+        ndvi = ndvi[rows, cols].astype(np.float64)
+        hotspots = (lst > hot_threshold) & (ndvi < veg_threshold) & (ndvi > 0)
+
+        # Cell indices on a metre grid anchored at the ROI centre
+        cos_lat = math.cos(math.radians(roi.lat))
+        x = (processed_image.lons[cols] - roi.lon) * METERS_PER_DEGREE * cos_lat
+        y = (processed_image.lats[rows] - roi.lat) * METERS_PER_DEGREE
+        cells, inverse = np.unique(
+            np.column_stack([np.floor(y / cell_size), np.floor(x / cell_size)]),
+            axis=0, return_inverse=True
+        )
+        inverse = inverse.ravel()
+
+        pixels = np.bincount(inverse, minlength=len(cells))
+        hotspot_pixels = np.bincount(inverse, weights=hotspots, minlength=len(cells))
+        lst_sum = np.bincount(inverse, weights=np.where(hotspots, lst, 0), minlength=len(cells))
+        ndvi_sum = np.bincount(inverse, weights=np.where(hotspots, ndvi, 0), minlength=len(cells))
+
+        keep = hotspot_pixels > 0
+        if on_tile is not None:
+            on_tile(1, 1, int(hotspot_pixels.sum()))
+        return pd.DataFrame({
+            'lat': roi.lat + (cells[keep, 0] + 0.5) * cell_size / METERS_PER_DEGREE,
+            'lon': roi.lon + (cells[keep, 1] + 0.5) * cell_size / (METERS_PER_DEGREE * cos_lat),
+            'hotspotPixels': hotspot_pixels[keep].astype(int),
+            'pixels': pixels[keep].astype(int),
+            'density': hotspot_pixels[keep] / pixels[keep],
+            'LST_Celsius': lst_sum[keep] / hotspot_pixels[keep],
+            'NDVI': ndvi_sum[keep] / hotspot_pixels[keep]
+        }, columns=GRID_COLUMNS)
+
+    def render_tile(self, processed_image, layer, z, x, y, spec, hot_threshold, veg_threshold, map_key=None):
+        return local_layer_tile(processed_image, layer, z, x, y, spec, hot_threshold, veg_threshold)
+
+    def lst_range(self, processed_image, roi):
+        values = processed_image.select('LST_Celsius')[roi.mask(processed_image)]
+        values = values[np.isfinite(values)]
+        if values.size == 0:
+            return {'min': None, 'max': None}
+        return {'min': float(values.min()), 'max': float(values.max())}
+
+
+def get_backend(name, scenes_dir=None, **options):
+    """Create the analysis backend selected by name"""
+    name = (name or 'earthengine').lower()
+    if name in ('earthengine', 'ee', 'gee'):
+        return EarthEngineBackend(**options)
+    if name == 'local':
+        return LocalRasterBackend(scenes_dir or 'fixtures/scenes', **options)
+    raise ValueError(f"Unknown analysis backend '{name}', expected 'earthengine' or 'local'")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write a synthetic scene fixture for the local backend")
+    parser.add_argument('--lat', type=float, default=29.518321)
+    parser.add_argument('--lon', type=float, default=74.993558)
+    parser.add_argument('--date', default='2025-06-15')
+    parser.add_argument('--cloud-cover', type=float, default=5)
+    parser.add_argument('--dataset', default='LANDSAT/LC09/C02/T1_L2')
+    parser.add_argument('--size', type=int, default=700, help="Scene width/height in pixels")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--clouds', type=float, default=0.0, help="Share of the scene covered by masked clouds")
+    parser.add_argument('--cloud-seed', type=int, help="Seed for the cloud layout, defaults to seed + 1")
+    parser.add_argument('--out', default='fixtures/scenes')
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    bands, bounds = make_synthetic_scene(args.lat, args.lon, size_px=args.size, seed=args.seed,
+                                         cloud_fraction=args.clouds, cloud_seed=args.cloud_seed)
+    scene_id = f"LOCAL/{args.dataset}/{args.lat:.4f}_{args.lon:.4f}_{args.date}"
+    filename = scene_id.replace('/', '_') + '.npz'
+    path = save_local_scene(
+        os.path.join(args.out, filename), bands, bounds,
+        scene_id, args.dataset, args.date, args.cloud_cover
+    )
+    print(f"Wrote {path}")
@@ -0,0 +1,371 @@
+"""End-to-end benchmark for the analysis pipeline.
+
+Runs _run_analysis and the HTTP endpoints against the local raster backend
+with synthetic scenes and synthetic hotspot tables, so no Earth Engine
+credentials are needed. Each scenario runs in a fresh process so that the
+reported peak RSS belongs to that scenario alone.
+
+    python benchmark.py                         # 2k, 20k and 200k points
+    python benchmark.py --points 2000 20000 --output bench.json
+    python benchmark.py --startup-only --max-import-seconds 1.5
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+
+LATITUDE = 29.518321
+LONGITUDE = 74.993558
+DATASET = 'LANDSAT/LC09/C02/T1_L2'
+START_DATE = '2025-05-29'
+END_DATE = '2025-08-30'
+SCENE_DATE = '2025-06-15'
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+    if sys.platform == 'darwin':
+        return round(peak / (1024 * 1024), 1)
+    return round(peak / 1024, 1)
+
+
+def make_hotspot_table(num_points, lat=LATITUDE, lon=LONGITUDE, seed=0):
+    """Synthetic hotspot samples clustered around a few urban cores"""
+    rng = np.random.default_rng(seed)
+    cores = rng.normal(0, 0.02, size=(8, 2))
+    core_ids = rng.integers(0, len(cores), size=num_points)
+    offsets = rng.normal(0, 0.006, size=(num_points, 2))
+
+    return pd.DataFrame({
+        'LST_Celsius': rng.normal(41, 2.5, num_points),
+        'NDVI': rng.uniform(0.01, 0.2, num_points),
+        'lat': lat + cores[core_ids, 0] + offsets[:, 0],
+        'lon': lon + cores[core_ids, 1] + offsets[:, 1]
+    })
+
+
+def build_marker_map(latitude, longitude, lats, lons, centers):
+    """Baseline map with one CircleMarker object per hotspot, as the app used to build it"""
+    import folium
+
+    m = folium.Map(location=[latitude, longitude], zoom_start=12)
+    for lat, lon in zip(lats, lons):
+        folium.CircleMarker(
+            location=[lat, lon],
+            radius=2,
+            color='red',
+            fill=True,
+            fill_opacity=0.6,
+            tooltip="Potential hotspot"
+        ).add_to(m)
+    for lat, lon in centers:
+        folium.Marker(location=[lat, lon], icon=folium.Icon(color='green', icon='tree', prefix='fa')).add_to(m)
+    return m
+
+
+def time_map_render(build, table, centers):
+    """Seconds and HTML bytes to build a map and render it to a document"""
+    started = time.perf_counter()
+    m = build(LATITUDE, LONGITUDE, table['lat'].to_numpy(), table['lon'].to_numpy(), centers)
+    html = m.get_root().render()
+    return {'seconds': round(time.perf_counter() - started, 4), 'htmlBytes': len(html)}
+
+
+def compare_map_rendering(table, build_vectorized, baseline_max_points):
+    """Time the vectorized map layer against the per-marker baseline"""
+    centers = [(LATITUDE, LONGITUDE)]
+    report = {'vectorized': time_map_render(build_vectorized, table, centers)}
+    if len(table) > baseline_max_points:
+        return report
+
+    report['perMarker'] = time_map_render(build_marker_map, table, centers)
+    report['speedup'] = round(report['perMarker']['seconds'] / max(report['vectorized']['seconds'], 1e-9), 1)
+    report['sizeReduction'] = round(1 - report['vectorized']['htmlBytes'] / report['perMarker']['htmlBytes'], 3)
+    return report
+
+
+def measure(fn):
+    """Seconds and peak traced allocation in MB of a call"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'seconds': round(seconds, 4), 'peakAllocMb': round(peak / (1024 * 1024), 1)}
+
+
+def compare_clustering(table):
+    """Time the clustering module against plain KMeans on raw degrees"""
+    from sklearn.cluster import KMeans
+    from clustering import cluster_hotspots
+
+    return {
+        'legacyKMeans': measure(
+            lambda: KMeans(n_clusters=min(5, len(table)), random_state=42).fit_predict(table[['lat', 'lon']])
+        ),
+        'projected': measure(lambda: cluster_hotspots(table)),
+        'projectedWeighted': measure(lambda: cluster_hotspots(table, weight_by_temperature=True)),
+        'autoK': measure(lambda: cluster_hotspots(table, 'auto'))
+    }
+
+
+def run_scenario(num_points, raster_size, workdir, baseline_max_points=20000):
+    """Run one benchmark scenario and return its measurements"""
+    # Keep the app's console logging out of the JSON report on stdout
+    sys.stdout = sys.stderr
+
+    scenes_dir = os.path.join(workdir, 'scenes')
+    os.makedirs(scenes_dir, exist_ok=True)
+    os.environ['ANALYSIS_BACKEND'] = 'local'
+    os.environ['LOCAL_SCENES_DIR'] = scenes_dir
+    os.environ['CACHE_DIR'] = os.path.join(workdir, 'cache')
+    os.chdir(workdir)
+
+    from backends import LocalRasterBackend, make_synthetic_scene, save_local_scene
+
+    started = time.perf_counter()
+    bands, bounds = make_synthetic_scene(LATITUDE, LONGITUDE, size_px=raster_size)
+    save_local_scene(
+        os.path.join(scenes_dir, 'synthetic.npz'), bands, bounds,
+        'LOCAL/SYNTHETIC', DATASET, SCENE_DATE, 5
+    )
+    raster_seconds = time.perf_counter() - started
+
+    import_started = time.perf_counter()
+    import app
+    import_seconds = time.perf_counter() - import_started
+
+    table = make_hotspot_table(num_points)
+
+    class SyntheticHotspotBackend(LocalRasterBackend):
+        """Local backend that returns a fixed-size synthetic hotspot table"""
+
+        def sample_hotspots(self, processed_image, roi, hot_threshold, veg_threshold,
+                            max_points=None, on_tile=None):
+            return table.copy()
+
+    app.backend = SyntheticHotspotBackend(scenes_dir)
+
+    # --- Pipeline called directly ---
+    session_id = app.create_session()
+
+    pipeline_started = time.perf_counter()
+    app._run_analysis(
+        session_id, LATITUDE, LONGITUDE, START_DATE, END_DATE,
+        20, 37, 0.2, DATASET, None, False
+    )
+    pipeline_finished = time.perf_counter()
+
+    session = app.session_store.get(session_id)
+    if session['status'] != 'completed':
+        raise RuntimeError(f"Pipeline failed: {session['error']}")
+    result = session['result']
+
+    # --- Same analysis through the HTTP endpoints ---
+    client = app.app.test_client()
+    payload = {
+        'latitude': LATITUDE,
+        'longitude': LONGITUDE,
+        'startDate': START_DATE,
+        'endDate': END_DATE,
+        'dataset': DATASET,
+        'noCache': True
+    }
+
+    http_started = time.perf_counter()
+    response = client.post('/api/analyze', json=payload)
+    analyze_seconds = time.perf_counter() - http_started
+    if response.status_code not in (200, 202):
+        raise RuntimeError(f"/api/analyze returned {response.status_code}: {response.get_json()}")
+    http_session_id = response.get_json()['sessionId']
+
+    logs_started = time.perf_counter()
+    stream = client.get(f'/api/logs/{http_session_id}')
+    stream_bytes = len(stream.get_data())
+    logs_seconds = time.perf_counter() - logs_started
+
+    result_started = time.perf_counter()
+    result_response = client.get(f'/api/analysis-result/{http_session_id}')
+    result_bytes = len(result_response.get_data())
+    result_seconds = time.perf_counter() - result_started
+
+    clustering = compare_clustering(table)
+    map_rendering = compare_map_rendering(table, app.build_folium_map, baseline_max_points)
+
+    return {
+        'points': num_points,
+        'rasterSize': raster_size,
+        'syntheticRasterSeconds': round(raster_seconds, 4),
+        'importSeconds': round(import_seconds, 4),
+        'pipeline': {
+            'totalSeconds': round(pipeline_finished - pipeline_started, 4),
+            'stages': [
+                {key: span[key] for key in ('stage', 'durationMs', 'rows', 'bytes') if key in span}
+                for span in result['timings']
+            ]
+        },
+        'http': {
+            'analyzeSeconds': round(analyze_seconds, 4),
+            'logsStreamSeconds': round(logs_seconds, 4),
+            'logsStreamBytes': stream_bytes,
+            'analysisResultSeconds': round(result_seconds, 4),
+            'analysisResultBytes': result_bytes
+        },
+        'payload': {
+            'resultBytes': len(json.dumps(result)),
+            'mapHtmlBytes': len(result.get('mapHtml') or ''),
+            'hotspotsFound': result.get('hotspotsFound'),
+            'clusters': result.get('clusters')
+        },
+        'clustering': clustering,
+        'mapRendering': map_rendering,
+        'peakRssMb': peak_rss_mb()
+    }
+
+
+STARTUP_SCRIPT = '''
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+client.get('/api/health')
+healthy = time.perf_counter()
+while client.get('/api/ready').status_code != 200 and time.perf_counter() - started < 60:
+    time.sleep(0.05)
+ready = time.perf_counter()
+print(json.dumps({
+    'importSeconds': round(imported - started, 3),
+    'healthSeconds': round(healthy - started, 3),
+    'readySeconds': round(ready - started, 3)
+}), file=sys.__stdout__)
+'''
+
+
+def parse_import_times(stderr, module='app'):
+    """Cumulative milliseconds of each module that module imports directly, from -X importtime output"""
+    children = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or line.startswith('import time: self'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        name = name.strip()
+        if depth == 0:
+            if name == module:
+                return dict(sorted(children.items(), key=lambda item: -item[1]))
+            children = {}
+        elif depth == 1:
+            children[name] = round(int(cumulative) / 1000, 1)
+    return {}
+
+
+def measure_startup(workdir):
+    """Cold start of a fresh interpreter: time to import app, answer /api/health and report ready"""
+    scenes_dir = os.path.join(workdir, 'scenes')
+    os.makedirs(scenes_dir, exist_ok=True)
+    env = dict(
+        os.environ,
+        ANALYSIS_BACKEND='local',
+        LOCAL_SCENES_DIR=scenes_dir,
+        CACHE_DIR=os.path.join(workdir, 'cache'),
+        # Background preloading would race the measured imports
+        PRELOAD_IMPORTS='0'
+    )
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT],
+        cwd=workdir, env=env, capture_output=True, text=True, check=True
+    )
+    startup = json.loads(process.stdout.strip().splitlines()[-1])
+    startup['importMsByModule'] = parse_import_times(process.stderr)
+    return startup
+
+
+def run_isolated(num_points, raster_size, baseline_max_points):
+    """Run a scenario in a fresh interpreter inside its own scratch directory"""
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory(prefix='uhi-bench-') as workdir:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            return pool.submit(run_scenario, num_points, raster_size, workdir, baseline_max_points).result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the urban heat analysis pipeline offline")
+    parser.add_argument('--points', type=int, nargs='+', default=[2000, 20000, 200000],
+                        help="Synthetic hotspot table sizes to run")
+    parser.add_argument('--raster-size', type=int, default=700,
+                        help="Width/height in pixels of the synthetic scene")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per table size")
+    parser.add_argument('--baseline-max-points', type=int, default=20000,
+                        help="Largest table for which the per-marker map baseline is also timed")
+    parser.add_argument('--startup-only', action='store_true', help="Only measure the cold start of the app")
+    parser.add_argument('--max-import-seconds', type=float,
+                        help="Exit with an error when importing app takes longer than this")
+    parser.add_argument('--output', help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    # Scenarios run in spawned workers that import app from this directory
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.environ['PYTHONPATH'] = os.pathsep.join(
+        filter(None, [os.path.dirname(os.path.abspath(__file__)), os.environ.get('PYTHONPATH')])
+    )
+
+    print("Measuring cold start...", file=sys.stderr)
+    with tempfile.TemporaryDirectory(prefix='uhi-bench-') as workdir:
+        startup = measure_startup(workdir)
+    slowest = ', '.join(f"{name} {ms}ms" for name, ms in list(startup['importMsByModule'].items())[:3])
+    print(f"  import {startup['importSeconds']}s ({slowest}), "
+          f"health {startup['healthSeconds']}s, ready {startup['readySeconds']}s", file=sys.stderr)
+
+    runs = []
+    for num_points in ([] if args.startup_only else args.points):
+        for attempt in range(args.repeat):
+            print(f"Running {num_points} points (run {attempt + 1}/{args.repeat})...", file=sys.stderr)
+            run = run_isolated(num_points, args.raster_size, args.baseline_max_points)
+            run['run'] = attempt + 1
+            runs.append(run)
+            print(f"  {run['pipeline']['totalSeconds']}s, "
+                  f"{run['payload']['resultBytes']} result bytes, "
+                  f"map {run['mapRendering']['vectorized']['seconds']}s"
+                  f"{' (%sx faster than per-marker)' % run['mapRendering']['speedup'] if 'speedup' in run['mapRendering'] else ''}, "
+                  f"{run['peakRssMb']} MB peak RSS", file=sys.stderr)
+
+    report = {
+        'generatedAt': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'startup': startup,
+        'runs': runs
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        print(f"Benchmark report written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+    if args.max_import_seconds is not None and startup['importSeconds'] > args.max_import_seconds:
+        print(f"Importing app took {startup['importSeconds']}s, over the {args.max_import_seconds}s budget",
+              file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+
+def make_cache_key(namespace, params):
+    """Hash normalized parameters into a stable cache key"""
+    payload = json.dumps(params, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(f"{namespace}:{payload}".encode('utf-8')).hexdigest()
+
+
+class DiskCache:
+    """SQLite-backed key/value cache with TTL and LRU size eviction.
+
+    Every operation opens its own connection, so one cache file can be
+    shared between threads and between gunicorn worker processes. Entry
+    counts and byte totals are kept per namespace in a small table updated
+    with every write, so a write only evicts when a limit is crossed, and
+    expired entries are swept every sweep_every writes instead of on each.
+    """
+
+    def __init__(self, path, namespace='default', ttl=86400, max_entries=500, max_bytes=512 * 1024 * 1024,
+                 sweep_every=100):
+        self.path = path
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_every = sweep_every
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                "namespace TEXT NOT NULL, "
+                "key TEXT NOT NULL, "
+                "value BLOB NOT NULL, "
+                "size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, "
+                "accessed_at REAL NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_cache_accessed "
+                "ON cache_entries (namespace, accessed_at)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_cache_created "
+                "ON cache_entries (namespace, created_at)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_totals ("
+                "namespace TEXT PRIMARY KEY, "
+                "entries INTEGER NOT NULL, "
+                "bytes INTEGER NOT NULL)"
+            )
+            # Caches written before totals were kept are counted once
+            conn.execute(
+                "INSERT OR IGNORE INTO cache_totals (namespace, entries, bytes) "
+                "SELECT ?, COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?",
+                (self.namespace, self.namespace)
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _adjust(self, conn, entries, size):
+        """Apply a change in entries and bytes to the namespace totals"""
+        if entries or size:
+            conn.execute(
+                "UPDATE cache_totals SET entries = entries + ?, bytes = bytes + ? WHERE namespace = ?",
+                (entries, size, self.namespace)
+            )
+
+    def _totals(self, conn):
+        return conn.execute(
+            "SELECT entries, bytes FROM cache_totals WHERE namespace = ?", (self.namespace,)
+        ).fetchone()
+
+    def _delete(self, conn, keys):
+        """Delete entries by key, keeping the totals in step; returns the number deleted"""
+        deleted, freed = 0, 0
+        for key in keys:
+            row = conn.execute(
+                "SELECT size FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, key)
+            ).fetchone()
+            if row is not None:
+                conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+                deleted += 1
+                freed += row[0]
+        self._adjust(conn, -deleted, -freed)
+        return deleted
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default on a miss"""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, created_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            ).fetchone()
+
+            if row is None:
+                self._count(False)
+                return default
+
+            value, created_at = row
+            if self.ttl and now - created_at > self.ttl:
+                self._delete(conn, [key])
+                self._count(False)
+                return default
+
+            conn.execute(
+                "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, key)
+            )
+
+        try:
+            result = pickle.loads(value)
+        except Exception as e:
+            print(f"Discarding unreadable cache entry {key}: {e}")
+            self.delete(key)
+            self._count(False)
+            return default
+
+        self._count(True)
+        return result
+
+    def set(self, key, value):
+        """Store value under key and evict old entries if over capacity"""
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if self.max_bytes and len(blob) > self.max_bytes:
+            print(f"Not caching {key}: entry of {len(blob)} bytes exceeds cache capacity")
+            return False
+
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            previous = conn.execute(
+                "SELECT size FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            ).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries "
+                "(namespace, key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (self.namespace, key, sqlite3.Binary(blob), len(blob), now, now)
+            )
+            self._adjust(conn, 0 if previous else 1, len(blob) - (previous[0] if previous else 0))
+            self._evict(conn, now)
+        return True
+
+    def delete(self, key):
+        with self._connect() as conn:
+            self._delete(conn, [key])
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+            conn.execute("UPDATE cache_totals SET entries = 0, bytes = 0 WHERE namespace = ?", (self.namespace,))
+
+    def _over_capacity(self, count, total):
+        return (self.max_entries and count > self.max_entries) or (self.max_bytes and total > self.max_bytes)
+
+    def _evict(self, conn, now):
+        """Sweep expired entries every sweep_every writes, and drop least recently used ones when over capacity"""
+        evicted = 0
+        with self._lock:
+            self._writes += 1
+            sweep = bool(self.ttl) and self._writes % self.sweep_every == 0
+        if sweep:
+            expired = [row[0] for row in conn.execute(
+                "SELECT key FROM cache_entries WHERE namespace = ? AND created_at < ?",
+                (self.namespace, now - self.ttl)
+            )]
+            evicted += self._delete(conn, expired)
+
+        count, total = self._totals(conn)
+        if self._over_capacity(count, total):
+            # Walks the accessed_at index from the oldest entry and stops once under capacity
+            stale = []
+            for key, size in conn.execute(
+                "SELECT key, size FROM cache_entries WHERE namespace = ? ORDER BY accessed_at ASC",
+                (self.namespace,)
+            ):
+                if not self._over_capacity(count, total):
+                    break
+                stale.append(key)
+                count -= 1
+                total -= size
+            evicted += self._delete(conn, stale)
+
+        if evicted:
+            with self._lock:
+                self.evictions += evicted
+
+    def stats(self):
+        with self._connect() as conn:
+            count, total = self._totals(conn)
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'namespace': self.namespace,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hitRate': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions,
+                'entries': count,
+                'bytes': total,
+                'maxEntries': self.max_entries,
+                'maxBytes': self.max_bytes,
+                'ttlSeconds': self.ttl
+            }
@@ -0,0 +1,111 @@
+import numpy as np
+
+from lazy_imports import lazy_import
+
+sklearn_cluster = lazy_import('sklearn.cluster')
+sklearn_metrics = lazy_import('sklearn.metrics')
+
+
+EARTH_RADIUS_M = 6371008.8
+DEFAULT_CLUSTERS = 5
+# Above this many points MiniBatchKMeans replaces full-batch KMeans
+MINIBATCH_THRESHOLD = 50000
+# Points used to score candidate k values when choosing k automatically
+AUTO_K_SAMPLE_SIZE = 5000
+SILHOUETTE_SAMPLE_SIZE = 2000
+
+
+def project_local(lats, lons, origin=None):
+    """Project coordinates to metres on a plane tangent at origin (lat, lon).
+
+    An equirectangular projection around the centre of the ROI is accurate to
+    well under a percent over the few kilometres an analysis covers, and
+    unlike raw degrees it keeps east-west and north-south distances equal at
+    any latitude.
+    """
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    if origin is None:
+        origin = (float(lats.mean()), float(lons.mean()))
+
+    lat0, lon0 = np.radians(origin[0]), np.radians(origin[1])
+    x = (np.radians(lons) - lon0) * np.cos(lat0) * EARTH_RADIUS_M
+    y = (np.radians(lats) - lat0) * EARTH_RADIUS_M
+    return np.column_stack([x, y]), origin
+
+
+def unproject_local(points, origin):
+    """Inverse of project_local, returning an (n, 2) array of lat, lon"""
+    points = np.asarray(points, dtype=float)
+    lat0, lon0 = np.radians(origin[0]), np.radians(origin[1])
+    lats = np.degrees(points[:, 1] / EARTH_RADIUS_M + lat0)
+    lons = np.degrees(points[:, 0] / (EARTH_RADIUS_M * np.cos(lat0)) + lon0)
+    return np.column_stack([lats, lons])
+
+
+def temperature_weights(lst):
+    """Sample weights that pull cluster centres towards the hottest pixels"""
+    lst = np.asarray(lst, dtype=float)
+    return lst - np.nanmin(lst) + 1.0
+
+
+def make_estimator(n_clusters, num_points, random_state=42):
+    if num_points > MINIBATCH_THRESHOLD:
+        return sklearn_cluster.MiniBatchKMeans(n_clusters=n_clusters, batch_size=4096, n_init=3, random_state=random_state)
+    return sklearn_cluster.KMeans(n_clusters=n_clusters, random_state=random_state)
+
+
+def choose_k(X, weights=None, max_k=10, random_state=42):
+    """Pick k by the best silhouette score on a random subsample of X"""
+    rng = np.random.default_rng(random_state)
+    if len(X) > AUTO_K_SAMPLE_SIZE:
+        index = rng.choice(len(X), AUTO_K_SAMPLE_SIZE, replace=False)
+        X = X[index]
+        weights = weights[index] if weights is not None else None
+
+    scores = {}
+    for k in range(2, min(max_k, len(X) - 1) + 1):
+        labels = make_estimator(k, len(X), random_state).fit_predict(X, sample_weight=weights)
+        if len(np.unique(labels)) < 2:
+            continue
+        scores[k] = float(sklearn_metrics.silhouette_score(
+            X, labels,
+            sample_size=min(SILHOUETTE_SAMPLE_SIZE, len(X)),
+            random_state=random_state
+        ))
+
+    if not scores:
+        return 1, scores
+    return max(scores, key=scores.get), scores
+
+
+def cluster_hotspots(df, n_clusters=DEFAULT_CLUSTERS, weight_by_temperature=False,
+                     max_k=10, random_state=42, weight_column=None):
+    """Cluster hotspots in a local metric projection.
+
+    n_clusters may be an int or 'auto' to choose it by silhouette score, up
+    to max_k. weight_column names a per-row weight such as the hotspot pixel
+    count of a grid cell. Returns (labels, centers, info) where centers is
+    an (k, 2) array of lat, lon and info describes how the clustering was run.
+    """
+    X, origin = project_local(df['lat'].to_numpy(), df['lon'].to_numpy())
+
+    weights = None
+    if weight_column is not None:
+        weights = df[weight_column].to_numpy(dtype=float)
+    if weight_by_temperature and 'LST_Celsius' in df.columns:
+        lst_weights = temperature_weights(df['LST_Celsius'].to_numpy())
+        weights = lst_weights if weights is None else weights * lst_weights
+
+    info = {'points': len(df), 'weighted': weights is not None}
+    if n_clusters == 'auto':
+        n_clusters, scores = choose_k(X, weights, max_k, random_state)
+        info['silhouette'] = {str(k): round(score, 4) for k, score in scores.items()}
+    n_clusters = max(1, min(int(n_clusters), max_k, len(df)))
+
+    estimator = make_estimator(n_clusters, len(df), random_state)
+    labels = estimator.fit_predict(X, sample_weight=weights)
+    info['method'] = type(estimator).__name__
+    info['k'] = n_clusters
+
+    return labels, unproject_local(estimator.cluster_centers_, origin), info
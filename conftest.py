@@ -0,0 +1,72 @@
+import os
+import tempfile
+import time
+
+import pytest
+
+LATITUDE, LONGITUDE = 29.518321, 74.993558
+DATASET = 'LANDSAT/LC09/C02/T1_L2'
+SCENE_DATES = ['2025-06-11', '2025-06-13', '2025-07-10']
+
+# The app reads its configuration when imported, so endpoint tests point it
+# at the local backend and a throwaway cache before anything imports it
+_workdir = tempfile.mkdtemp(prefix='uhi-tests-')
+os.environ.update(
+    ANALYSIS_BACKEND='local',
+    LOCAL_SCENES_DIR=os.path.join(_workdir, 'scenes'),
+    CACHE_DIR=os.path.join(_workdir, 'cache'),
+    PRELOAD_IMPORTS='0'
+)
+
+
+def write_scenes(directory):
+    from backends import make_synthetic_scene, save_local_scene
+
+    os.makedirs(directory, exist_ok=True)
+    bands, bounds = make_synthetic_scene(LATITUDE, LONGITUDE, size_px=300)
+    for date in SCENE_DATES:
+        scene_id = f"LOCAL/{DATASET}/{date}"
+        save_local_scene(
+            os.path.join(directory, scene_id.replace('/', '_') + '.npz'), bands, bounds,
+            scene_id, DATASET, date, 5
+        )
+
+
+@pytest.fixture(scope='session')
+def app_module():
+    write_scenes(os.environ['LOCAL_SCENES_DIR'])
+    import app
+    app.limiter.enabled = False
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def analysis_payload():
+    return {
+        'latitude': LATITUDE,
+        'longitude': LONGITUDE,
+        'startDate': '2025-06-01',
+        'endDate': '2025-06-30',
+        'radius': 2000,
+        'outputMode': 'geojson'
+    }
+
+
+@pytest.fixture
+def wait_for_result(client):
+    """Poll /api/analysis-result until the session has finished"""
+    def wait(session_id, timeout=60):
+        deadline = time.monotonic() + timeout
+        while True:
+            response = client.get(f'/api/analysis-result/{session_id}')
+            if response.status_code != 202:
+                return response
+            assert time.monotonic() < deadline, f'session {session_id} did not finish'
+            time.sleep(0.05)
+
+    return wait
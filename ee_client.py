@@ -0,0 +1,170 @@
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+# Fragments of Earth Engine error messages that mean "slow down and try again"
+QUOTA_ERROR_MARKERS = (
+    'too many concurrent',
+    'quota exceeded',
+    'rate limit',
+    'too many requests',
+    '429',
+    'resource exhausted',
+    'service unavailable',
+    '503'
+)
+
+
+def is_quota_error(error):
+    """Whether an Earth Engine error is a transient quota or rate limit rejection"""
+    message = str(error).lower()
+    return any(marker in message for marker in QUOTA_ERROR_MARKERS)
+
+
+def call_with_retry(fn, *args, attempts=5, base_delay=1.0, max_delay=30.0, retryable=is_quota_error,
+                    on_retry=None, **kwargs):
+    """Call fn, retrying retryable errors with exponential backoff and full jitter"""
+    for attempt in range(attempts):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if attempt == attempts - 1 or not retryable(e):
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            if on_retry is not None:
+                on_retry(attempt + 1, delay, e)
+            time.sleep(delay)
+
+
+class RequestCoalescer:
+    """Runs keyed computations so that identical in-flight requests share one call.
+
+    The first caller of a key runs the computation; callers arriving while
+    it is in flight wait for the same result or exception instead of
+    issuing their own. run() computes in the calling thread, submit() on a
+    bounded pool so that independent requests proceed concurrently.
+    """
+
+    def __init__(self, max_workers=8):
+        self.requests = 0
+        self.coalesced = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ee-request')
+
+    def _claim(self, key):
+        """The future for key and whether this caller has to compute it"""
+        with self._lock:
+            self.requests += 1
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = Future()
+            future.set_running_or_notify_cancel()
+            self._inflight[key] = future
+            return future, True
+
+    def _execute(self, key, future, fn):
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def run(self, key, fn):
+        """Result of fn, shared with any identical request already in flight"""
+        future, owner = self._claim(key)
+        if owner:
+            self._execute(key, future, fn)
+        return future.result()
+
+    def submit(self, key, fn):
+        """Future for the result of fn, started on the pool unless already in flight"""
+        future, owner = self._claim(key)
+        if owner:
+            self._pool.submit(self._execute, key, future, fn)
+        return future
+
+    def stats(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'coalesced': self.coalesced,
+                'inflight': len(self._inflight)
+            }
+
+
+class BackgroundInitializer:
+    """Runs a startup step such as Earth Engine authentication off the request path.
+
+    initialize() is called on a daemon thread until it succeeds, waiting
+    with exponential backoff between failed attempts, so a worker answers
+    requests immediately and recovers from a credentials or network hiccup
+    at boot without a restart. on_ready is called once after success.
+    """
+
+    def __init__(self, initialize, on_ready=None, base_delay=2.0, max_delay=300.0, name='initializer'):
+        self.initialize = initialize
+        self.on_ready = on_ready
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.name = name
+        self.attempts = 0
+        self.last_error = None
+        self.ready_seconds = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+        return self
+
+    def _run(self):
+        started = time.perf_counter()
+        while True:
+            with self._lock:
+                self.attempts += 1
+                attempt = self.attempts
+            try:
+                self.initialize()
+            except Exception as e:
+                delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+                with self._lock:
+                    self.last_error = str(e)
+                print(f"{self.name} attempt {attempt} failed, retrying in {delay:.1f}s: {e}")
+                time.sleep(delay)
+                continue
+
+            with self._lock:
+                self.last_error = None
+                self.ready_seconds = time.perf_counter() - started
+            if self.on_ready is not None:
+                self.on_ready()
+            self._ready.set()
+            return
+
+    def ready(self):
+        return self._ready.is_set()
+
+    def wait(self, timeout=None):
+        return self._ready.wait(timeout)
+
+    def status(self):
+        with self._lock:
+            return {
+                'ready': self._ready.is_set(),
+                'attempts': self.attempts,
+                'lastError': self.last_error,
+                'readySeconds': round(self.ready_seconds, 3) if self.ready_seconds is not None else None
+            }
@@ -0,0 +1,187 @@
+import io
+import json
+import os
+import threading
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+
+# Columns of an exported hotspot table; grid extractions add their cell columns
+EXPORT_COLUMNS = ['lat', 'lon', 'LST_Celsius', 'NDVI', 'cluster']
+GRID_EXPORT_COLUMNS = ['hotspotPixels', 'pixels', 'density']
+EXPORT_FORMATS = {
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+    'geojson': ('application/geo+json', 'geojson')
+}
+DEFAULT_BATCH_ROWS = 65536
+
+
+def hotspot_table(df):
+    """Arrow table of the exported hotspot columns; clusters are numbered like the priority zones"""
+    columns = {}
+    for name in EXPORT_COLUMNS + GRID_EXPORT_COLUMNS:
+        if name == 'cluster':
+            columns[name] = pa.array(df['cluster'].to_numpy().astype(np.int32) + 1)
+        elif name in df.columns:
+            columns[name] = pa.array(df[name].to_numpy())
+    return pa.table(columns)
+
+
+def columns_table(columns):
+    """Arrow table from the column-oriented hotspot payload stored on a session"""
+    renamed = {'lst': 'LST_Celsius', 'ndvi': 'NDVI', 'count': 'hotspotPixels'}
+    table = {}
+    for name, values in columns.items():
+        if name == 'cluster':
+            table[name] = pa.array(np.asarray(values, dtype=np.int32) + 1)
+        else:
+            table[renamed.get(name, name)] = pa.array(values)
+    ordered = [name for name in EXPORT_COLUMNS + GRID_EXPORT_COLUMNS if name in table]
+    return pa.table({name: table[name] for name in ordered})
+
+
+def _drain(buffer):
+    """Bytes written to buffer since the last drain"""
+    data = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return data
+
+
+class ExportStore:
+    """Hotspot tables of finished analyses as Arrow IPC files on disk.
+
+    Files are memory-mapped and re-encoded batch by batch on export, so a
+    response never holds more than one batch of the table in memory. The
+    oldest files are removed once there are more than max_files of them or
+    they take more than max_bytes.
+    """
+
+    def __init__(self, directory, max_files=500, max_bytes=1024 * 1024 * 1024, batch_rows=DEFAULT_BATCH_ROWS):
+        self.directory = directory
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.batch_rows = batch_rows
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, session_id):
+        return os.path.join(self.directory, f"{session_id}.arrow")
+
+    def exists(self, session_id):
+        return os.path.exists(self.path(session_id))
+
+    def write(self, session_id, table):
+        """Store a hotspot table for session_id, replacing any previous one"""
+        path = self.path(session_id)
+        partial = f"{path}.{threading.get_ident()}.tmp"
+        with pa.OSFile(partial, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                for batch in table.to_batches(max_chunksize=self.batch_rows):
+                    writer.write_batch(batch)
+        os.replace(partial, path)
+        self._prune()
+        return path
+
+    def delete(self, session_id):
+        try:
+            os.remove(self.path(session_id))
+        except FileNotFoundError:
+            pass
+
+    def _prune(self):
+        with self._lock:
+            entries = []
+            for filename in os.listdir(self.directory):
+                if not filename.endswith('.arrow'):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.directory, filename))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, filename))
+
+            entries.sort()
+            count = len(entries)
+            total = sum(size for _, size, _ in entries)
+            for _, size, filename in entries:
+                if count <= self.max_files and total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.directory, filename))
+                except FileNotFoundError:
+                    pass
+                count -= 1
+                total -= size
+
+    def schema(self, session_id):
+        with pa.memory_map(self.path(session_id)) as source:
+            return pa.ipc.open_file(source).schema
+
+    def batches(self, session_id, columns=None, bbox=None):
+        """Record batches of a stored table, filtered to bbox and narrowed to columns"""
+        with pa.memory_map(self.path(session_id)) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                if bbox is not None:
+                    west, south, east, north = bbox
+                    lat, lon = batch.column('lat'), batch.column('lon')
+                    inside = pc.and_(
+                        pc.and_(pc.greater_equal(lon, west), pc.less_equal(lon, east)),
+                        pc.and_(pc.greater_equal(lat, south), pc.less_equal(lat, north))
+                    )
+                    batch = batch.filter(inside)
+                if columns is not None:
+                    batch = batch.select(columns)
+                if batch.num_rows:
+                    yield batch
+
+    def stream(self, session_id, fmt, columns=None, bbox=None):
+        """Encoded chunks of an export in fmt, one per record batch"""
+        schema = self.schema(session_id)
+        if columns is not None:
+            schema = pa.schema([schema.field(name) for name in columns])
+
+        if fmt == 'geojson':
+            yield from self._stream_geojson(session_id, columns, bbox)
+            return
+
+        buffer = io.BytesIO()
+        if fmt == 'parquet':
+            writer = pq.ParquetWriter(buffer, schema, compression='zstd')
+        else:
+            writer = pa.ipc.new_stream(buffer, schema, options=pa.ipc.IpcWriteOptions(compression='zstd'))
+        for batch in self.batches(session_id, columns, bbox):
+            if fmt == 'parquet':
+                # Each batch becomes its own row group
+                writer.write_table(pa.Table.from_batches([batch], schema))
+            else:
+                writer.write_batch(batch)
+            yield _drain(buffer)
+        writer.close()
+        yield _drain(buffer)
+
+    def _stream_geojson(self, session_id, columns, bbox):
+        properties = [name for name in (columns or self.schema(session_id).names) if name not in ('lat', 'lon')]
+        # Coordinates are always needed for the geometry
+        read_columns = ['lat', 'lon'] + properties
+        yield b'{"type":"FeatureCollection","features":['
+        first = True
+        for batch in self.batches(session_id, read_columns, bbox):
+            data = batch.to_pydict()
+            features = []
+            for i in range(batch.num_rows):
+                features.append(json.dumps({
+                    'type': 'Feature',
+                    'geometry': {'type': 'Point', 'coordinates': [data['lon'][i], data['lat'][i]]},
+                    'properties': {name: data[name][i] for name in properties}
+                }, separators=(',', ':')))
+            chunk = ','.join(features)
+            yield (chunk if first else ',' + chunk).encode('utf-8')
+            first = False
+        yield b']}'
@@ -0,0 +1,245 @@
+import threading
+from collections import OrderedDict, deque
+
+
+class QueueFullError(Exception):
+    """Raised when a job cannot be admitted to the queue"""
+
+    def __init__(self, message, status_code, queued):
+        super().__init__(message)
+        self.status_code = status_code
+        self.queued = queued
+
+
+class AnalysisExecutor:
+    """Fixed pool of worker threads fed from a bounded, per-client fair queue.
+
+    Each client has its own FIFO and workers take jobs from the clients in
+    round-robin order, so one client submitting a burst cannot starve the
+    others. Admission fails with 503 when the whole queue is full and 429
+    when a single client already has too many jobs waiting.
+
+    Jobs of a running job (the locations of a batch) go through run_all,
+    which queues them for the same client so that they share the workers
+    and the round-robin with everyone else's analyses.
+
+    on_change is called without the queue lock held whenever queue
+    positions may have moved (a job was added, started or cancelled).
+    """
+
+    def __init__(self, max_workers=2, max_queue=20, max_per_client=3, on_change=None):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.max_per_client = max_per_client
+        self.on_change = on_change
+        self._clients = OrderedDict()  # client_id -> deque of (job_id, fn, args)
+        self._owners = {}  # job_id -> client_id for queued jobs
+        self._running = set()
+        self._subjobs = set()  # queued jobs of running jobs, not counted for admission
+        self._condition = threading.Condition()
+        self._threads = []
+        self._shutdown = False
+
+    def _start_workers(self):
+        # Workers start on first use so that importing the app spawns no threads
+        if self._threads:
+            return
+        for i in range(self.max_workers):
+            thread = threading.Thread(target=self._worker, name=f"analysis-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, job_id, client_id, fn, *args):
+        """Queue fn(*args) and return the job's 1-based queue position"""
+        with self._condition:
+            queued = len(self._owners) - len(self._subjobs)
+            if queued >= self.max_queue:
+                raise QueueFullError(
+                    f"Analysis queue is full ({queued} jobs waiting). Please try again later.",
+                    503, queued
+                )
+
+            client_jobs = self._clients.get(client_id)
+            client_queued = sum(1 for entry in client_jobs or () if entry[0] not in self._subjobs)
+            if client_queued >= self.max_per_client:
+                raise QueueFullError(
+                    f"Too many queued analyses for this client ({client_queued} waiting).",
+                    429, queued
+                )
+
+            if client_jobs is None:
+                client_jobs = self._clients[client_id] = deque()
+            client_jobs.append((job_id, fn, args))
+            self._owners[job_id] = client_id
+            self._start_workers()
+            self._condition.notify()
+            position = self._position(job_id)
+
+        self._notify_change()
+        return position
+
+    def run_all(self, client_id, jobs, max_parallel=None):
+        """Run (job_id, fn, args) jobs on behalf of a running job and wait until all have finished.
+
+        At most max_parallel of them are queued or running at a time. They
+        are admitted without the queue limits, as their parent already was,
+        and do not count against the client's queued jobs, but take workers
+        in turn with other clients. Instead of idling, the calling worker runs
+        whichever of them are still queued, so parents waiting on their
+        jobs can never hold every worker.
+        """
+        jobs = list(jobs)
+        max_parallel = max_parallel or len(jobs)
+        submitted = []
+        while True:
+            with self._condition:
+                in_flight = [job_id for job_id in submitted if job_id in self._owners or job_id in self._running]
+                added = False
+                while jobs and len(in_flight) < max_parallel:
+                    job_id, fn, args = jobs.pop(0)
+                    if client_id not in self._clients:
+                        self._clients[client_id] = deque()
+                    self._clients[client_id].append((job_id, fn, args))
+                    self._owners[job_id] = client_id
+                    self._subjobs.add(job_id)
+                    submitted.append(job_id)
+                    in_flight.append(job_id)
+                    added = True
+                if added:
+                    self._start_workers()
+                    self._condition.notify_all()
+
+                own = self._take(client_id, in_flight)
+                if own is None:
+                    if not in_flight and not jobs:
+                        return
+                    if not added:
+                        self._condition.wait()
+                        continue
+                else:
+                    self._running.add(own[0])
+
+            self._notify_change()
+            if own is not None:
+                self._run(*own)
+
+    def _take(self, client_id, job_ids):
+        """Remove and return the first queued job of the client among job_ids"""
+        client_jobs = self._clients.get(client_id)
+        for entry in client_jobs or ():
+            if entry[0] in job_ids:
+                client_jobs.remove(entry)
+                self._clients.move_to_end(client_id)
+                self._forget(entry[0], client_id)
+                return entry
+        return None
+
+    def _forget(self, job_id, client_id):
+        del self._owners[job_id]
+        self._subjobs.discard(job_id)
+        if not self._clients[client_id]:
+            del self._clients[client_id]
+
+    def cancel(self, job_id):
+        """Remove a job that has not started yet; returns True if it was queued"""
+        with self._condition:
+            client_id = self._owners.get(job_id)
+            if client_id is None:
+                return False
+            client_jobs = self._clients[client_id]
+            for entry in client_jobs:
+                if entry[0] == job_id:
+                    client_jobs.remove(entry)
+                    break
+            self._forget(job_id, client_id)
+            # Wakes a parent waiting in run_all
+            self._condition.notify_all()
+
+        self._notify_change()
+        return True
+
+    def position(self, job_id):
+        """1-based position of a queued job, or None once it has started"""
+        with self._condition:
+            return self._position(job_id)
+
+    def queued_positions(self):
+        """Positions of every queued job, keyed by job ID"""
+        with self._condition:
+            return {job_id: self._position(job_id) for job_id in self._owners}
+
+    def _position(self, job_id):
+        client_id = self._owners.get(job_id)
+        if client_id is None:
+            return None
+
+        rotation = list(self._clients)
+        order = rotation.index(client_id)
+        index = next(i for i, entry in enumerate(self._clients[client_id]) if entry[0] == job_id)
+
+        # Jobs ahead: this client's earlier jobs plus, for every other client,
+        # the jobs that round-robin scheduling serves before this one
+        ahead = index
+        for other_order, other in enumerate(rotation):
+            if other == client_id:
+                continue
+            rounds = index + 1 if other_order < order else index
+            ahead += min(len(self._clients[other]), rounds)
+        return ahead + 1
+
+    def _next_job(self):
+        client_id, client_jobs = next(iter(self._clients.items()))
+        job_id, fn, args = client_jobs.popleft()
+        # Rotate the client to the back so other clients go next
+        self._clients.move_to_end(client_id)
+        self._forget(job_id, client_id)
+        return job_id, fn, args
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                while not self._clients and not self._shutdown:
+                    self._condition.wait()
+                if self._shutdown:
+                    return
+                job_id, fn, args = self._next_job()
+                self._running.add(job_id)
+
+            self._notify_change()
+            self._run(job_id, fn, args)
+
+    def _run(self, job_id, fn, args):
+        try:
+            fn(*args)
+        except Exception as e:
+            print(f"Analysis job {job_id} raised: {e}")
+        finally:
+            with self._condition:
+                self._running.discard(job_id)
+                # Wakes a parent waiting in run_all
+                self._condition.notify_all()
+
+    def _notify_change(self):
+        if self.on_change is None:
+            return
+        try:
+            self.on_change()
+        except Exception as e:
+            print(f"Queue change callback failed: {e}")
+
+    def shutdown(self):
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+
+    def stats(self):
+        with self._condition:
+            return {
+                'workers': self.max_workers,
+                'running': len(self._running),
+                'queued': len(self._owners) - len(self._subjobs),
+                'queuedSubjobs': len(self._subjobs),
+                'clients': len(self._clients),
+                'maxQueue': self.max_queue,
+                'maxPerClient': self.max_per_client
+            }
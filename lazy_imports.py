@@ -0,0 +1,61 @@
+import importlib
+import threading
+import time
+
+
+_lock = threading.Lock()
+_import_seconds = {}
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access.
+
+    Heavy dependencies (Earth Engine, geemap, scikit-learn, Folium) take
+    seconds to import, so modules bind them with lazy_import() and a worker
+    can serve requests before any analysis needs them. Python's import lock
+    makes concurrent first accesses wait for a single import.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            started = time.perf_counter()
+            module = importlib.import_module(self._name)
+            with _lock:
+                _import_seconds.setdefault(self._name, time.perf_counter() - started)
+            self._module = module
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._module or self._load(), attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name):
+    return LazyModule(name)
+
+
+def preload(modules):
+    """Import lazy modules on a background thread, so the first request does not pay for them"""
+    def load():
+        for module in modules:
+            try:
+                module._load()
+            except Exception as e:
+                print(f"Preloading {module._name} failed: {e}")
+
+    thread = threading.Thread(target=load, name='preload-imports', daemon=True)
+    thread.start()
+    return thread
+
+
+def import_times():
+    """Milliseconds each lazily imported module took to import"""
+    with _lock:
+        return {name: round(seconds * 1000, 1) for name, seconds in _import_seconds.items()}
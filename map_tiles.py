@@ -0,0 +1,94 @@
+import math
+import struct
+import zlib
+
+import numpy as np
+
+
+TILE_SIZE = 256
+# Raster overlays: band, value range and colour palette from low to high
+TILE_LAYERS = {
+    'lst': {'band': 'LST_Celsius', 'palette': ['313695', '74add1', 'ffffbf', 'f46d43', 'a50026']},
+    'ndvi': {'band': 'NDVI', 'min': -0.2, 'max': 0.8, 'palette': ['a50026', 'fdae61', 'ffffbf', 'a6d96a', '006837']},
+    'hotspots': {'band': None, 'palette': ['e31a1c']}
+}
+OVERLAY_OPACITY = 0.7
+
+
+def tile_bounds(z, x, y):
+    """(west, south, east, north) in degrees of a Web Mercator XYZ tile"""
+    n = 2 ** z
+
+    def lat(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return x / n * 360 - 180, lat(y + 1), (x + 1) / n * 360 - 180, lat(y)
+
+
+def tile_pixel_centers(z, x, y, size=TILE_SIZE):
+    """Latitudes of the pixel rows and longitudes of the pixel columns of a tile"""
+    n = 2 ** z
+    offsets = (np.arange(size) + 0.5) / size
+    lons = (x + offsets) / n * 360 - 180
+    lats = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + offsets) / n))))
+    return lats, lons
+
+
+def valid_tile(z, x, y, max_zoom):
+    return 0 <= z <= max_zoom and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def layer_visualization(layer, lst_range):
+    """Band, value range and palette of a layer; the LST range is configurable"""
+    spec = dict(TILE_LAYERS[layer])
+    if layer == 'lst':
+        spec['min'], spec['max'] = lst_range
+    return spec
+
+
+def palette_lut(palette, size=256):
+    """(size, 3) uint8 colour ramp interpolated through the palette's hex colours"""
+    colors = np.array([[int(color[i:i + 2], 16) for i in (0, 2, 4)] for color in palette], dtype=float)
+    if len(colors) == 1:
+        return np.repeat(colors.astype(np.uint8), size, axis=0)
+    stops = np.linspace(0, 1, len(colors))
+    positions = np.linspace(0, 1, size)
+    return np.column_stack([np.interp(positions, stops, colors[:, i]) for i in range(3)]).astype(np.uint8)
+
+
+def colorize(values, spec, opacity=OVERLAY_OPACITY):
+    """RGBA tile of values on the layer's palette; NaN pixels are transparent"""
+    lut = palette_lut(spec['palette'])
+    valid = np.isfinite(values)
+    if spec.get('min') is None:
+        # Masks: every valid pixel takes the single palette colour
+        index = np.zeros(values.shape, dtype=np.int64)
+    else:
+        scaled = (np.where(valid, values, spec['min']) - spec['min']) / (spec['max'] - spec['min'])
+        index = np.clip((scaled * (len(lut) - 1)).round(), 0, len(lut) - 1).astype(np.int64)
+
+    rgba = np.zeros(values.shape + (4,), dtype=np.uint8)
+    rgba[..., :3] = lut[index]
+    rgba[..., 3] = np.where(valid, round(255 * opacity), 0)
+    return rgba
+
+
+def encode_png(rgba):
+    """PNG bytes of an (h, w, 4) uint8 array, written with zlib alone"""
+    height, width, _ = rgba.shape
+    # Every scanline starts with filter type 0 (None)
+    scanlines = np.zeros((height, width * 4 + 1), dtype=np.uint8)
+    scanlines[:, 1:] = rgba.reshape(height, width * 4)
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+    return b''.join([
+        b'\x89PNG\r\n\x1a\n',
+        chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)),
+        chunk(b'IDAT', zlib.compress(scanlines.tobytes(), 6)),
+        chunk(b'IEND', b'')
+    ])
+
+
+EMPTY_TILE = encode_png(np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8))
@@ -0,0 +1,206 @@
+import gzip
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+MAP_PREFIX = 'urban_heat_map_'
+# Stored encodings of a map, best compression first, with their file suffix
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')] if brotli is not None else [('gzip', '.gz')]
+_NAME = re.compile(rf'^{MAP_PREFIX}([0-9a-f]{{20}})\.html$')
+
+
+def parse_accept_encoding(header):
+    """Encodings a client accepts, from an Accept-Encoding header"""
+    accepted = set()
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q=') and float(quality[2:] or 0) == 0:
+            continue
+        if name:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+class MapStore:
+    """Content-addressed store of rendered Folium maps.
+
+    A map is named after the hash of its HTML, so identical renders share
+    one file and concurrent analyses of the same point never overwrite each
+    other. Compressed variants are written next to the HTML once at save
+    time and served as is. Reading a map refreshes its modification time;
+    the least recently used maps are removed once all files take more than
+    max_bytes or there are more than max_files maps.
+
+    Sessions and cached results that point to a map hold a reference to it,
+    kept in a SQLite file next to the maps so that every gunicorn worker
+    sees them. Releasing the last reference lets a caller delete the map.
+    """
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024, max_files=1000):
+        # Absolute, as Flask's send_file resolves relative paths against the app root
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self._references_path = os.path.join(self.directory, 'references.sqlite3')
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS map_references ("
+                "filename TEXT NOT NULL, "
+                "holder TEXT NOT NULL, "
+                "PRIMARY KEY (filename, holder))"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self._references_path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def is_valid_name(filename):
+        return _NAME.match(filename) is not None
+
+    def path(self, filename, encoding=None):
+        suffix = dict(ENCODINGS).get(encoding, '')
+        return os.path.join(self.directory, filename + suffix)
+
+    def exists(self, filename):
+        return self.is_valid_name(filename) and os.path.exists(self.path(filename))
+
+    def etag(self, filename, encoding=None):
+        digest = _NAME.match(filename).group(1)
+        return f"{digest}-{encoding}" if encoding else digest
+
+    def _write(self, path, data):
+        partial = f"{path}.{threading.get_ident()}.tmp"
+        with open(partial, 'wb') as f:
+            f.write(data)
+        os.replace(partial, path)
+
+    def save(self, html):
+        """Store a rendered map and its compressed variants, returning its file name"""
+        data = html.encode('utf-8') if isinstance(html, str) else html
+        filename = f"{MAP_PREFIX}{hashlib.sha256(data).hexdigest()[:20]}.html"
+
+        if os.path.exists(self.path(filename)):
+            self.touch(filename)
+            return filename
+
+        # Variants first, so that a visible map always has them
+        for encoding, _ in ENCODINGS:
+            if encoding == 'br':
+                compressed = brotli.compress(data, mode=brotli.MODE_TEXT, quality=9)
+            else:
+                compressed = gzip.compress(data, compresslevel=9, mtime=0)
+            self._write(self.path(filename, encoding), compressed)
+        self._write(self.path(filename), data)
+
+        self._collect()
+        return filename
+
+    def select(self, filename, accept_encoding):
+        """Path and content encoding of the smallest stored variant a client accepts"""
+        accepted = parse_accept_encoding(accept_encoding)
+        for encoding, _ in ENCODINGS:
+            if encoding in accepted and os.path.exists(self.path(filename, encoding)):
+                return self.path(filename, encoding), encoding
+        return self.path(filename), None
+
+    def touch(self, filename):
+        now = time.time()
+        for encoding in [None] + [encoding for encoding, _ in ENCODINGS]:
+            try:
+                os.utime(self.path(filename, encoding), (now, now))
+            except FileNotFoundError:
+                pass
+
+    def retain(self, filename, holder):
+        """Record that holder (a session or cached result) points to a map"""
+        with self._connect() as conn:
+            conn.execute("INSERT OR IGNORE INTO map_references (filename, holder) VALUES (?, ?)", (filename, holder))
+
+    def release(self, filename, holder):
+        """Drop holder's reference to a map, returning the number of references left"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM map_references WHERE filename = ? AND holder = ?", (filename, holder))
+            return self._count_references(conn, filename)
+
+    def references(self, filename):
+        with self._connect() as conn:
+            return self._count_references(conn, filename)
+
+    @staticmethod
+    def _count_references(conn, filename):
+        return conn.execute("SELECT COUNT(*) FROM map_references WHERE filename = ?", (filename,)).fetchone()[0]
+
+    def delete(self, filename):
+        """Remove a map, its variants and its references, returning whether it existed"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM map_references WHERE filename = ?", (filename,))
+        existed = False
+        for encoding in [None] + [encoding for encoding, _ in ENCODINGS]:
+            try:
+                os.remove(self.path(filename, encoding))
+                existed = existed or encoding is None
+            except FileNotFoundError:
+                pass
+        return existed
+
+    def _maps(self):
+        """(last used, bytes, file name) of every stored map, variants included"""
+        maps = {}
+        for entry in os.scandir(self.directory):
+            filename = entry.name
+            for _, suffix in ENCODINGS:
+                if filename.endswith(suffix):
+                    filename = filename[:-len(suffix)]
+                    break
+            if not self.is_valid_name(filename):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            used, size = maps.get(filename, (0, 0))
+            maps[filename] = (max(used, stat.st_mtime), size + stat.st_size)
+        return [(used, size, filename) for filename, (used, size) in maps.items()]
+
+    def _collect(self):
+        with self._lock:
+            maps = sorted(self._maps())
+            count = len(maps)
+            total = sum(size for _, size, _ in maps)
+            for _, size, filename in maps:
+                if count <= self.max_files and total <= self.max_bytes:
+                    break
+                self.delete(filename)
+                self.evictions += 1
+                count -= 1
+                total -= size
+
+    def stats(self):
+        maps = self._maps()
+        return {
+            'maps': len(maps),
+            'bytes': sum(size for _, size, _ in maps),
+            'evictions': self.evictions,
+            'encodings': [encoding for encoding, _ in ENCODINGS]
+        }
@@ -0,0 +1,73 @@
+import heapq
+
+import numpy as np
+
+from clustering import project_local
+from lazy_imports import lazy_import
+
+sparse = lazy_import('scipy.sparse')
+spatial = lazy_import('scipy.spatial')
+
+
+DEFAULT_PLANTING_SITES = 10
+# Distance in metres over which a planted site is assumed to cool its surroundings
+DEFAULT_COOLING_RADIUS = 100
+
+
+def neighbourhoods(points, radius):
+    """CSR (offsets, indices) of every point's neighbours within radius, itself included, from a KD-tree"""
+    pairs = spatial.cKDTree(points).query_pairs(radius, output_type='ndarray')
+    self_index = np.arange(len(points))
+    rows = np.concatenate([pairs[:, 0], pairs[:, 1], self_index])
+    cols = np.concatenate([pairs[:, 1], pairs[:, 0], self_index])
+
+    # Building the CSR matrix groups the pairs by row with a linear counting sort
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(len(points), len(points))
+    )
+    return matrix.indptr.astype(np.int64), matrix.indices.astype(np.int64)
+
+
+def select_planting_sites(lats, lons, lst, hot_threshold, n_sites=DEFAULT_PLANTING_SITES,
+                          radius=DEFAULT_COOLING_RADIUS, weights=None):
+    """Greedily pick up to n_sites hotspot pixels that cover the most heat within radius metres.
+
+    A hotspot's heat is its LST excess over hot_threshold, times its weight
+    (hotspot pixels for grid cells). Each pick covers the uncovered heat of
+    its neighbourhood, so later picks spread out instead of piling onto the
+    hottest cluster. Coverage is submodular, so lazy greedy re-evaluates
+    only the top of a max-heap of stale gains: a candidate whose fresh gain
+    still beats the next stale gain is the true best pick. Returns the
+    indices of the picked rows and the heat each newly covered, best first.
+    """
+    lst = np.asarray(lst, dtype=float)
+    heat = np.nan_to_num(np.clip(lst - hot_threshold, 0, None))
+    if weights is not None:
+        heat = heat * np.asarray(weights, dtype=float)
+    if not len(heat) or n_sites < 1:
+        return np.array([], dtype=np.int64), np.array([])
+
+    points, _ = project_local(lats, lons)
+    offsets, neighbours = neighbourhoods(points, radius)
+
+    # Initial gains for every candidate in one pass over the neighbour lists
+    gains = np.add.reduceat(heat[neighbours], offsets[:-1]) if len(neighbours) else np.zeros(len(heat))
+    heap = [(-gain, i) for i, gain in enumerate(gains) if gain > 0]
+    heapq.heapify(heap)
+
+    covered = np.zeros(len(heat), dtype=bool)
+    sites, site_gains = [], []
+    while heap and len(sites) < n_sites:
+        _, i = heapq.heappop(heap)
+        nearby = neighbours[offsets[i]:offsets[i + 1]]
+        gain = float(heat[nearby][~covered[nearby]].sum())
+        if gain <= 0:
+            continue
+        if heap and gain < -heap[0][0]:
+            heapq.heappush(heap, (-gain, i))
+            continue
+        sites.append(i)
+        site_gains.append(gain)
+        covered[nearby] = True
+
+    return np.array(sites, dtype=np.int64), np.array(site_gains)
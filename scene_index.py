@@ -0,0 +1,279 @@
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from tiling import points_in_polygon
+
+
+# Scenes are indexed per dataset, grid cell of this many degrees and calendar year
+DEFAULT_CELL_DEGREES = 1.0
+# Scenes are still being ingested this long after a year ends
+DEFAULT_SETTLE_DAYS = 60
+
+
+def utc_millis(date):
+    """Milliseconds since the epoch of a YYYY-MM-DD date at UTC midnight, as Earth Engine reads it"""
+    parsed = datetime.strptime(date, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1000)
+
+
+def footprint_rings(footprint):
+    """Rings of a stored footprint; rows indexed before MultiPolygon support hold a single ring"""
+    if footprint and isinstance(footprint[0][0], (int, float)):
+        return [footprint]
+    return footprint
+
+
+class SceneIndex:
+    """Persistent scene metadata index answering scene selection locally.
+
+    Holds scene ID, footprint rings, acquisition time, cloud cover and WRS/MGRS
+    tile per dataset in SQLite. A (dataset, grid cell, year) block is
+    fetched with one call to fetch(dataset, bounds, start, end) the first
+    time a query needs it; blocks of years that may still gain scenes are
+    refreshed in the background once older than refresh_interval, while
+    queries keep answering from the stored rows. The rows of recently
+    queried cells are also kept in memory, re-read every reload_interval
+    seconds to pick up blocks fetched by other worker processes.
+    """
+
+    def __init__(self, path, fetch, cell_degrees=DEFAULT_CELL_DEGREES, refresh_interval=6 * 3600,
+                 settle_days=DEFAULT_SETTLE_DAYS, refresh_workers=2, reload_interval=60, max_cells=256):
+        self.path = path
+        self.fetch = fetch
+        self.cell_degrees = cell_degrees
+        self.refresh_interval = refresh_interval
+        self.settle_days = settle_days
+        self.reload_interval = reload_interval
+        self.max_cells = max_cells
+        self.fetches = 0
+        self.refreshes = 0
+        self._lock = threading.Lock()
+        self._block_locks = {}
+        self._cells = OrderedDict()
+        self._refreshing = set()
+        self._refresher = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix='scene-index')
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS scenes ("
+                "dataset TEXT NOT NULL, "
+                "id TEXT NOT NULL, "
+                "time INTEGER NOT NULL, "
+                "cloud_cover REAL, "
+                "tile TEXT, "
+                "west REAL NOT NULL, south REAL NOT NULL, east REAL NOT NULL, north REAL NOT NULL, "
+                "footprint TEXT NOT NULL, "
+                "PRIMARY KEY (dataset, id))"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_scenes_lookup "
+                "ON scenes (dataset, time, west, east, south, north)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_scenes_tile ON scenes (dataset, tile)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS blocks ("
+                "dataset TEXT NOT NULL, "
+                "cell_x INTEGER NOT NULL, "
+                "cell_y INTEGER NOT NULL, "
+                "year INTEGER NOT NULL, "
+                "fetched_at REAL NOT NULL, "
+                "PRIMARY KEY (dataset, cell_x, cell_y, year))"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _cell(self, lat, lon):
+        return math.floor(lon / self.cell_degrees), math.floor(lat / self.cell_degrees)
+
+    def _cell_bounds(self, cell_x, cell_y):
+        return (
+            cell_x * self.cell_degrees, cell_y * self.cell_degrees,
+            (cell_x + 1) * self.cell_degrees, (cell_y + 1) * self.cell_degrees
+        )
+
+    def _blocks(self, lat, lon, start, end):
+        """Blocks a query at (lat, lon) over [start, end) reads from"""
+        cell = self._cell(lat, lon)
+        first_year = datetime.strptime(start, "%Y-%m-%d").year
+        # end is exclusive, so a range ending on 1 January does not reach into that year
+        last_year = (datetime.strptime(end, "%Y-%m-%d") - timedelta(days=1)).year
+        return [cell + (year,) for year in range(first_year, last_year + 1)]
+
+    def _is_open(self, year, fetched_at):
+        """Whether scenes of year could still have been ingested after fetched_at"""
+        settled = datetime(year + 1, 1, 1, tzinfo=timezone.utc).timestamp() + self.settle_days * 86400
+        return fetched_at < settled
+
+    def _fetch_block(self, dataset, cell_x, cell_y, year):
+        """Replace the stored scenes of one block with a fresh listing"""
+        fetched_at = time.time()
+        scenes = self.fetch(dataset, self._cell_bounds(cell_x, cell_y), f"{year:04d}-01-01", f"{year + 1:04d}-01-01")
+
+        rows = []
+        for scene in scenes:
+            rings = footprint_rings(scene['footprint'])
+            lons = [x for ring in rings for x, _ in ring]
+            lats = [y for ring in rings for _, y in ring]
+            rows.append((
+                dataset, scene['id'], int(scene['time']), scene.get('cloudCover'), scene.get('tile'),
+                min(lons), min(lats), max(lons), max(lats), json.dumps(rings)
+            ))
+
+        with self._connect() as conn:
+            # Scenes are shared by neighbouring cells, so rows are upserted rather than replaced per block
+            conn.executemany(
+                "INSERT OR REPLACE INTO scenes "
+                "(dataset, id, time, cloud_cover, tile, west, south, east, north, footprint) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO blocks (dataset, cell_x, cell_y, year, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (dataset, cell_x, cell_y, year, fetched_at)
+            )
+        with self._lock:
+            self.fetches += 1
+        return len(rows)
+
+    def _block_lock(self, key):
+        with self._lock:
+            return self._block_locks.setdefault(key, threading.Lock())
+
+    def _cell_state(self, dataset, cell):
+        """Block fetch times and scenes of one cell, reloaded from SQLite at most every reload_interval seconds"""
+        key = (dataset,) + cell
+        now = time.time()
+        with self._lock:
+            state = self._cells.get(key)
+            if state is not None and now - state['loadedAt'] < self.reload_interval:
+                self._cells.move_to_end(key)
+                return state
+
+        west, south, east, north = self._cell_bounds(*cell)
+        with self._connect() as conn:
+            blocks = dict(conn.execute(
+                "SELECT year, fetched_at FROM blocks WHERE dataset = ? AND cell_x = ? AND cell_y = ?", key
+            ).fetchall())
+            rows = conn.execute(
+                "SELECT id, time, cloud_cover, west, south, east, north, footprint FROM scenes "
+                "WHERE dataset = ? AND west <= ? AND east >= ? AND south <= ? AND north >= ? "
+                "AND cloud_cover IS NOT NULL ORDER BY cloud_cover ASC, time ASC",
+                (dataset, east, west, north, south)
+            ).fetchall()
+
+        state = {
+            'blocks': blocks,
+            'scenes': [row[:3] + (row[3:7], footprint_rings(json.loads(row[7]))) for row in rows],
+            'loadedAt': now
+        }
+        with self._lock:
+            self._cells[key] = state
+            while len(self._cells) > self.max_cells:
+                self._cells.popitem(last=False)
+        return state
+
+    def _forget_cell(self, dataset, cell_x, cell_y):
+        with self._lock:
+            self._cells.pop((dataset, cell_x, cell_y), None)
+
+    def ensure(self, dataset, lat, lon, start, end):
+        """Fetch the blocks a query needs that were never indexed, and schedule stale ones for refresh"""
+        blocks = self._blocks(lat, lon, start, end)
+        fetched = self._cell_state(dataset, blocks[0][:2])['blocks']
+
+        now = time.time()
+        for block in blocks:
+            fetched_at = fetched.get(block[2])
+            if fetched_at is None:
+                # Concurrent queries for the same block wait for a single fetch
+                with self._block_lock((dataset,) + block):
+                    if not self._has_block(dataset, block):
+                        self._fetch_block(dataset, *block)
+                self._forget_cell(dataset, *block[:2])
+            elif self._is_open(block[2], fetched_at) and now - fetched_at > self.refresh_interval:
+                self._schedule_refresh(dataset, block)
+
+    def _has_block(self, dataset, block):
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT 1 FROM blocks WHERE dataset = ? AND cell_x = ? AND cell_y = ? AND year = ?",
+                (dataset,) + block
+            ).fetchone() is not None
+
+    def _schedule_refresh(self, dataset, block):
+        key = (dataset,) + block
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                with self._block_lock(key):
+                    self._fetch_block(dataset, *block)
+                self._forget_cell(dataset, *block[:2])
+                with self._lock:
+                    self.refreshes += 1
+            except Exception as e:
+                print(f"Scene index refresh of {key} failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._refresher.submit(refresh)
+
+    def query(self, dataset, lat, lon, start, end, cloud_cover_threshold):
+        """IDs of indexed scenes covering (lat, lon) in [start, end) below the cloud threshold, least cloudy first.
+
+        Same filters and order as the Earth Engine collection query:
+        scenes without a cloud cover value never pass the threshold.
+        """
+        self.ensure(dataset, lat, lon, start, end)
+        start_ms, end_ms = utc_millis(start), utc_millis(end)
+        scenes = self._cell_state(dataset, self._cell(lat, lon))['scenes']
+        return [
+            scene_id
+            for scene_id, acquired, cloud_cover, (west, south, east, north), footprint in scenes
+            if start_ms <= acquired < end_ms and cloud_cover < cloud_cover_threshold
+            and west <= lon <= east and south <= lat <= north
+            and any(points_in_polygon(lat, lon, ring) for ring in footprint)
+        ]
+
+    def stats(self):
+        with self._connect() as conn:
+            scenes, datasets, tiles = conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT dataset), COUNT(DISTINCT dataset || '/' || COALESCE(tile, '')) "
+                "FROM scenes"
+            ).fetchone()
+            blocks = conn.execute("SELECT COUNT(*) FROM blocks").fetchone()[0]
+
+        with self._lock:
+            return {
+                'scenes': scenes,
+                'datasets': datasets,
+                'tiles': tiles,
+                'blocks': blocks,
+                'fetches': self.fetches,
+                'refreshes': self.refreshes,
+                'refreshing': len(self._refreshing),
+                'cellDegrees': self.cell_degrees,
+                'refreshIntervalSeconds': self.refresh_interval
+            }
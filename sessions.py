@@ -0,0 +1,565 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+TERMINAL_STATUSES = ('completed', 'failed', 'cancelled')
+ORPHANED_ERROR = 'Analysis interrupted because the server running it stopped. Please run it again.'
+
+
+class SessionNotFound(KeyError):
+    pass
+
+
+def _result_size(result):
+    return len(json.dumps(result)) if result is not None else 0
+
+
+class InMemorySessionStore:
+    """Analysis sessions held in this process.
+
+    Finished sessions expire after ttl seconds and are evicted least
+    recently used first once there are more than max_sessions of them or
+    their results and payloads take more than max_bytes. Queued and running
+    sessions are only dropped after max_age, which covers jobs orphaned by
+    a crash.
+    """
+
+    def __init__(self, ttl=3600, max_sessions=1000, max_bytes=256 * 1024 * 1024, max_age=24 * 3600):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.evictions = 0
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, session_id, status='queued', parent=None, location=None):
+        now = time.time()
+        with self._lock:
+            self._sessions[session_id] = {
+                'status': status,
+                'parent': parent,
+                'location': location,
+                'result': None,
+                'error': None,
+                'timings': [],
+                'queuePosition': None,
+                'cancelRequested': False,
+                'events': [],
+                'payloads': {},
+                'condition': threading.Condition(),
+                'createdAt': now,
+                'updatedAt': now,
+                'size': 0
+            }
+            self._prune(now)
+
+    def _session(self, session_id):
+        session = self._sessions.get(session_id)
+        if session is None:
+            raise SessionNotFound(session_id)
+        return session
+
+    def get(self, session_id):
+        """Snapshot of a session's fields, or None if unknown or evicted"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            self._sessions.move_to_end(session_id)
+            snapshot = {
+                key: session[key]
+                for key in ('status', 'result', 'error', 'queuePosition', 'cancelRequested', 'createdAt', 'updatedAt')
+            }
+            snapshot['timings'] = list(session['timings'])
+            return snapshot
+
+    def parent(self, session_id):
+        """(batch session ID, location ID) of a batch location's session, or None"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or session['parent'] is None:
+                return None
+            return session['parent'], session['location']
+
+    def children(self, parent_id):
+        """Session IDs of the locations of a batch"""
+        with self._lock:
+            return [sid for sid, session in self._sessions.items() if session['parent'] == parent_id]
+
+    def fail_orphaned(self, error=ORPHANED_ERROR):
+        """Sessions in memory die with the process that runs their jobs, so none are ever orphaned"""
+        return []
+
+    def update(self, session_id, **fields):
+        now = time.time()
+        with self._lock:
+            session = self._session(session_id)
+            session.update(fields)
+            session['updatedAt'] = now
+            if 'result' in fields:
+                session['size'] = _result_size(fields['result']) + sum(
+                    _result_size(payload) for payload in session['payloads'].values()
+                )
+            if fields.get('status') in TERMINAL_STATUSES:
+                self._prune(now)
+
+    def set_payload(self, session_id, name, value):
+        """Store bulky data that is served separately from the session result"""
+        with self._lock:
+            session = self._session(session_id)
+            previous = session['payloads'].get(name)
+            session['payloads'][name] = value
+            session['size'] += _result_size(value) - _result_size(previous)
+
+    def get_payload(self, session_id, name):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            self._sessions.move_to_end(session_id)
+            return session['payloads'].get(name)
+
+    def append_timing(self, session_id, span):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session['timings'].append(span)
+
+    def append_event(self, session_id, data):
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is None:
+            return None
+
+        with session['condition']:
+            event_id = len(session['events']) + 1
+            session['events'].append({'id': event_id, 'data': data})
+            session['condition'].notify_all()
+        return event_id
+
+    def events_since(self, session_id, after_id, timeout):
+        """Events with an ID above after_id, waiting up to timeout for the first one"""
+        with self._lock:
+            session = self._session(session_id)
+
+        with session['condition']:
+            if len(session['events']) <= after_id:
+                session['condition'].wait(timeout=timeout)
+            return session['events'][after_id:]
+
+    def status_counts(self):
+        with self._lock:
+            counts = {}
+            for session in self._sessions.values():
+                counts[session['status']] = counts.get(session['status'], 0) + 1
+            return counts
+
+    def _prune(self, now):
+        """Drop expired sessions, then the least recently used finished ones until under capacity"""
+        for session_id, session in list(self._sessions.items()):
+            finished = session['status'] in TERMINAL_STATUSES
+            if (finished and now - session['updatedAt'] > self.ttl) or now - session['createdAt'] > self.max_age:
+                del self._sessions[session_id]
+                self.evictions += 1
+
+        finished = [sid for sid, session in self._sessions.items() if session['status'] in TERMINAL_STATUSES]
+        total = sum(session['size'] for session in self._sessions.values())
+        count = len(self._sessions)
+        for session_id in finished:
+            if count <= self.max_sessions and total <= self.max_bytes:
+                break
+            total -= self._sessions.pop(session_id)['size']
+            count -= 1
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': 'memory',
+                'sessions': len(self._sessions),
+                'bytes': sum(session['size'] for session in self._sessions.values()),
+                'evictions': self.evictions,
+                'maxSessions': self.max_sessions,
+                'maxBytes': self.max_bytes,
+                'ttlSeconds': self.ttl
+            }
+
+
+class SQLiteSessionStore:
+    """Analysis sessions in a SQLite file shared by all gunicorn workers.
+
+    Any worker can answer for any session. Subscribers in the process that
+    runs the analysis are woken through a local condition; subscribers in
+    other processes poll the events table every poll_interval seconds.
+    Eviction follows the same rules as InMemorySessionStore, with stored
+    payloads counting towards a session's size.
+
+    Jobs themselves only live in the memory of the process that accepted
+    them, so every session records a random token of that process. Each
+    process refreshes the last-seen time of its token every
+    heartbeat_interval seconds while it has sessions, and fail_orphaned
+    closes the unfinished sessions of owners not seen for owner_timeout
+    seconds, whichever host they ran on.
+    """
+
+    def __init__(self, path, ttl=3600, max_sessions=1000, max_bytes=256 * 1024 * 1024,
+                 max_age=24 * 3600, poll_interval=0.5, heartbeat_interval=10, owner_timeout=60):
+        self.path = path
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.owner_timeout = owner_timeout
+        self.evictions = 0
+        self._conditions = {}
+        self._lock = threading.Lock()
+        self._owner_lock = threading.Lock()
+        self._owner_pid = None
+        self._owner_token = None
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "id TEXT PRIMARY KEY, "
+                "status TEXT NOT NULL, "
+                "result TEXT, "
+                "error TEXT, "
+                "timings TEXT NOT NULL DEFAULT '[]', "
+                "queue_position INTEGER, "
+                "cancel_requested INTEGER NOT NULL DEFAULT 0, "
+                "size INTEGER NOT NULL DEFAULT 0, "
+                "created_at REAL NOT NULL, "
+                "updated_at REAL NOT NULL, "
+                "accessed_at REAL NOT NULL, "
+                "owner_token TEXT, "
+                "parent TEXT, "
+                "location TEXT)"
+            )
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(sessions)")]
+            for column, kind in (('owner_token', 'TEXT'), ('parent', 'TEXT'), ('location', 'TEXT')):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE sessions ADD COLUMN {column} {kind}")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_parent ON sessions (parent)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS session_owners ("
+                "token TEXT PRIMARY KEY, "
+                "seen_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS session_events ("
+                "session_id TEXT NOT NULL, "
+                "id INTEGER NOT NULL, "
+                "data TEXT NOT NULL, "
+                "PRIMARY KEY (session_id, id))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS session_payloads ("
+                "session_id TEXT NOT NULL, "
+                "name TEXT NOT NULL, "
+                "data TEXT NOT NULL, "
+                "PRIMARY KEY (session_id, name))"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _condition(self, session_id):
+        with self._lock:
+            condition = self._conditions.get(session_id)
+            if condition is None:
+                condition = self._conditions[session_id] = threading.Condition()
+            return condition
+
+    def _owner(self):
+        """Token of this process, starting its heartbeat on first use"""
+        with self._owner_lock:
+            # A forked worker must not share its parent's token or inherit a heartbeat that no longer runs
+            if self._owner_pid != os.getpid():
+                self._owner_pid = os.getpid()
+                self._owner_token = uuid.uuid4().hex
+                self.heartbeat()
+                thread = threading.Thread(
+                    target=self._beat, args=(self._owner_token,), name='session-heartbeat', daemon=True
+                )
+                thread.start()
+            return self._owner_token
+
+    def heartbeat(self):
+        """Record that this process is alive, and forget owners gone for long"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO session_owners (token, seen_at) VALUES (?, ?)", (self._owner_token, now)
+            )
+            conn.execute("DELETE FROM session_owners WHERE seen_at < ?", (now - self.max_age,))
+
+    def _beat(self, token):
+        while self._owner_token == token:
+            time.sleep(self.heartbeat_interval)
+            try:
+                self.heartbeat()
+                self.fail_orphaned()
+            except Exception as e:
+                print(f"Session heartbeat failed: {e}")
+
+    def create(self, session_id, status='queued', parent=None, location=None):
+        owner = self._owner()
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO sessions (id, status, created_at, updated_at, accessed_at, owner_token, parent, location) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (session_id, status, now, now, now, owner, parent, location)
+            )
+            self._prune(conn, now)
+
+    def get(self, session_id):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT status, result, error, timings, queue_position, cancel_requested, created_at, updated_at "
+                "FROM sessions WHERE id = ?",
+                (session_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE sessions SET accessed_at = ? WHERE id = ?", (time.time(), session_id))
+
+        status, result, error, timings, queue_position, cancel_requested, created_at, updated_at = row
+        return {
+            'status': status,
+            'result': json.loads(result) if result is not None else None,
+            'error': error,
+            'timings': json.loads(timings),
+            'queuePosition': queue_position,
+            'cancelRequested': bool(cancel_requested),
+            'createdAt': created_at,
+            'updatedAt': updated_at
+        }
+
+    def update(self, session_id, **fields):
+        columns = {
+            'status': 'status',
+            'error': 'error',
+            'queuePosition': 'queue_position',
+            'cancelRequested': 'cancel_requested'
+        }
+        assignments = []
+        values = []
+        for field, value in fields.items():
+            if field == 'result':
+                encoded = json.dumps(value) if value is not None else None
+                assignments += [
+                    'result = ?',
+                    'size = ? + (SELECT COALESCE(SUM(LENGTH(data)), 0) FROM session_payloads WHERE session_id = sessions.id)'
+                ]
+                values += [encoded, len(encoded) if encoded else 0]
+            else:
+                assignments.append(f"{columns[field]} = ?")
+                values.append(int(value) if field == 'cancelRequested' else value)
+
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"UPDATE sessions SET {', '.join(assignments + ['updated_at = ?'])} WHERE id = ?",
+                values + [now, session_id]
+            )
+            if cursor.rowcount == 0:
+                raise SessionNotFound(session_id)
+            if fields.get('status') in TERMINAL_STATUSES:
+                self._prune(conn, now)
+
+    def parent(self, session_id):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT parent, location FROM sessions WHERE id = ? AND parent IS NOT NULL", (session_id,)
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def children(self, parent_id):
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute("SELECT id FROM sessions WHERE parent = ?", (parent_id,))]
+
+    def fail_orphaned(self, error=ORPHANED_ERROR):
+        """Fail the queued and running sessions of owners whose heartbeat expired, returning their IDs"""
+        placeholders = ','.join('?' * len(TERMINAL_STATUSES))
+        now = time.time()
+        with self._connect() as conn:
+            candidates = conn.execute(
+                f"SELECT id FROM sessions WHERE status NOT IN ({placeholders}) "
+                f"AND (owner_token IS NULL OR (owner_token != ? AND owner_token NOT IN "
+                f"(SELECT token FROM session_owners WHERE seen_at >= ?)))",
+                TERMINAL_STATUSES + (self._owner_token or '', now - self.owner_timeout)
+            ).fetchall()
+
+            orphaned = []
+            for session_id, in candidates:
+                # Conditional, so that workers checking together fail each session once
+                cursor = conn.execute(
+                    f"UPDATE sessions SET status = 'failed', error = ?, queue_position = NULL, updated_at = ? "
+                    f"WHERE id = ? AND status NOT IN ({placeholders})",
+                    (error, now, session_id) + TERMINAL_STATUSES
+                )
+                if cursor.rowcount:
+                    orphaned.append(session_id)
+
+        for session_id in orphaned:
+            self.append_event(session_id, {'status': 'failed', 'error': error})
+        return orphaned
+
+    def set_payload(self, session_id, name, value):
+        encoded = json.dumps(value)
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT 1 FROM sessions WHERE id = ?", (session_id,)).fetchone() is None:
+                raise SessionNotFound(session_id)
+            previous = conn.execute(
+                "SELECT LENGTH(data) FROM session_payloads WHERE session_id = ? AND name = ?",
+                (session_id, name)
+            ).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO session_payloads (session_id, name, data) VALUES (?, ?, ?)",
+                (session_id, name, encoded)
+            )
+            conn.execute(
+                "UPDATE sessions SET size = size + ? WHERE id = ?",
+                (len(encoded) - (previous[0] if previous else 0), session_id)
+            )
+
+    def get_payload(self, session_id, name):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT data FROM session_payloads WHERE session_id = ? AND name = ?",
+                (session_id, name)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE sessions SET accessed_at = ? WHERE id = ?", (time.time(), session_id))
+        return json.loads(row[0])
+
+    def append_timing(self, session_id, span):
+        with self._connect() as conn:
+            row = conn.execute("SELECT timings FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if row is None:
+                return
+            timings = json.loads(row[0])
+            timings.append(span)
+            conn.execute("UPDATE sessions SET timings = ? WHERE id = ?", (json.dumps(timings), session_id))
+
+    def append_event(self, session_id, data):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            exists = conn.execute("SELECT 1 FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if exists is None:
+                return None
+            event_id = conn.execute(
+                "SELECT COALESCE(MAX(id), 0) + 1 FROM session_events WHERE session_id = ?",
+                (session_id,)
+            ).fetchone()[0]
+            conn.execute(
+                "INSERT INTO session_events (session_id, id, data) VALUES (?, ?, ?)",
+                (session_id, event_id, json.dumps(data))
+            )
+
+        condition = self._condition(session_id)
+        with condition:
+            condition.notify_all()
+        return event_id
+
+    def _read_events(self, session_id, after_id):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, data FROM session_events WHERE session_id = ? AND id > ? ORDER BY id",
+                (session_id, after_id)
+            ).fetchall()
+            if not rows and conn.execute("SELECT 1 FROM sessions WHERE id = ?", (session_id,)).fetchone() is None:
+                raise SessionNotFound(session_id)
+        return [{'id': event_id, 'data': json.loads(data)} for event_id, data in rows]
+
+    def events_since(self, session_id, after_id, timeout):
+        deadline = time.monotonic() + timeout
+        condition = self._condition(session_id)
+        while True:
+            events = self._read_events(session_id, after_id)
+            remaining = deadline - time.monotonic()
+            if events or remaining <= 0:
+                return events
+            with condition:
+                condition.wait(timeout=min(self.poll_interval, remaining))
+
+    def status_counts(self):
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM sessions GROUP BY status").fetchall())
+
+    def _delete(self, conn, session_ids):
+        conn.executemany("DELETE FROM sessions WHERE id = ?", [(sid,) for sid in session_ids])
+        conn.executemany("DELETE FROM session_events WHERE session_id = ?", [(sid,) for sid in session_ids])
+        conn.executemany("DELETE FROM session_payloads WHERE session_id = ?", [(sid,) for sid in session_ids])
+        with self._lock:
+            for session_id in session_ids:
+                self._conditions.pop(session_id, None)
+            self.evictions += len(session_ids)
+
+    def _prune(self, conn, now):
+        placeholders = ','.join('?' * len(TERMINAL_STATUSES))
+        expired = [row[0] for row in conn.execute(
+            f"SELECT id FROM sessions WHERE (status IN ({placeholders}) AND updated_at < ?) OR created_at < ?",
+            TERMINAL_STATUSES + (now - self.ttl, now - self.max_age)
+        )]
+        if expired:
+            self._delete(conn, expired)
+
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM sessions").fetchone()
+        if count <= self.max_sessions and total <= self.max_bytes:
+            return
+
+        stale = []
+        for session_id, size in conn.execute(
+            f"SELECT id, size FROM sessions WHERE status IN ({placeholders}) ORDER BY accessed_at ASC",
+            TERMINAL_STATUSES
+        ):
+            if count <= self.max_sessions and total <= self.max_bytes:
+                break
+            stale.append(session_id)
+            count -= 1
+            total -= size
+        self._delete(conn, stale)
+
+    def stats(self):
+        with self._connect() as conn:
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM sessions").fetchone()
+        return {
+            'backend': 'sqlite',
+            'sessions': count,
+            'bytes': total,
+            'evictions': self.evictions,
+            'maxSessions': self.max_sessions,
+            'maxBytes': self.max_bytes,
+            'ttlSeconds': self.ttl
+        }
+
+
+def get_session_store(name, path=None, **options):
+    """Create the session store selected by name"""
+    name = (name or 'memory').lower()
+    if name == 'memory':
+        return InMemorySessionStore(**options)
+    if name == 'sqlite':
+        return SQLiteSessionStore(path or os.path.join('cache', 'sessions.sqlite3'), **options)
+    raise ValueError(f"Unknown session store '{name}', expected 'memory' or 'sqlite'")
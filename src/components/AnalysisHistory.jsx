@@ -49,7 +49,7 @@ const AnalysisHistory = ({ onLoadAnalysis }) => {
     
     // Delete map file if it exists
     if (analysis?.results?.mapFileName) {
-      await deleteMapFile(analysis.results.mapFileName);
+      await deleteMapFile(analysis.results.mapFileName, analysis.results.sessionId);
     }
     
     const updated = analyses.filter(a => a.id !== id);
@@ -62,7 +62,7 @@ const AnalysisHistory = ({ onLoadAnalysis }) => {
     // Delete all map files
     for (const analysis of analyses) {
       if (analysis?.results?.mapFileName) {
-        await deleteMapFile(analysis.results.mapFileName);
+        await deleteMapFile(analysis.results.mapFileName, analysis.results.sessionId);
       }
     }
     
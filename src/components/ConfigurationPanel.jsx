@@ -136,7 +136,8 @@ const ConfigurationPanel = ({
         hotThreshold: parseFloat(formData.hotThreshold),
         vegThreshold: parseFloat(formData.vegThreshold),
         geeProjectId: formData.geeProjectId,
-        dataset: formData.dataset.trim()
+        dataset: formData.dataset.trim(),
+        outputMode: 'geojson'
       };
       
       const response = await callAnalyzeAPI(parameters, (log) => {
@@ -144,6 +145,9 @@ const ConfigurationPanel = ({
           time: new Date().toLocaleTimeString(), 
           message: log
         }]);
+      }, (partial) => {
+        // Show stats, zones and the map as each stage finishes
+        setResults(partial);
       });
       
       if (response.success) {
@@ -1,5 +1,6 @@
 import { useRef, useEffect } from 'react';
 import { Maximize2 } from 'lucide-react';
+import GeoJsonMap from './GeoJsonMap.jsx';
 
 const FullScreenMap = ({ results, fullscreenMap, setFullscreenMap, locationName }) => {
   const fullscreenMapRef = useRef(null);
@@ -26,7 +27,7 @@ const FullScreenMap = ({ results, fullscreenMap, setFullscreenMap, locationName
     <>
       <button 
         onClick={() => setFullscreenMap(true)}
-        disabled={!results?.mapHtml}
+        disabled={!(results?.mapHtml || results?.mapData)}
         className="flex items-center gap-1 text-xs text-green-600 hover:text-green-700 font-medium disabled:text-slate-400"
       >
         <Maximize2 className="w-3 h-3" />
@@ -74,7 +75,9 @@ const FullScreenMap = ({ results, fullscreenMap, setFullscreenMap, locationName
               </button>
             </div>
             <div id="fullscreen-map-container" className="flex-1 overflow-hidden w-full">
-              {results?.mapHtml && (
+              {results?.mapData ? (
+                <GeoJsonMap results={results} />
+              ) : results?.mapHtml && (
                 <div 
                   ref={fullscreenMapRef}
                   className="w-full h-full"
@@ -0,0 +1,109 @@
+import { useMemo } from 'react';
+import { tileUrlTemplate } from '../services/api';
+
+const LEAFLET_VERSION = '1.9.4';
+const OVERLAYS = [
+  ['lst', 'Land surface temperature'],
+  ['ndvi', 'Vegetation (NDVI)'],
+  ['hotspots', 'Hotspot mask']
+];
+
+// Builds a standalone Leaflet page for the iframe so the map's CSS and
+// globals stay isolated from the app, the same way the Folium HTML did
+const buildMapDocument = (results) => {
+  const payload = JSON.stringify({
+    center: results.center,
+    hotspots: results.mapData.hotspots,
+    zones: results.mapData.zones,
+    sites: results.plantingSites || [],
+    overlays: results.tileSource
+      ? OVERLAYS.map(([layer, label]) => ({ label, url: tileUrlTemplate(layer, results.tileSource) }))
+      : []
+  }).replace(/</g, '\\u003c');
+
+  return `<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8" />
+<meta name="viewport" content="width=device-width, initial-scale=1.0" />
+<link rel="stylesheet" href="https://unpkg.com/leaflet@${LEAFLET_VERSION}/dist/leaflet.css" />
+<script src="https://unpkg.com/leaflet@${LEAFLET_VERSION}/dist/leaflet.js"></script>
+<style>html, body, #map { width: 100%; height: 100%; margin: 0; }</style>
+</head>
+<body>
+<div id="map"></div>
+<script>
+  var data = ${payload};
+  var map = L.map('map', { preferCanvas: true }).setView([data.center.lat, data.center.lon], 12);
+  L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
+    maxZoom: 19,
+    attribution: '&copy; OpenStreetMap contributors'
+  }).addTo(map);
+
+  // Continuous raster overlays rendered and cached by the API, off until picked
+  if (data.overlays.length) {
+    var overlays = {};
+    data.overlays.forEach(function (overlay) {
+      overlays[overlay.label] = L.tileLayer(overlay.url, { maxZoom: 18 });
+    });
+    L.control.layers(null, overlays, { collapsed: false }).addTo(map);
+  }
+
+  // One canvas renderer draws every hotspot, so thousands of points stay cheap
+  var renderer = L.canvas({ padding: 0.5 });
+  var hotspots = data.hotspots;
+  for (var i = 0; i < hotspots.lat.length; i++) {
+    var tooltip = 'Potential hotspot';
+    if (hotspots.lst) tooltip += ' (' + hotspots.lst[i] + '°C)';
+    L.circleMarker([hotspots.lat[i], hotspots.lon[i]], {
+      renderer: renderer,
+      radius: 2,
+      color: 'red',
+      fillOpacity: 0.6
+    }).bindTooltip(tooltip).addTo(map);
+  }
+
+  data.zones.forEach(function (zone) {
+    var mapsUrl = 'https://www.google.com/maps?q=' + zone.lat + ',' + zone.lon;
+    L.marker([zone.lat, zone.lon]).bindPopup(
+      '<b>Priority Planting Zone #' + zone.id + '</b><br>' +
+      'Center of Heat Cluster<br>' +
+      '<a href="' + mapsUrl + '" target="_blank">(' + zone.lat.toFixed(5) + ', ' + zone.lon.toFixed(5) + ')</a>'
+    ).addTo(map);
+  });
+
+  // Ranked planting sites: hotspot pixels picked for the most heat covered
+  data.sites.forEach(function (site) {
+    L.circleMarker([site.lat, site.lon], {
+      radius: 6,
+      color: 'darkgreen',
+      fillColor: 'lime',
+      fillOpacity: 0.9
+    }).bindTooltip('Planting site #' + site.rank + ' (zone ' + site.zoneId + ', ' + site.temp + '°C)').addTo(map);
+  });
+</script>
+</body>
+</html>`;
+};
+
+const GeoJsonMap = ({ results, className = 'w-full h-full' }) => {
+  const srcDoc = useMemo(
+    () => (results?.mapData ? buildMapDocument(results) : null),
+    [results]
+  );
+
+  if (!srcDoc) {
+    return null;
+  }
+
+  return (
+    <iframe
+      title="Heat Map"
+      srcDoc={srcDoc}
+      className={className}
+      style={{ border: 0 }}
+    />
+  );
+};
+
+export default GeoJsonMap;
@@ -1,7 +1,8 @@
 import { useState, useEffect } from 'react';
 import { Locate, Thermometer, Leaf, Download, ExternalLink, MapPinned } from 'lucide-react';
-import { downloadMap, getLocationName } from '../services/api.js';
+import { downloadMap, getLocationName, renderAnalysisMap } from '../services/api.js';
 import FullScreenMap from './FullScreenMap.jsx'
+import GeoJsonMap from './GeoJsonMap.jsx';
 
 const ResultsPanel = ({results, analyzing, mapContainerRef, formData, locationName, setLocationName}) => {
   const [fullscreenMap, setFullscreenMap] = useState(false);
@@ -26,17 +27,28 @@ const ResultsPanel = ({results, analyzing, mapContainerRef, formData, locationNa
 
   const handleDownloadMap = async () => {
   
-    if (!results || !results.mapFileName) {
+    if (!results || !(results.mapFileName || results.sessionId)) {
       return;
     }
     
+    // GeoJSON results have no map file until one is requested
+    let mapFileName = results.mapFileName;
+    if (!mapFileName) {
+      try {
+        mapFileName = await renderAnalysisMap(results.sessionId);
+      } catch (err) {
+        console.error('Error building map for download:', err);
+        return;
+      }
+    }
+
     // Download the map
-    await downloadMap(results.mapFileName);
+    await downloadMap(mapFileName);
     
     // Create download record
     const downloadRecord = {
       id: Date.now().toString(),
-      filename: results.mapFileName,
+      filename: mapFileName,
       location: `${formData.latitude}, ${formData.longitude}`,
       dataset: formData.dataset,
       timestamp: new Date().toISOString(),
@@ -75,7 +87,7 @@ const ResultsPanel = ({results, analyzing, mapContainerRef, formData, locationNa
                 <FullScreenMap results={results} fullscreenMap={fullscreenMap} setFullscreenMap={setFullscreenMap} locationName={locationName} />
                 <button 
                   onClick={handleDownloadMap}
-                  disabled={!results?.mapFileName}
+                  disabled={!(results?.mapFileName || results?.sessionId)}
                   className="flex items-center gap-1 text-xs text-green-600 hover:text-green-700 font-medium disabled:text-slate-400"
                 >
                   <Download className="w-3 h-3" />
@@ -84,7 +96,9 @@ const ResultsPanel = ({results, analyzing, mapContainerRef, formData, locationNa
               </div>
             </div>
             <div className="w-full h-48 sm:h-64 bg-slate-50 flex items-center justify-center overflow-hidden">
-              {results?.mapHtml ? (
+              {results?.mapData ? (
+                <GeoJsonMap results={results} />
+              ) : results?.mapHtml ? (
                 <div 
                   ref={mapContainerRef}
                   className="w-full h-full"
@@ -1,10 +1,23 @@
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:5000/api';
 const REQUEST_TIMEOUT = 300000; // 5 minutes for analysis
+const MAX_STREAM_RECONNECTS = 5;
+// Named SSE events carrying partial results before the analysis completes
+const PARTIAL_EVENTS = ['stats', 'zones', 'hotspots-chunk', 'map-ready'];
 
-export const streamAnalysisLogs = (sessionId, onLog, onComplete, onError) => {
+export const streamAnalysisLogs = (sessionId, onLog, onComplete, onError, onPartial) => {
   try {
     const eventSource = new EventSource(`${API_BASE_URL}/logs/${sessionId}`);
     let hasCompleted = false;
+
+    PARTIAL_EVENTS.forEach((type) => {
+      eventSource.addEventListener(type, (event) => {
+        try {
+          if (onPartial) onPartial(type, JSON.parse(event.data));
+        } catch (err) {
+          console.error(`Error handling ${type} event:`, err);
+        }
+      });
+    });
     
     eventSource.onmessage = (event) => {
       try {
@@ -24,8 +37,11 @@ export const streamAnalysisLogs = (sessionId, onLog, onComplete, onError) => {
             eventSource.close();
             onComplete(data.result);
           }
-        } else if (data.status === 'failed') {
-          // Analysis failed
+        } else if (data.status === 'queued') {
+          // Waiting for a free worker on the server
+          onLog(`Waiting in queue (position ${data.queuePosition})...`);
+        } else if (data.status === 'failed' || data.status === 'cancelled') {
+          // Analysis failed or was cancelled
           if (!hasCompleted) {
             hasCompleted = true;
             console.log('Analysis failed:', data.error);
@@ -38,7 +54,19 @@ export const streamAnalysisLogs = (sessionId, onLog, onComplete, onError) => {
       }
     };
     
+    let reconnectAttempts = 0;
+    eventSource.onopen = () => {
+      reconnectAttempts = 0;
+    };
+
     eventSource.onerror = (error) => {
+      // The browser reconnects by itself and the server resumes from Last-Event-ID
+      if (eventSource.readyState === EventSource.CONNECTING && !hasCompleted && reconnectAttempts < MAX_STREAM_RECONNECTS) {
+        reconnectAttempts += 1;
+        console.warn(`EventSource connection lost, reconnecting (${reconnectAttempts}/${MAX_STREAM_RECONNECTS})...`);
+        return;
+      }
+
       console.error('EventSource error:', error);
       eventSource.close();
       if (!hasCompleted) {
@@ -300,7 +328,36 @@ const validateAnalysisParameters = (parameters) => {
   return true;
 };
 
-export const analyzeHeatIsland = async (parameters, onLogUpdate) => {
+// Folds partial result events into one growing result. Hotspot chunks are
+// collected until complete, then exposed as mapData like a finished result.
+const createPartialResult = () => {
+  const partial = {};
+  let hotspots = null;
+  let received = 0;
+
+  const update = (type, data) => {
+    const fields = { ...data };
+    delete fields.type;
+    if (type === 'hotspots-chunk') {
+      if (!hotspots) hotspots = {};
+      Object.entries(fields.hotspots).forEach(([name, values]) => {
+        if (!hotspots[name]) hotspots[name] = new Array(fields.total);
+        values.forEach((value, i) => { hotspots[name][fields.offset + i] = value; });
+      });
+      received += fields.count;
+      if (received >= fields.total && partial.priorityZones) {
+        partial.mapData = { hotspots, zones: partial.priorityZones };
+      }
+    } else {
+      Object.assign(partial, fields);
+    }
+    return { ...partial };
+  };
+
+  return { update, mapData: () => partial.mapData };
+};
+
+export const analyzeHeatIsland = async (parameters, onLogUpdate, onPartialResult) => {
   try {
     validateAnalysisParameters(parameters);
     
@@ -323,6 +380,7 @@ export const analyzeHeatIsland = async (parameters, onLogUpdate) => {
     }
 
     const { sessionId } = await response.json();
+    const partial = createPartialResult();
     
     // Return a promise that resolves when analysis completes
     return new Promise((resolve, reject) => {
@@ -332,10 +390,26 @@ export const analyzeHeatIsland = async (parameters, onLogUpdate) => {
           if (onLogUpdate) onLogUpdate(log);
         },
         (result) => {
-          resolve(result);
+          if (result?.mapFormat !== 'geojson') {
+            resolve(result);
+            return;
+          }
+          // Hotspots already streamed in chunks need no second request
+          if (partial.mapData()) {
+            resolve({ ...result, mapData: partial.mapData() });
+            return;
+          }
+          // Hotspots are served separately from the result in GeoJSON mode
+          getAnalysisMapData(result.sessionId)
+            .then((mapData) => resolve({ ...result, mapData }))
+            .catch(reject);
         },
         (error) => {
           reject(error);
+        },
+        (type, data) => {
+          const result = partial.update(type, data);
+          if (onPartialResult) onPartialResult(result);
         }
       );
     });
@@ -379,6 +453,43 @@ export const healthCheck = async () => {
   }
 };
 
+// Compact hotspot columns and priority zones for client-side map rendering
+export const getAnalysisMapData = async (sessionId) => {
+  const response = await fetchWithTimeout(
+    `${API_BASE_URL}/analysis-result/${sessionId}/geojson?format=columns`,
+    {},
+    30000
+  );
+
+  if (!response.ok) {
+    const error = await response.json();
+    throw new Error(error.error || 'Failed to load map data');
+  }
+
+  return await response.json();
+};
+
+// Ask the server to build the downloadable Folium map for a GeoJSON-mode result
+export const renderAnalysisMap = async (sessionId) => {
+  const response = await fetchWithTimeout(
+    `${API_BASE_URL}/analysis-result/${sessionId}/map`,
+    { method: 'POST' },
+    120000
+  );
+
+  if (!response.ok) {
+    const error = await response.json();
+    throw new Error(error.error || 'Failed to build map');
+  }
+
+  const { mapFileName } = await response.json();
+  return mapFileName;
+};
+
+// Leaflet URL template of an LST, NDVI or hotspot mask overlay of an analysis
+export const tileUrlTemplate = (layer, tileSource) =>
+  `${API_BASE_URL}/tiles/${layer}/{z}/{x}/{y}.png?source=${encodeURIComponent(tileSource)}`;
+
 export const downloadMap = async (filename) => {
   try {
     const response = await fetchWithTimeout(
@@ -408,10 +519,12 @@ export const downloadMap = async (filename) => {
   }
 };
 
-export const deleteMapFile = async (filename) => {
+export const deleteMapFile = async (filename, sessionId) => {
   try {
+    // The server keeps the map while other sessions or cached results use it
+    const query = sessionId ? `?sessionId=${encodeURIComponent(sessionId)}` : '';
     const response = await fetchWithTimeout(
-      `${API_BASE_URL}/delete-map/${filename}`,
+      `${API_BASE_URL}/delete-map/${filename}${query}`,
       {
         method: 'DELETE'
       },
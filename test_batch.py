@@ -0,0 +1,44 @@
+def test_batch_analyses_every_location(client, app_module, analysis_payload, wait_for_result):
+    payload = {key: analysis_payload[key] for key in ('startDate', 'endDate', 'outputMode')}
+    payload['locations'] = [
+        {'id': 'centre', 'latitude': analysis_payload['latitude'], 'longitude': analysis_payload['longitude'],
+         'radius': 1500},
+        # Outside every local scene
+        {'id': 'elsewhere', 'latitude': 10.0, 'longitude': 10.0}
+    ]
+    response = client.post('/api/analyze/batch', json=dict(payload, noCache=True))
+    assert response.status_code == 202
+    batch = response.get_json()
+    sessions = {location['id']: location['sessionId'] for location in batch['locations']}
+
+    result = wait_for_result(batch['sessionId']).get_json()
+    assert (result['completed'], result['failed']) == (1, 1)
+    statuses = {location['id']: location['status'] for location in result['locations']}
+    assert statuses == {'centre': 'completed', 'elsewhere': 'failed'}
+    assert wait_for_result(sessions['centre']).get_json()['hotspotsFound'] > 0
+
+    # Location events are forwarded to the batch stream, tagged with the location
+    events = app_module.session_store.events_since(batch['sessionId'], 0, timeout=0)
+    finished = {event['data']['location'] for event in events if event['data'].get('locationStatus')}
+    assert finished == {'centre', 'elsewhere'}
+
+
+def test_batch_cancellation_reaches_locations_through_the_store(app_module):
+    store = app_module.session_store
+    batch_id = app_module.create_session()
+    location_id = app_module.create_session(parent=batch_id, location='centre')
+
+    assert store.parent(location_id) == (batch_id, 'centre')
+    assert not app_module.cancel_requested(location_id)
+    store.update(batch_id, cancelRequested=True)
+    assert app_module.cancel_requested(location_id)
+
+    app_module.finish_batch_locations(batch_id, 'cancelled', 'stopped')
+    assert store.get(location_id)['status'] == 'cancelled'
+
+
+def test_batch_rejects_invalid_locations(client, analysis_payload):
+    payload = {key: analysis_payload[key] for key in ('startDate', 'endDate')}
+    assert client.post('/api/analyze/batch', json=dict(payload, locations=[])).status_code == 400
+    duplicate = [{'id': 'a', 'latitude': analysis_payload['latitude'], 'longitude': analysis_payload['longitude']}] * 2
+    assert client.post('/api/analyze/batch', json=dict(payload, locations=duplicate)).status_code == 400
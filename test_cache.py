@@ -0,0 +1,101 @@
+import pytest
+
+import cache
+from cache import DiskCache, make_cache_key
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, 'time', clock)
+    return clock
+
+
+def test_cache_key_ignores_parameter_order():
+    assert make_cache_key('analysis', {'a': 1, 'b': 2}) == make_cache_key('analysis', {'b': 2, 'a': 1})
+    assert make_cache_key('analysis', {'a': 1}) != make_cache_key('scenes', {'a': 1})
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    store = DiskCache(str(tmp_path / 'cache.sqlite3'), ttl=60)
+    store.set('key', {'value': 1})
+
+    clock.now += 59
+    assert store.get('key') == {'value': 1}
+    clock.now += 2
+    assert store.get('key') is None
+    assert store.stats()['entries'] == 0
+    assert (store.hits, store.misses) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path, clock):
+    store = DiskCache(str(tmp_path / 'cache.sqlite3'), ttl=0, max_entries=2)
+    store.set('a', 1)
+    clock.now += 1
+    store.set('b', 2)
+    clock.now += 1
+    assert store.get('a') == 1  # a is now more recently used than b
+    clock.now += 1
+    store.set('c', 3)
+
+    assert store.get('b') is None
+    assert store.get('a') == 1 and store.get('c') == 3
+    assert store.evictions == 1
+
+
+def test_size_limit_evicts_and_rejects_oversized_entries(tmp_path, clock):
+    store = DiskCache(str(tmp_path / 'cache.sqlite3'), ttl=0, max_entries=100, max_bytes=3000)
+    store.set('a', b'x' * 1000)
+    clock.now += 1
+    store.set('b', b'x' * 1000)
+    clock.now += 1
+    store.set('c', b'x' * 1000)
+
+    assert store.get('a') is None
+    assert store.stats()['bytes'] <= 3000
+    assert store.set('huge', b'x' * 4000) is False
+    assert store.get('huge') is None
+
+
+def test_namespaces_share_a_file_without_mixing(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    scenes, hotspots = DiskCache(path, namespace='scenes'), DiskCache(path, namespace='hotspots')
+    scenes.set('key', 'scene')
+    assert hotspots.get('key') is None
+    hotspots.clear()
+    assert scenes.get('key') == 'scene'
+
+
+def test_totals_follow_writes_overwrites_and_deletes(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    store = DiskCache(path, ttl=0)
+    store.set('a', b'x' * 100)
+    store.set('b', b'x' * 100)
+    store.set('a', b'x' * 300)
+    store.delete('b')
+
+    stats = store.stats()
+    assert stats['entries'] == 1
+    assert stats['bytes'] == len(cache.pickle.dumps(b'x' * 300, protocol=cache.pickle.HIGHEST_PROTOCOL))
+    # A second handle on the same file sees the same totals
+    assert DiskCache(path, ttl=0).stats()['entries'] == 1
+
+
+def test_expired_entries_are_swept_every_few_writes(tmp_path, clock):
+    store = DiskCache(str(tmp_path / 'cache.sqlite3'), ttl=60, sweep_every=3)
+    store.set('old', 1)
+    clock.now += 61
+    store.set('a', 1)
+    assert store.stats()['entries'] == 2
+    store.set('b', 1)
+
+    assert store.stats()['entries'] == 2
+    assert store.evictions == 1
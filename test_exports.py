@@ -0,0 +1,94 @@
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from exports import ExportStore, hotspot_table
+
+
+@pytest.fixture
+def store(tmp_path):
+    # Small batches, so that filters run over several record batches
+    store = ExportStore(str(tmp_path), batch_rows=4)
+    df = pd.DataFrame({
+        'lat': np.linspace(29.50, 29.59, 10),
+        'lon': np.linspace(75.00, 75.09, 10),
+        'LST_Celsius': np.arange(40.0, 50.0),
+        'NDVI': np.full(10, 0.1),
+        'cluster': np.arange(10) % 2
+    })
+    store.write('session', hotspot_table(df))
+    return store
+
+
+def read_arrow(chunks):
+    return pa.ipc.open_stream(io.BytesIO(b''.join(chunks))).read_all()
+
+
+def test_clusters_are_numbered_like_priority_zones(store):
+    table = read_arrow(store.stream('session', 'arrow'))
+    assert table.num_rows == 10
+    assert table.column('cluster').to_pylist() == [1, 2] * 5
+
+
+def test_columns_are_selected_in_request_order(store):
+    table = read_arrow(store.stream('session', 'arrow', columns=['LST_Celsius', 'lat']))
+    assert table.column_names == ['LST_Celsius', 'lat']
+
+
+def test_bbox_keeps_points_inside_across_batches(store):
+    bbox = (75.025, 29.525, 75.065, 29.565)  # west, south, east, north
+    table = pq.read_table(io.BytesIO(b''.join(store.stream('session', 'parquet', bbox=bbox))))
+    assert table.column('LST_Celsius').to_pylist() == [43.0, 44.0, 45.0, 46.0]
+
+
+def test_geojson_export_filters_and_keeps_geometry(store):
+    chunks = store.stream('session', 'geojson', columns=['LST_Celsius'], bbox=(75.0, 29.5, 75.015, 29.515))
+    collection = json.loads(b''.join(chunks))
+    assert [feature['properties'] for feature in collection['features']] == [
+        {'LST_Celsius': 40.0}, {'LST_Celsius': 41.0}
+    ]
+    assert collection['features'][1]['geometry']['coordinates'] == pytest.approx([75.01, 29.51])
+
+
+def test_empty_selection_is_a_valid_file(store):
+    table = read_arrow(store.stream('session', 'arrow', bbox=(0, 0, 1, 1)))
+    assert table.num_rows == 0
+    assert 'lat' in table.column_names
+
+
+def test_oldest_exports_are_pruned(tmp_path):
+    store = ExportStore(str(tmp_path), max_files=2)
+    table = pa.table({'lat': [1.0], 'lon': [2.0]})
+    for session_id in ('a', 'b', 'c'):
+        store.write(session_id, table)
+    assert sum(store.exists(session_id) for session_id in ('a', 'b', 'c')) == 2
+    assert store.exists('c')
+
+
+def test_export_endpoint_filters_a_finished_analysis(client, analysis_payload, wait_for_result):
+    session_id = client.post('/api/analyze', json=dict(analysis_payload, noCache=True)).get_json()['sessionId']
+    assert wait_for_result(session_id).status_code == 200
+
+    response = client.get(f'/api/analysis-result/{session_id}/export?format=arrow&columns=lat,lon,LST_Celsius')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/vnd.apache.arrow.stream'
+    table = read_arrow([response.data])
+    assert table.column_names == ['lat', 'lon', 'LST_Celsius'] and table.num_rows > 0
+
+    # A box around the first hotspot
+    lon, lat = table.column('lon')[0].as_py(), table.column('lat')[0].as_py()
+    bbox = (lon - 0.002, lat - 0.002, lon + 0.002, lat + 0.002)
+    response = client.get(f'/api/analysis-result/{session_id}/export?format=geojson&bbox={",".join(map(str, bbox))}')
+    features = json.loads(response.data)['features']
+    assert 0 < len(features) < table.num_rows
+    for feature in features:
+        x, y = feature['geometry']['coordinates']
+        assert bbox[0] <= x <= bbox[2] and bbox[1] <= y <= bbox[3]
+
+    assert client.get(f'/api/analysis-result/{session_id}/export?columns=shade').status_code == 400
+    assert client.get(f'/api/analysis-result/{session_id}/export?format=csv').status_code == 400
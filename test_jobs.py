@@ -0,0 +1,140 @@
+import threading
+import time
+
+import pytest
+
+from jobs import AnalysisExecutor, QueueFullError
+
+
+@pytest.fixture
+def executor():
+    executor = AnalysisExecutor(max_workers=1, max_queue=20, max_per_client=10)
+    yield executor
+    executor.shutdown()
+
+
+def block(executor):
+    """Occupy the only worker until the returned event is set"""
+    started, release = threading.Event(), threading.Event()
+
+    def hold():
+        started.set()
+        release.wait(5)
+
+    executor.submit('blocker', 'blocker', hold)
+    assert started.wait(5)
+    return release
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+def test_clients_are_served_round_robin(executor):
+    release = block(executor)
+    order = []
+    for job_id, client in [('a1', 'A'), ('a2', 'A'), ('a3', 'A'), ('b1', 'B'), ('b2', 'B')]:
+        executor.submit(job_id, client, order.append, job_id)
+
+    assert executor.queued_positions() == {'a1': 1, 'b1': 2, 'a2': 3, 'b2': 4, 'a3': 5}
+    release.set()
+    wait_until(lambda: len(order) == 5)
+    assert order == ['a1', 'b1', 'a2', 'b2', 'a3']
+
+
+def test_admission_rejects_busy_client_then_full_queue():
+    executor = AnalysisExecutor(max_workers=1, max_queue=3, max_per_client=2)
+    release = block(executor)
+    try:
+        assert executor.submit('a1', 'A', lambda: None) == 1
+        assert executor.submit('a2', 'A', lambda: None) == 2
+        with pytest.raises(QueueFullError) as error:
+            executor.submit('a3', 'A', lambda: None)
+        assert error.value.status_code == 429
+
+        executor.submit('b1', 'B', lambda: None)
+        with pytest.raises(QueueFullError) as error:
+            executor.submit('c1', 'C', lambda: None)
+        assert (error.value.status_code, error.value.queued) == (503, 3)
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def test_cancel_removes_only_queued_jobs(executor):
+    release = block(executor)
+    ran = []
+    executor.submit('a1', 'A', ran.append, 'a1')
+    executor.submit('a2', 'A', ran.append, 'a2')
+
+    assert executor.cancel('a1') is True
+    assert executor.cancel('a1') is False
+    assert executor.cancel('blocker') is False  # already running
+    assert executor.position('a2') == 1
+
+    release.set()
+    wait_until(lambda: ran == ['a2'])
+    assert executor.stats()['queued'] == 0
+
+
+def test_run_all_stays_within_workers_and_cannot_deadlock():
+    executor = AnalysisExecutor(max_workers=2, max_queue=20, max_per_client=3)
+    lock = threading.Lock()
+    running, peak, done = [0], [0], []
+
+    def location(job_id):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+            done.append(job_id)
+
+    def batch(batch_id):
+        # Parents block their worker while waiting, so both workers are parents here
+        executor.run_all('A', [(f'{batch_id}-{i}', location, (f'{batch_id}-{i}',)) for i in range(5)], 2)
+        done.append(batch_id)
+
+    try:
+        executor.submit('b1', 'A', batch, 'b1')
+        executor.submit('b2', 'A', batch, 'b2')
+        wait_until(lambda: 'b1' in done and 'b2' in done)
+        assert peak[0] <= 2
+        assert len(done) == 12
+        assert executor.stats()['queuedSubjobs'] == 0
+    finally:
+        executor.shutdown()
+
+
+def test_client_can_submit_while_its_batch_runs():
+    executor = AnalysisExecutor(max_workers=1, max_queue=20, max_per_client=2)
+    submitted, release = threading.Event(), threading.Event()
+    done = []
+
+    def location(job_id):
+        release.wait(5)
+        done.append(job_id)
+
+    def batch():
+        executor.run_all('A', [(f'loc-{i}', location, (f'loc-{i}',)) for i in range(4)], 4)
+        done.append('batch')
+
+    try:
+        executor.submit('batch', 'A', batch)
+        wait_until(lambda: executor.stats()['queuedSubjobs'] == 3)
+        # Three queued locations of the batch leave both of the client's slots free
+        executor.submit('a1', 'A', done.append, 'a1')
+        executor.submit('a2', 'A', done.append, 'a2')
+        with pytest.raises(QueueFullError) as error:
+            executor.submit('a3', 'A', done.append, 'a3')
+        assert error.value.status_code == 429
+
+        release.set()
+        wait_until(lambda: 'batch' in done and 'a1' in done and 'a2' in done)
+    finally:
+        release.set()
+        executor.shutdown()
@@ -0,0 +1,111 @@
+import gzip
+import os
+
+from maps import ENCODINGS, MapStore, parse_accept_encoding
+
+
+def page(i):
+    return f"<html><body>map {i}</body></html>" * 50
+
+
+def set_used(store, filename, when):
+    for encoding in [None] + [encoding for encoding, _ in ENCODINGS]:
+        os.utime(store.path(filename, encoding), (when, when))
+
+
+def test_identical_maps_share_one_hash_named_file(tmp_path):
+    store = MapStore(str(tmp_path))
+    first = store.save(page(1))
+    assert store.is_valid_name(first)
+    assert store.save(page(1)) == first
+    assert store.save(page(2)) != first
+    assert store.stats()['maps'] == 2
+
+
+def test_relative_directory_is_made_absolute(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = MapStore('maps')
+    assert store.directory == str(tmp_path / 'maps')
+    assert os.path.isabs(store.path(store.save(page(1))))
+
+
+def test_etag_is_content_hash_per_encoding(tmp_path):
+    store = MapStore(str(tmp_path))
+    filename = store.save(page(1))
+    digest = filename[len('urban_heat_map_'):-len('.html')]
+    assert store.etag(filename) == digest
+    assert store.etag(filename, 'gzip') == f"{digest}-gzip"
+
+
+def test_select_serves_an_accepted_compressed_variant(tmp_path):
+    store = MapStore(str(tmp_path))
+    filename = store.save(page(1))
+
+    path, encoding = store.select(filename, 'gzip;q=1, br;q=0')
+    assert encoding == 'gzip'
+    with open(path, 'rb') as f:
+        assert gzip.decompress(f.read()).decode('utf-8') == page(1)
+    assert store.select(filename, None) == (store.path(filename), None)
+    assert parse_accept_encoding('gzip, deflate;q=0, BR') == {'gzip', 'br'}
+
+
+def test_least_recently_used_maps_are_collected(tmp_path):
+    store = MapStore(str(tmp_path), max_files=2)
+    first, second = store.save(page(1)), store.save(page(2))
+    set_used(store, first, 2000)
+    set_used(store, second, 1000)
+
+    third = store.save(page(3))
+    assert store.exists(first) and store.exists(third)
+    assert not store.exists(second)
+    assert not any(name.startswith(second) for name in os.listdir(tmp_path))
+    assert store.evictions == 1
+
+
+def test_size_limit_collects_oldest_maps(tmp_path):
+    probe = MapStore(str(tmp_path / 'probe'))
+    probe.save(page(1))
+    map_bytes = probe.stats()['bytes']
+
+    store = MapStore(str(tmp_path / 'maps'), max_bytes=int(map_bytes * 1.5))
+    first = store.save(page(1))
+    set_used(store, first, 1000)
+    second = store.save(page(2))
+
+    assert not store.exists(first) and store.exists(second)
+    assert store.stats()['bytes'] <= store.max_bytes
+
+
+def test_map_is_deletable_once_its_last_reference_is_released(tmp_path):
+    store = MapStore(str(tmp_path))
+    filename = store.save(page(1))
+    store.retain(filename, 'session:a')
+    store.retain(filename, 'session:a')
+    store.retain(filename, 'result:key')
+
+    assert store.references(filename) == 2
+    assert store.release(filename, 'session:a') == 1
+    assert store.release(filename, 'result:key') == 0
+    store.retain(filename, 'session:b')
+    assert store.delete(filename) and store.references(filename) == 0
+
+
+def test_delete_endpoint_keeps_maps_still_in_use(client, app_module, analysis_payload, wait_for_result):
+    payload = dict(analysis_payload, outputMode='html', noCache=True)
+    session_id = client.post('/api/analyze', json=payload).get_json()['sessionId']
+    filename = wait_for_result(session_id).get_json()['mapFileName']
+
+    # The result cache entry still points to the map
+    response = client.delete(f'/api/delete-map/{filename}?sessionId={session_id}')
+    assert response.status_code == 202 and response.get_json()['deleted'] is False
+    assert client.get(f'/api/download-map/{filename}').status_code == 200
+
+
+def test_delete_endpoint_deletes_unshared_maps(client, app_module):
+    filename = app_module.map_store.save(page('endpoint'))
+    app_module.map_store.retain(filename, 'session:only')
+
+    response = client.delete(f'/api/delete-map/{filename}?sessionId=only')
+    assert response.status_code == 200 and response.get_json()['deleted'] is True
+    assert client.get(f'/api/download-map/{filename}').status_code == 404
+    assert client.delete('/api/delete-map/not-a-map.html').status_code == 400
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from clustering import project_local
+from planting import select_planting_sites
+
+
+def brute_force_greedy(lats, lons, lst, hot_threshold, n_sites, radius):
+    """Plain greedy max coverage, re-evaluating every candidate at every pick"""
+    heat = np.clip(np.asarray(lst) - hot_threshold, 0, None)
+    points, _ = project_local(lats, lons)
+    distances = np.linalg.norm(points[:, None, :] - points[None, :, :], axis=2)
+    within = distances <= radius
+
+    covered = np.zeros(len(heat), dtype=bool)
+    gains = []
+    for _ in range(n_sites):
+        candidate_gains = (within * (heat * ~covered)[None, :]).sum(axis=1)
+        best = int(np.argmax(candidate_gains))
+        if candidate_gains[best] <= 0:
+            break
+        gains.append(candidate_gains[best])
+        covered |= within[best]
+    return np.array(gains)
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_lazy_greedy_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    lats = 29.5 + rng.uniform(0, 0.01, size=300)
+    lons = 75.0 + rng.uniform(0, 0.01, size=300)
+    lst = rng.normal(38, 3, size=300)
+
+    sites, gains = select_planting_sites(lats, lons, lst, 37, n_sites=15, radius=100)
+    expected = brute_force_greedy(lats, lons, lst, 37, 15, 100)
+
+    assert gains == pytest.approx(expected)
+    assert len(set(sites.tolist())) == len(sites)
+    assert np.all(np.diff(gains) <= 1e-9)  # best first
+
+
+def test_sites_spread_over_separate_clusters():
+    # Two hot clusters 1 km apart: the second pick must not land in the first cluster
+    lats = np.array([29.5, 29.5, 29.5001, 29.509, 29.509])
+    lons = np.array([75.0, 75.0001, 75.0, 75.0, 75.0001])
+    lst = np.array([45.0, 44.0, 43.0, 41.0, 40.0])
+
+    sites, gains = select_planting_sites(lats, lons, lst, 37, n_sites=5, radius=100)
+    clusters = [0, 0, 0, 1, 1]
+    assert sorted(clusters[site] for site in sites) == [0, 1]
+    assert gains.tolist() == pytest.approx([8 + 7 + 6, 4 + 3])
+
+
+def test_no_sites_without_heat_above_threshold():
+    sites, gains = select_planting_sites([29.5, 29.6], [75.0, 75.1], [30.0, 31.0], 37)
+    assert len(sites) == 0 and len(gains) == 0
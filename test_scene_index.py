@@ -0,0 +1,30 @@
+from backends import footprint_rings
+from scene_index import SceneIndex
+
+DATASET = 'LANDSAT/LC09/C02/T1_L2'
+
+
+def square(west, south, size):
+    return [[west, south], [west + size, south], [west + size, south + size], [west, south + size], [west, south]]
+
+
+def test_footprint_rings_reads_polygons_and_multipolygons():
+    ring = square(0, 0, 1)
+    assert footprint_rings('Polygon', [ring]) == [ring]
+    assert footprint_rings('MultiPolygon', [[ring], [square(2, 0, 1)]]) == [ring, square(2, 0, 1)]
+
+
+def test_query_matches_any_part_of_a_multipart_footprint(tmp_path):
+    scenes = [
+        {'id': 'split', 'time': 1700000000000, 'cloudCover': 5, 'tile': '148040',
+         'footprint': [square(74.1, 29.1, 0.2), square(74.6, 29.1, 0.2)]},
+        # Rows listed before MultiPolygon support hold a single ring
+        {'id': 'whole', 'time': 1700000000000, 'cloudCover': 10, 'tile': '148039',
+         'footprint': square(74.0, 29.0, 1.0)}
+    ]
+    index = SceneIndex(str(tmp_path / 'scenes.sqlite3'), lambda *args: scenes)
+
+    assert index.query(DATASET, 29.2, 74.7, '2023-01-01', '2024-01-01', 20) == ['split', 'whole']
+    # Between the two parts only the single-ring scene covers the point
+    assert index.query(DATASET, 29.2, 74.45, '2023-01-01', '2024-01-01', 20) == ['whole']
+    assert index.stats()['fetches'] == 1
@@ -0,0 +1,81 @@
+import threading
+import time
+
+import pytest
+
+from sessions import InMemorySessionStore, SessionNotFound, SQLiteSessionStore
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        return InMemorySessionStore()
+    return SQLiteSessionStore(str(tmp_path / 'sessions.sqlite3'), poll_interval=0.01)
+
+
+def test_events_since_resumes_after_last_seen_id(store):
+    store.create('s1')
+    for i in range(1, 4):
+        assert store.append_event('s1', {'log': f'line {i}'}) == i
+
+    events = store.events_since('s1', 1, timeout=0)
+    assert [event['id'] for event in events] == [2, 3]
+    assert events[0]['data'] == {'log': 'line 2'}
+    assert store.events_since('s1', 3, timeout=0) == []
+
+
+def test_events_since_wakes_on_new_event(store):
+    store.create('s1')
+    store.append_event('s1', {'log': 'first'})
+    threading.Timer(0.05, store.append_event, ('s1', {'status': 'completed'})).start()
+
+    started = time.monotonic()
+    events = store.events_since('s1', 1, timeout=5)
+    assert [event['data'] for event in events] == [{'status': 'completed'}]
+    assert time.monotonic() - started < 2
+
+
+def test_events_since_unknown_session(store):
+    with pytest.raises(SessionNotFound):
+        store.events_since('missing', 0, timeout=0)
+    assert store.append_event('missing', {'log': 'lost'}) is None
+
+
+
+def test_batch_locations_name_their_parent(store):
+    store.create('batch')
+    store.create('location-1', parent='batch', location='north')
+    store.create('location-2', parent='batch', location='south')
+    store.create('other')
+
+    assert store.parent('location-1') == ('batch', 'north')
+    assert store.parent('other') is None and store.parent('missing') is None
+    assert sorted(store.children('batch')) == ['location-1', 'location-2']
+
+
+def test_sessions_of_a_silent_owner_are_failed(tmp_path):
+    path = str(tmp_path / 'sessions.sqlite3')
+    # Two stores on one file stand in for two worker processes, possibly on different hosts
+    stopped = SQLiteSessionStore(path, heartbeat_interval=3600)
+    watcher = SQLiteSessionStore(path, owner_timeout=0.05)
+    stopped.create('queued')
+    stopped.create('done')
+    stopped.update('done', status='completed')
+    watcher.create('own')
+
+    assert watcher.fail_orphaned() == []
+    time.sleep(0.1)
+    stopped.heartbeat()
+    assert watcher.fail_orphaned() == []
+
+    time.sleep(0.1)
+    assert watcher.fail_orphaned('worker stopped') == ['queued']
+    assert store_status(watcher, 'queued') == ('failed', 'worker stopped')
+    assert watcher.events_since('queued', 0, timeout=0)[-1]['data'] == {'status': 'failed', 'error': 'worker stopped'}
+    assert store_status(watcher, 'done')[0] == 'completed'
+    assert store_status(watcher, 'own')[0] == 'queued'
+
+
+def store_status(store, session_id):
+    session = store.get(session_id)
+    return session['status'], session['error']
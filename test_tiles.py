@@ -0,0 +1,43 @@
+import math
+
+import pytest
+
+ZOOM = 13
+
+
+def tile_at(lat, lon, z):
+    n = 2 ** z
+    x = int((lon + 180) / 360 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return x, y
+
+
+@pytest.fixture
+def tile_source(client, analysis_payload, wait_for_result):
+    session_id = client.post('/api/analyze', json=analysis_payload).get_json()['sessionId']
+    result = wait_for_result(session_id)
+    assert result.status_code == 200
+    return result.get_json()['tileSource']
+
+
+@pytest.mark.parametrize('layer', ['lst', 'ndvi', 'hotspots'])
+def test_tile_is_rendered_and_revalidated(client, analysis_payload, tile_source, layer):
+    x, y = tile_at(analysis_payload['latitude'], analysis_payload['longitude'], ZOOM)
+    url = f'/api/tiles/{layer}/{ZOOM}/{x}/{y}.png?source={tile_source}'
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.mimetype == 'image/png'
+    assert response.data.startswith(b'\x89PNG')
+
+    etag = response.headers['ETag']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+    assert client.get(url).data == response.data
+
+
+def test_unknown_layer_and_source_are_not_found(client, analysis_payload, tile_source):
+    x, y = tile_at(analysis_payload['latitude'], analysis_payload['longitude'], ZOOM)
+    assert client.get(f'/api/tiles/albedo/{ZOOM}/{x}/{y}.png?source={tile_source}').status_code == 404
+    assert client.get(f'/api/tiles/lst/{ZOOM}/{x}/{y}.png?source=missing').status_code == 404
+    assert client.get(f'/api/tiles/lst/{ZOOM}/{x}/{y}.png').status_code == 404
+    assert client.get(f'/api/tiles/lst/{ZOOM}/{2 ** ZOOM}/{y}.png?source={tile_source}').status_code == 400
@@ -0,0 +1,34 @@
+import numpy as np
+
+from tiling import allocate
+
+
+def test_allocate_keeps_counts_under_cap():
+    assert allocate([3, 5, 0], 10).tolist() == [3, 5, 0]
+
+
+def test_allocate_splits_cap_in_proportion():
+    counts = [600, 300, 100]
+    assert allocate(counts, 100).tolist() == [60, 30, 10]
+
+
+def test_allocate_hands_out_remainder_to_largest_fractions():
+    # Quotas 0.66.., 0.66.., 0.66..: ties go to the earlier strata
+    assert allocate([1, 1, 1], 2).tolist() == [1, 1, 0]
+    # Quotas 2.5, 1.25, 1.25: the largest fraction wins the spare slot
+    assert allocate([20, 10, 10], 5).tolist() == [3, 1, 1]
+
+
+def test_allocate_sums_to_cap_and_stays_within_one_of_quota():
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        counts = rng.integers(0, 1000, size=rng.integers(1, 20))
+        cap = int(rng.integers(1, max(2, counts.sum())))
+        shares = allocate(counts, cap)
+        if counts.sum() <= cap:
+            assert shares.tolist() == counts.tolist()
+            continue
+        assert shares.sum() == cap
+        quotas = counts * cap / counts.sum()
+        assert np.all(np.abs(shares - quotas) < 1)
+        assert np.all(shares <= counts)
@@ -0,0 +1,47 @@
+import pytest
+
+
+@pytest.fixture
+def timeseries_payload(analysis_payload):
+    return dict(analysis_payload, startDate='2025-05-01', endDate='2025-08-01', noCache=True)
+
+
+def test_monthly_series_reports_every_month(client, timeseries_payload):
+    response = client.post('/api/timeseries', json=timeseries_payload)
+    assert response.status_code == 200
+    series = {entry['period']: entry for entry in response.get_json()['series']}
+
+    assert list(series) == ['2025-05', '2025-06', '2025-07']
+    assert (series['2025-05']['scenes'], series['2025-05']['lstMean']) == (0, None)
+    assert series['2025-06']['scenes'] == 2 and series['2025-06']['lstMean'] is not None
+
+
+def test_period_missing_from_backend_is_reported_empty(client, app_module, timeseries_payload, monkeypatch):
+    period_stats = app_module.backend.period_stats
+
+    def drop_june(*args, **kwargs):
+        return [row for row in period_stats(*args, **kwargs) if row['period'] != '2025-06']
+
+    monkeypatch.setattr(app_module.backend, 'period_stats', drop_june)
+    response = client.post('/api/timeseries', json=timeseries_payload)
+    assert response.status_code == 200
+    june = next(entry for entry in response.get_json()['series'] if entry['period'] == '2025-06')
+    assert june == {'period': '2025-06', 'start': '2025-06-01', 'scenes': 0,
+                    'lstMean': None, 'lstPercentile': None, 'hotspotFraction': None}
+
+
+def test_scene_missing_from_backend_is_reported_last(client, app_module, timeseries_payload, monkeypatch):
+    scene_stats = app_module.backend.scene_stats
+    monkeypatch.setattr(app_module.backend, 'scene_stats', lambda *args, **kwargs: scene_stats(*args, **kwargs)[1:])
+
+    response = client.post('/api/timeseries', json=dict(timeseries_payload, frequency='scene'))
+    assert response.status_code == 200
+    series = response.get_json()['series']
+    assert len(series) == 3
+    assert all(entry['lstMean'] is not None for entry in series[:2])
+    assert series[-1]['start'] is None and series[-1]['lstMean'] is None
+
+
+def test_negative_hot_threshold_is_rejected(client, timeseries_payload):
+    response = client.post('/api/timeseries', json=dict(timeseries_payload, hotThreshold=-1))
+    assert response.status_code == 400
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from zones import parse_score_weights, priority_scores, weighted_percentile, zone_statistics
+
+
+def test_weighted_percentile_matches_nearest_rank():
+    rng = np.random.default_rng(1)
+    labels = rng.integers(0, 4, size=500)
+    values = rng.normal(35, 5, size=500)
+
+    result = weighted_percentile(labels, values, np.ones(500), 5, 90)
+    for zone in range(4):
+        expected = np.percentile(values[labels == zone], 90, method='inverted_cdf')
+        assert result[zone] == pytest.approx(expected)
+    assert np.isnan(result[4])  # no values for the last zone
+
+
+def test_weighted_percentile_repeats_values_by_weight():
+    rng = np.random.default_rng(2)
+    labels = rng.integers(0, 3, size=200)
+    values = rng.normal(35, 5, size=200)
+    weights = rng.integers(1, 6, size=200)
+
+    result = weighted_percentile(labels, values, weights.astype(float), 3, 75)
+    for zone in range(3):
+        repeated = np.repeat(values[labels == zone], weights[labels == zone])
+        assert result[zone] == pytest.approx(np.percentile(repeated, 75, method='inverted_cdf'))
+
+
+def test_zone_statistics_weights_grid_cells_by_hotspot_pixels():
+    stats = zone_statistics(
+        labels=[0, 0, 1], n_zones=2, lats=[0, 0, 0], lons=[0, 0, 0],
+        lst=[40.0, 30.0, 35.0], ndvi=[0.1, np.nan, 0.2], pixels=[3, 1, 2], pixel_area_km2=0.01
+    )
+    assert stats['count'].tolist() == [2, 1]
+    assert stats['meanLst'][0] == pytest.approx((40 * 3 + 30) / 4)
+    assert stats['meanNdvi'].tolist() == pytest.approx([0.1, 0.2])
+    assert stats['areaKm2'].tolist() == pytest.approx([0.04, 0.02])
+
+
+def test_priority_scores_rank_hottest_zone_first():
+    stats = {
+        'count': np.array([1, 1, 1]),
+        'meanLst': np.array([38.0, 45.0, 41.0]),
+        'areaKm2': np.array([1.0, 1.0, 1.0]),
+        'meanNdvi': np.array([0.1, 0.1, np.nan])
+    }
+    score, ranks = priority_scores(stats, {'heat': 1.0, 'size': 0.0, 'vegetation': 0.0})
+    assert score.tolist() == pytest.approx([0.0, 100.0, 100 * 3 / 7])
+    assert ranks.tolist() == [3, 1, 2]
+
+
+def test_priority_scores_combine_weighted_components():
+    stats = {
+        'count': np.array([1, 1]),
+        'meanLst': np.array([40.0, 42.0]),
+        'areaKm2': np.array([2.0, 1.0]),
+        'meanNdvi': np.array([0.3, 0.1])
+    }
+    # Zone 0 is larger, zone 1 hotter and less vegetated
+    score, ranks = priority_scores(stats, {'heat': 0.2, 'size': 0.6, 'vegetation': 0.2})
+    assert score.tolist() == pytest.approx([60.0, 40.0])
+    assert ranks.tolist() == [1, 2]
+
+
+def test_parse_score_weights():
+    assert parse_score_weights('heat=1, size=0.5') == {'heat': 1.0, 'size': 0.5, 'vegetation': 0.0}
+    for invalid in ('heat', 'shade=1', 'heat=-1', {'heat': 0}):
+        with pytest.raises(ValueError):
+            parse_score_weights(invalid)
@@ -0,0 +1,178 @@
+import math
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+
+METERS_PER_DEGREE = 111320.0
+DEFAULT_TILE_SIZE = 5000
+# Largest sample requested from a single tile, below Earth Engine's 5000
+# element limit for getInfo on a FeatureCollection
+DEFAULT_TILE_MAX_POINTS = 4000
+DEFAULT_MAX_TILES = 64
+# Grid used per tile to estimate how much of it the region covers
+COVERAGE_GRID = 16
+
+
+def points_in_polygon(lats, lons, polygon):
+    """Even-odd rule test of lat/lon arrays against a ring of [lon, lat] vertices"""
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    inside = np.zeros(np.broadcast(lats, lons).shape, dtype=bool)
+
+    ring = np.asarray(polygon, dtype=float)
+    for (x1, y1), (x2, y2) in zip(ring, np.roll(ring, -1, axis=0)):
+        if y1 == y2:
+            continue
+        crosses = (y1 > lats) != (y2 > lats)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_cross = x1 + (lats - y1) * (x2 - x1) / (y2 - y1)
+        inside ^= crosses & (lons < x_cross)
+    return inside
+
+
+class Region:
+    """Region of interest given as a circle (center and radius in metres) or a polygon.
+
+    polygon is a ring of [lon, lat] vertices as in GeoJSON. Holds only
+    client-side geometry, so tiles can be planned without a round trip to
+    Earth Engine.
+    """
+
+    def __init__(self, lat, lon, radius, polygon=None):
+        self.lat = lat
+        self.lon = lon
+        self.radius = radius
+        self.polygon = [[float(x), float(y)] for x, y in polygon] if polygon else None
+
+        if self.polygon:
+            xs = [x for x, _ in self.polygon]
+            ys = [y for _, y in self.polygon]
+            self.bounds = (min(xs), min(ys), max(xs), max(ys))
+        else:
+            half_lat = radius / METERS_PER_DEGREE
+            half_lon = half_lat / max(math.cos(math.radians(lat)), 0.01)
+            self.bounds = (lon - half_lon, lat - half_lat, lon + half_lon, lat + half_lat)
+
+    def contains(self, lats, lons):
+        """Boolean mask of the points inside the region, broadcasting lats against lons"""
+        if self.polygon:
+            return points_in_polygon(lats, lons, self.polygon)
+        # Equirectangular approximation, accurate to well under a pixel at city scale
+        dy = (np.asarray(lats) - self.lat) * METERS_PER_DEGREE
+        dx = (np.asarray(lons) - self.lon) * METERS_PER_DEGREE * math.cos(math.radians(self.lat))
+        return dx ** 2 + dy ** 2 <= self.radius ** 2
+
+    def cache_params(self):
+        if self.polygon:
+            return {'polygon': [[round(x, 6), round(y, 6)] for x, y in self.polygon]}
+        return {'radius': int(self.radius)}
+
+
+def box_area(bounds):
+    """Approximate area of a lat/lon box in square metres"""
+    west, south, east, north = bounds
+    mid_lat = math.radians((south + north) / 2)
+    return (east - west) * (north - south) * METERS_PER_DEGREE ** 2 * math.cos(mid_lat)
+
+
+def split_bounds(bounds, tile_size):
+    """Cut a lat/lon box into roughly tile_size x tile_size metre boxes"""
+    west, south, east, north = bounds
+    mid_lat = math.radians((south + north) / 2)
+    # Tolerance keeps a 10 km box from becoming three 5 km tiles through rounding
+    rows = max(1, math.ceil((north - south) * METERS_PER_DEGREE / tile_size - 1e-6))
+    cols = max(1, math.ceil((east - west) * METERS_PER_DEGREE * math.cos(mid_lat) / tile_size - 1e-6))
+    lat_edges = np.linspace(south, north, rows + 1)
+    lon_edges = np.linspace(west, east, cols + 1)
+    return [
+        (float(lon_edges[c]), float(lat_edges[r]), float(lon_edges[c + 1]), float(lat_edges[r + 1]))
+        for r in range(rows) for c in range(cols)
+    ]
+
+
+def plan_tiles(region, max_points, tile_size=DEFAULT_TILE_SIZE, tile_max_points=DEFAULT_TILE_MAX_POINTS,
+               max_tiles=DEFAULT_MAX_TILES):
+    """Split a region into tiles and share the point budget by covered area.
+
+    Tiles grow while there are more than max_tiles of them, then shrink
+    until no single tile is asked for more than tile_max_points. Returns
+    dicts with the tile bounds, the area of the region inside it and its
+    share of max_points.
+    """
+    box_tiles = box_area(region.bounds) / tile_size ** 2
+    if box_tiles > max_tiles:
+        tile_size *= math.sqrt(box_tiles / max_tiles)
+
+    while True:
+        tiles = []
+        for bounds in split_bounds(region.bounds, tile_size):
+            west, south, east, north = bounds
+            step_lat = (north - south) / COVERAGE_GRID
+            step_lon = (east - west) / COVERAGE_GRID
+            lats = south + step_lat * (np.arange(COVERAGE_GRID) + 0.5)
+            lons = west + step_lon * (np.arange(COVERAGE_GRID) + 0.5)
+            coverage = region.contains(lats[:, None], lons[None, :]).mean()
+            if coverage > 0:
+                tiles.append({'bounds': bounds, 'area': box_area(bounds) * coverage})
+
+        total_area = sum(tile['area'] for tile in tiles) or 1.0
+        for tile in tiles:
+            tile['budget'] = max(1, math.ceil(max_points * tile['area'] / total_area))
+
+        largest = max((tile['budget'] for tile in tiles), default=0)
+        if largest <= tile_max_points or tile_size <= 500:
+            return tiles
+        tile_size = max(500, tile_size * math.sqrt(tile_max_points / largest) * 0.9)
+
+
+def allocate(counts, cap):
+    """Split cap across strata in proportion to their counts (largest remainder)"""
+    counts = np.asarray(counts, dtype=float)
+    total = counts.sum()
+    if total <= cap:
+        return counts.astype(int)
+
+    quotas = counts * cap / total
+    shares = np.floor(quotas).astype(int)
+    remainder = int(cap - shares.sum())
+    if remainder > 0:
+        shares[np.argsort(-(quotas - shares), kind='stable')[:remainder]] += 1
+    return shares
+
+
+def fetch_tiles(fetch, tiles, max_workers=4, on_tile=None):
+    """Run fetch(tile) for every tile concurrently, in completion order.
+
+    fetch returns (DataFrame, count) where count is the number of hotspots
+    the tile holds, which may exceed the rows returned. on_tile(done, total,
+    count) is called as each tile arrives. Results come back in tile order.
+    """
+    results = [None] * len(tiles)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tiles)))) as pool:
+        futures = {pool.submit(fetch, tile): index for index, tile in enumerate(tiles)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            index = futures[future]
+            results[index] = future.result()
+            if on_tile is not None:
+                on_tile(done, len(tiles), results[index][1])
+    return results
+
+
+def merge_tiles(results, cap, seed=42):
+    """Concatenate per-tile samples, keeping at most cap rows stratified by tile"""
+    counts = [count for _, count in results]
+    shares = allocate(counts, cap)
+    rng = np.random.default_rng(seed)
+
+    frames = []
+    for (df, _), share in zip(results, shares):
+        if len(df) > share:
+            df = df.iloc[np.sort(rng.choice(len(df), size=share, replace=False))]
+        if len(df):
+            frames.append(df)
+
+    if not frames:
+        return pd.DataFrame(columns=['LST_Celsius', 'NDVI', 'lat', 'lon'])
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,143 @@
+import numpy as np
+
+from clustering import project_local
+from lazy_imports import lazy_import
+
+spatial = lazy_import('scipy.spatial')
+
+
+# Components of the zone priority score: mean LST, zone area and lack of vegetation
+SCORE_COMPONENTS = ('heat', 'size', 'vegetation')
+DEFAULT_SCORE_WEIGHTS = {'heat': 0.5, 'size': 0.3, 'vegetation': 0.2}
+ZONE_PERCENTILE = 90
+
+
+def parse_score_weights(value):
+    """Score weights from a {'heat': 0.5, ...} mapping or a 'heat=0.5,size=0.3' string.
+
+    Components that are not named get weight 0; at least one weight must
+    be positive.
+    """
+    if isinstance(value, str):
+        pairs = [part.split('=', 1) for part in value.split(',') if part.strip()]
+        if any(len(pair) != 2 for pair in pairs):
+            raise ValueError("Score weights must look like 'heat=0.5,size=0.3,vegetation=0.2'")
+        value = {name.strip(): weight for name, weight in pairs}
+    if not isinstance(value, dict):
+        raise ValueError("Score weights must be an object keyed by component")
+
+    unknown = set(value) - set(SCORE_COMPONENTS)
+    if unknown:
+        raise ValueError(f"Unknown score components {', '.join(sorted(unknown))}; "
+                         f"expected {', '.join(SCORE_COMPONENTS)}")
+    weights = {name: float(value.get(name, 0)) for name in SCORE_COMPONENTS}
+    if any(weight < 0 for weight in weights.values()) or not any(weights.values()):
+        raise ValueError("Score weights must be non-negative with at least one above 0")
+    return weights
+
+
+def weighted_percentile(labels, values, weights, n_zones, q):
+    """Weighted nearest-rank q-th percentile of values per label, NaN for labels without values.
+
+    One sort by (label, value); each zone's percentile is then found by a
+    single searchsorted over the running weight total.
+    """
+    order = np.lexsort((values, labels))
+    sorted_labels = labels[order]
+    cumulative = np.cumsum(weights[order])
+
+    ends = np.cumsum(np.bincount(sorted_labels, minlength=n_zones))
+    starts = ends - np.bincount(sorted_labels, minlength=n_zones)
+    before = np.concatenate([[0.0], cumulative])[starts]
+    totals = np.concatenate([[0.0], cumulative])[ends] - before
+
+    index = np.searchsorted(cumulative, before + totals * q / 100, side='left')
+    index = np.clip(index, starts, np.maximum(ends - 1, starts))
+    result = np.full(n_zones, np.nan)
+    present = ends > starts
+    result[present] = values[order][index[present]]
+    return result
+
+
+def hull_areas(labels, lats, lons, n_zones):
+    """Convex hull area in km² of the points of each label, 0 for fewer than 3 or collinear points"""
+    points, _ = project_local(lats, lons)
+    order = np.argsort(labels, kind='stable')
+    groups = np.split(points[order], np.cumsum(np.bincount(labels, minlength=n_zones))[:-1])
+
+    areas = np.zeros(n_zones)
+    for zone, zone_points in enumerate(groups):
+        if len(zone_points) < 3:
+            continue
+        try:
+            # The volume of a 2-D hull is its area
+            areas[zone] = spatial.ConvexHull(zone_points).volume / 1e6
+        except spatial.QhullError:
+            pass
+    return areas
+
+
+def zone_statistics(labels, n_zones, lats, lons, lst, ndvi=None, pixels=None, pixel_area_km2=None):
+    """Per-zone count, mean and p90 LST, mean NDVI and area in one pass over the hotspot arrays.
+
+    With pixels (hotspot pixels per grid cell) means and percentiles are
+    pixel-weighted and the area is the hotspot pixel area; otherwise every
+    point weighs the same and the area is the convex hull of the zone.
+    """
+    labels = np.asarray(labels, dtype=np.int64)
+    weights = np.ones(len(labels)) if pixels is None else np.asarray(pixels, dtype=float)
+
+    def weighted_mean(values):
+        values = np.asarray(values, dtype=float)
+        valid = np.isfinite(values)
+        sums = np.bincount(labels[valid], weights[valid] * values[valid], minlength=n_zones)
+        totals = np.bincount(labels[valid], weights[valid], minlength=n_zones)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(totals > 0, sums / totals, np.nan)
+
+    lst = np.asarray(lst, dtype=float)
+    valid = np.isfinite(lst)
+    stats = {
+        'count': np.bincount(labels, minlength=n_zones),
+        'pixels': np.bincount(labels, weights, minlength=n_zones),
+        'meanLst': weighted_mean(lst),
+        'p90Lst': weighted_percentile(labels[valid], lst[valid], weights[valid], n_zones, ZONE_PERCENTILE),
+        'meanNdvi': weighted_mean(ndvi) if ndvi is not None else np.full(n_zones, np.nan)
+    }
+    if pixels is not None and pixel_area_km2 is not None:
+        stats['areaKm2'] = stats['pixels'] * pixel_area_km2
+    else:
+        stats['areaKm2'] = hull_areas(labels, np.asarray(lats, dtype=float), np.asarray(lons, dtype=float), n_zones)
+    return stats
+
+
+def priority_scores(stats, weights=None):
+    """0-100 priority score per zone and its rank, 1 being the zone to plant first.
+
+    Each component is min-max scaled across the zones before weighting,
+    so the score ranks zones against each other rather than on an
+    absolute scale.
+    """
+    weights = weights or DEFAULT_SCORE_WEIGHTS
+    components = {
+        'heat': stats['meanLst'],
+        'size': stats['areaKm2'],
+        'vegetation': -stats['meanNdvi']
+    }
+
+    score = np.zeros(len(stats['count']))
+    for name, values in components.items():
+        if not weights.get(name):
+            continue
+        values = np.asarray(values, dtype=float)
+        finite = np.isfinite(values)
+        scaled = np.zeros(len(values))
+        if finite.any():
+            low, high = values[finite].min(), values[finite].max()
+            scaled[finite] = (values[finite] - low) / (high - low) if high > low else 1.0
+        score += weights[name] * scaled
+    score = score / sum(weights.values()) * 100
+
+    ranks = np.empty(len(score), dtype=np.int64)
+    ranks[np.argsort(-score, kind='stable')] = np.arange(1, len(score) + 1)
+    return score, ranks